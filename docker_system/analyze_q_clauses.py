@@ -11,103 +11,37 @@ import os
 
 # Add the scripts directory to the path
 sys.path.append('/volume1/Main/Main/ParkerPOsOCR/docker_system/scripts')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+import q_clauses
+
+# Analysis category for each category of the shared table
+ANALYSIS_CATEGORIES = {
+    # ALWAYS COMPLY - Standard clauses we automatically accept
+    "auto_accept": "always_comply",
+    # SPECIAL ATTENTION - Require review but generally acceptable
+    "review_required": "special_attention",
+    # OBJECT TO - Clauses that require pushback or special negotiation
+    "object_to": "object_to",
+}
 
 def classify_q_clauses():
     """
     Classify Q clauses into business categories for processing decisions
+    (from the shared table: scripts/q_clause_classification.json)
     """
-    
-    # Q Clause Classification based on business impact
-    q_clause_classification = {
-        # ALWAYS COMPLY - Standard clauses we automatically accept
-        "always_comply": {
-            "Q1": {
-                "description": "QUALITY SYSTEMS REQUIREMENTS",
-                "action": "ACCEPT",
-                "timesheet_note": "Standard quality compliance",
-                "auto_process": True
-            },
-            "Q5": {
-                "description": "CERTIFICATION OF CONFORMANCE AND RECORD RETENTION", 
-                "action": "ACCEPT",
-                "timesheet_note": "Standard COC requirements",
-                "auto_process": True
-            },
-            "Q26": {
-                "description": "PACKING FOR SHIPMENT",
-                "action": "ACCEPT", 
-                "timesheet_note": "Standard packing requirements",
-                "auto_process": True
-            }
-        },
-        
-        # SPECIAL ATTENTION - Require review but generally acceptable
-        "special_attention": {
-            "Q2": {
-                "description": "SURVEILLANCE BY MEGGITT AND RIGHT OF ENTRY",
-                "action": "REVIEW_REQUIRED",
-                "timesheet_note": "Customer surveillance - coordinate access",
-                "auto_process": False,
-                "alert_level": "MEDIUM"
-            },
-            "Q9": {
-                "description": "CORRECTIVE ACTION",
-                "action": "REVIEW_REQUIRED", 
-                "timesheet_note": "CA process - document corrective actions",
-                "auto_process": False,
-                "alert_level": "MEDIUM"
-            },
-            "Q11": {
-                "description": "SPECIAL PROCESS SOURCES REQUIRED",
-                "action": "REVIEW_REQUIRED",
-                "timesheet_note": "Verify special process certifications",
-                "auto_process": False,
-                "alert_level": "HIGH"
-            },
-            "Q13": {
-                "description": "REPORT OF DISCREPANCY # Quality Notification (QN)",
-                "action": "REVIEW_REQUIRED",
-                "timesheet_note": "QN reporting required for discrepancies", 
-                "auto_process": False,
-                "alert_level": "HIGH"
-            },
-            "Q14": {
-                "description": "FOREIGN OBJECT DAMAGE (FOD)",
-                "action": "REVIEW_REQUIRED",
-                "timesheet_note": "FOD prevention measures required",
-                "auto_process": False, 
-                "alert_level": "MEDIUM"
+    q_clause_classification = {name: {} for name in ANALYSIS_CATEGORIES.values()}
+    for category, clauses in q_clauses.load_classification().items():
+        for q_number, info in clauses.items():
+            entry = {
+                "description": info["description"],
+                "action": "REVIEW_REQUIRED" if info["action"] == "REVIEW" else info["action"],
+                "timesheet_note": info["notes"],
+                "auto_process": category == "auto_accept",
             }
-        },
-        
-        # OBJECT TO - Clauses that require pushback or special negotiation
-        "object_to": {
-            "Q15": {
-                "description": "ANTI-TERRORIST POLICY", 
-                "action": "OBJECT",
-                "timesheet_note": "Review anti-terrorism requirements - may object",
-                "auto_process": False,
-                "alert_level": "HIGH",
-                "reason": "May conflict with standard business practices"
-            },
-            "Q32": {
-                "description": "FLOWDOWN OF REQUIREMENTS [QUALITY AND ENVIRONMENTAL]",
-                "action": "OBJECT",
-                "timesheet_note": "Review flowdown requirements - potential objection",
-                "auto_process": False,
-                "alert_level": "HIGH", 
-                "reason": "Flowdown clauses can be overly broad"
-            },
-            "Q33": {
-                "description": "FAR and DOD FAR SUPPLEMENTAL FLOWDOWN PROVISIONS",
-                "action": "OBJECT",
-                "timesheet_note": "FAR flowdown - likely objection",
-                "auto_process": False,
-                "alert_level": "CRITICAL",
-                "reason": "FAR clauses often inappropriate for commercial work"
-            }
-        }
-    }
+            if "alert_level" in info:
+                entry["alert_level"] = info["alert_level"]
+            q_clause_classification[ANALYSIS_CATEGORIES[category]][q_number] = entry
     
     return q_clause_classification
 
@@ -5,100 +5,20 @@ Enhanced Q Clause Processing with FileMaker Integration
 Classifies Q clauses and prepares them for FileMaker workflow integration
 """
 
-import re
+import copy
 import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+import q_clauses
 
 def get_q_clause_classification():
     """
     Define Q clause business rules and classification
+    (shared table: scripts/q_clause_classification.json)
     """
-    return {
-        # Auto-accept - Standard clauses that don't affect timesheet pricing
-        "auto_accept": {
-            "Q1": {
-                "description": "QUALITY SYSTEMS REQUIREMENTS",
-                "timesheet_impact": False,
-                "action": "ACCEPT",
-                "notes": "Standard quality compliance - no special handling"
-            },
-            "Q5": {
-                "description": "CERTIFICATION OF CONFORMANCE AND RECORD RETENTION",
-                "timesheet_impact": False, 
-                "action": "ACCEPT",
-                "notes": "Standard COC - include in normal process"
-            },
-            "Q26": {
-                "description": "PACKING FOR SHIPMENT",
-                "timesheet_impact": False,
-                "action": "ACCEPT", 
-                "notes": "Standard packing - no additional cost"
-            }
-        },
-        
-        # Review required - May affect timesheet/pricing
-        "review_required": {
-            "Q2": {
-                "description": "SURVEILLANCE BY MEGGITT AND RIGHT OF ENTRY",
-                "timesheet_impact": True,
-                "action": "REVIEW",
-                "notes": "Customer access required - coordinate scheduling",
-                "alert_level": "MEDIUM"
-            },
-            "Q9": {
-                "description": "CORRECTIVE ACTION", 
-                "timesheet_impact": True,
-                "action": "REVIEW",
-                "notes": "CA documentation required - add time for reporting",
-                "alert_level": "MEDIUM"
-            },
-            "Q11": {
-                "description": "SPECIAL PROCESS SOURCES REQUIRED",
-                "timesheet_impact": True,
-                "action": "REVIEW",
-                "notes": "Verify certifications - may require source approval",
-                "alert_level": "HIGH"
-            },
-            "Q13": {
-                "description": "REPORT OF DISCREPANCY # Quality Notification (QN)",
-                "timesheet_impact": True,
-                "action": "REVIEW", 
-                "notes": "QN reporting required - add admin time",
-                "alert_level": "HIGH"
-            },
-            "Q14": {
-                "description": "FOREIGN OBJECT DAMAGE (FOD)",
-                "timesheet_impact": True,
-                "action": "REVIEW",
-                "notes": "FOD prevention measures - additional handling time",
-                "alert_level": "MEDIUM"
-            }
-        },
-        
-        # Object to - Typically reject or negotiate
-        "object_to": {
-            "Q15": {
-                "description": "ANTI-TERRORIST POLICY",
-                "timesheet_impact": False,
-                "action": "OBJECT",
-                "notes": "Standard objection - conflicts with commercial practices",
-                "alert_level": "HIGH"
-            },
-            "Q32": {
-                "description": "FLOWDOWN OF REQUIREMENTS [QUALITY AND ENVIRONMENTAL]",
-                "timesheet_impact": False,
-                "action": "OBJECT", 
-                "notes": "Flowdown too broad - negotiate specific requirements",
-                "alert_level": "HIGH"
-            },
-            "Q33": {
-                "description": "FAR and DOD FAR SUPPLEMENTAL FLOWDOWN PROVISIONS",
-                "timesheet_impact": False,
-                "action": "OBJECT",
-                "notes": "FAR inappropriate for commercial work - standard objection",
-                "alert_level": "CRITICAL"
-            }
-        }
-    }
+    return copy.deepcopy(q_clauses.load_classification())
 
 def classify_and_process_q_clauses(quality_clauses_dict):
     """
@@ -117,7 +37,7 @@ def classify_and_process_q_clauses(quality_clauses_dict):
             "filemaker_fields": {}
         }
     
-    classification = get_q_clause_classification()
+    classification = q_clauses.load_classification()
     
     result = {
         "total_clauses": len(quality_clauses_dict),
@@ -197,62 +117,8 @@ def extract_quality_clauses_enhanced(text):
     """
     Enhanced Q clause extraction with classification
     """
-    quality_clauses = {}
-    
-    # Define known quality clauses and their complete descriptions
-    known_clauses = {
-        'Q1': 'QUALITY SYSTEMS REQUIREMENTS',
-        'Q2': 'SURVEILLANCE BY MEGGITT AND RIGHT OF ENTRY',
-        'Q5': 'CERTIFICATION OF CONFORMANCE AND RECORD RETENTION',
-        'Q9': 'CORRECTIVE ACTION',
-        'Q11': 'SPECIAL PROCESS SOURCES REQUIRED',
-        'Q13': 'REPORT OF DISCREPANCY # Quality Notification (QN)',
-        'Q14': 'FOREIGN OBJECT DAMAGE (FOD)',
-        'Q15': 'ANTI-TERRORIST POLICY',
-        'Q26': 'PACKING FOR SHIPMENT',
-        'Q32': 'FLOWDOWN OF REQUIREMENTS [QUALITY AND ENVIRONMENTAL]',
-        'Q33': 'FAR and DOD FAR SUPPLEMENTAL FLOWDOWN PROVISIONS'
-    }
-    
-    # Extract Q numbers that actually appear in the text
-    q_numbers_found = re.findall(r'(Q\d+)', text.upper())
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_q_numbers = []
-    for q in q_numbers_found:
-        if q not in seen:
-            seen.add(q)
-            unique_q_numbers.append(q)
-    
-    # Map found Q numbers to their descriptions
-    for q_number in unique_q_numbers:
-        if q_number in known_clauses:
-            quality_clauses[q_number] = known_clauses[q_number]
-        else:
-            # For unknown Q numbers, try to extract description from context
-            lines = text.split('\n')
-            for i, line in enumerate(lines):
-                if q_number in line.upper():
-                    # Try to get description from same line or following lines
-                    description_parts = []
-                    remaining = line.split(q_number, 1)
-                    if len(remaining) > 1:
-                        desc = remaining[1].strip()
-                        if desc:
-                            description_parts.append(desc)
-                    
-                    # Look at next couple lines for continuation
-                    for j in range(i + 1, min(i + 3, len(lines))):
-                        next_line = lines[j].strip()
-                        if next_line and not re.match(r'^Q\d+', next_line.upper()) and len(next_line) < 60:
-                            description_parts.append(next_line)
-                        else:
-                            break
-                    
-                    if description_parts:
-                        quality_clauses[q_number] = ' '.join(description_parts).strip()
-                    break
+    # Q numbers in order of appearance, with table or in-text descriptions
+    quality_clauses = q_clauses.scan_clauses(text)
     
     # Classify and process the Q clauses
     processed_result = classify_and_process_q_clauses(quality_clauses)
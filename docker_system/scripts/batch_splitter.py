@@ -0,0 +1,156 @@
+"""
+Multi-PO Batch Splitter
+Operators sometimes scan several POs in one feeder batch. Each PO starts on a
+page whose "Page 1 of N" marker carries a new PO number; the scan is cut at
+those pages into one job per PO so every PO gets its own folder and
+notification.
+
+PO starts are found in the OCR stage's page records, so a scan costs no OCR
+beyond the OCR stage itself. Only pages that stage deferred (lazy router OCR)
+have their small page-marker zone read; blank pages are skipped. The
+searchable PDF and its page records are then cut per PO, and a part is OCR'd
+again only when pages it needs for extraction were deferred.
+"""
+
+import os
+import re
+
+import fitz
+
+import layout_templates
+import pdf_optimizer
+import preprocessing
+import raster
+from extract_po_info import extract_page_count, extract_po_number
+from ocr_artifact import artifact_path_for, page_texts, save_ocr_artifact
+from po_job import POJob
+
+PAGE_MARKER_RE = re.compile(r'Page\s*(\S{1,2}?)\s*of\s*(\d{1,3})', re.IGNORECASE)
+# OCR readings of the "1" in "Page 1 of N"
+FIRST_PAGE_TOKENS = {"1", "l", "I", "i", "!", "|"}
+
+
+def first_page_po_number(text):
+    """PO number when text is the marker of a PO's first page, else None"""
+    match = PAGE_MARKER_RE.search(text)
+    if not match or match.group(1) not in FIRST_PAGE_TOKENS:
+        return None
+    return extract_po_number(text)
+
+
+def page_po_start(page):
+    """PO number if this page starts a PO, read from its page-marker zone (None otherwise)"""
+    if preprocessing.is_blank(raster.render_gray(page, scale=1)):
+        return None
+    for template in layout_templates.TEMPLATES:
+        zone = template.get("page_marker")
+        if not zone:
+            continue
+        try:
+            po_number = first_page_po_number(layout_templates.zone_text(page, zone))
+        except Exception as e:
+            print(f"Page marker read failed on page {page.number + 1}: {e}")
+            continue
+        if po_number:
+            return po_number
+    return None
+
+
+def find_po_starts(ocr_pages, pdf_path=None):
+    """
+    [(page index, PO number)] of the pages where a new PO begins
+
+    Args:
+        ocr_pages: the OCR stage's page records
+        pdf_path: scan whose deferred pages (no OCR text) get the page-marker zone check
+    """
+    doc = None
+    starts = []
+    seen = set()
+    try:
+        for index, record in enumerate(ocr_pages):
+            if record.get("blank"):
+                continue
+            if record.get("deferred"):
+                if pdf_path is None:
+                    continue
+                doc = doc or fitz.open(pdf_path)
+                po_number = page_po_start(doc[index])
+            else:
+                po_number = first_page_po_number(record.get("text", ""))
+            # Router pages may repeat "Page 1 of N" with their own PO's number
+            if po_number and po_number not in seen:
+                seen.add(po_number)
+                starts.append((index, po_number))
+    finally:
+        if doc is not None:
+            doc.close()
+    return starts
+
+
+def _needs_ocr(records):
+    """True when pages extraction reads (PO pages + first router page) were deferred"""
+    po_pages = extract_page_count(records[0].get("text", "")) if records else None
+    needed = records[:po_pages + 1] if po_pages else records
+    return any(record.get("deferred") for record in needed)
+
+
+def split_job(job, output_dir=None):
+    """
+    Cut an OCR'd scan into one job per PO
+
+    Args:
+        job: POJob after the OCR stage (searchable_pdf and ocr_pages filled in)
+        output_dir: where the per-PO scan PDFs go (default: _batch_<name> in the job's work dir)
+
+    Returns:
+        list of POJobs in scan order; [job] when the scan holds at most one PO.
+        Part jobs come with their cut of the searchable PDF and page records,
+        except those with deferred pages needed for extraction, which have
+        ocr_pages None and still need the OCR stage (on their cut of the scan)
+    """
+    starts = find_po_starts(job.ocr_pages, job.input_pdf)
+    if len(starts) <= 1:
+        return [job]
+
+    output_dir = output_dir or os.path.join(job.work_dir, f"_batch_{job.base_name}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    scan = fitz.open(job.input_pdf)
+    searchable = fitz.open(job.searchable_pdf)
+    parts = []
+    try:
+        # Pages ahead of the first marker stay with the first PO
+        bounds = [0] + [page for page, _ in starts[1:]] + [len(scan)]
+        for (_, po_number), first, end in zip(starts, bounds, bounds[1:]):
+            part_pdf = os.path.join(output_dir, f"{job.base_name}_{po_number}.pdf")
+            part_doc = fitz.open()
+            part_doc.insert_pdf(scan, from_page=first, to_page=end - 1)
+            part_doc.save(part_pdf, garbage=3, deflate=True)
+            part_doc.close()
+            part = POJob(part_pdf, work_dir=job.work_dir)
+            print(f"Batch: PO {po_number} = pages {first + 1}-{end}")
+
+            records = [dict(record, page=i + 1) for i, record in enumerate(job.ocr_pages[first:end])]
+            if _needs_ocr(records):
+                print(f"Batch: PO {po_number} pages were deferred by lazy OCR; OCR'ing its part")
+            else:
+                part_doc = fitz.open()
+                part_doc.insert_pdf(searchable, from_page=first, to_page=end - 1)
+                part.output_sizes["searchable"] = pdf_optimizer.save_optimized(part_doc, part.searchable_pdf)
+                part_doc.close()
+                part.ocr_artifact = save_ocr_artifact(artifact_path_for(part.searchable_pdf), records,
+                                                      source_pdf=os.path.basename(part_pdf))
+                part.ocr_pages = records
+                part.total_pages = len(records)
+                part.page_texts = page_texts(records)
+            parts.append(part)
+    finally:
+        scan.close()
+        searchable.close()
+
+    # The parts replace the whole-scan outputs
+    for path in (job.searchable_pdf, job.ocr_artifact):
+        if path and os.path.exists(path):
+            os.remove(path)
+    return parts
@@ -0,0 +1,266 @@
+"""
+Golden Corpus Benchmark
+Runs extract_po_details.extract_fields (the pipeline's field extraction, with
+per-extractor timings) over a corpus of saved PO texts / OCR artifacts with
+known-good values and reports per-field accuracy and per-extractor latency
+percentiles. Exits non-zero when accuracy or latency regresses against a saved
+baseline, so it can gate extractor changes. Runs offline: only the corpus files
+are read (no PDFs, OCR, FileMaker or Docker).
+
+Corpus layout, per document:
+    <name>_ocr.json  OCR artifact of the searchable PDF (as the OCR stage writes
+                     it); its word boxes exercise the line-item table reader
+    <name>.txt       or saved page text (extracted_text_comprehensive.txt format)
+    <name>.json      expected PO record fields, e.g. {"quantity": 50, "dock_date": "..."};
+                     only the fields present are scored
+
+The baseline (<corpus>/baseline.json unless --baseline is given) holds the
+per-field accuracy, the documents passing each field, each extractor's
+latency percentiles and the part number reference fingerprint. A regression
+is a document failing a field it passed in the baseline, or a median latency
+above the baseline's by more than --time-tolerance (plus a small fixed slack:
+sub-millisecond tail percentiles are too noisy to gate on). Baselines taken
+against a different part number reference are not compared.
+
+Usage:
+    python benchmark_corpus.py corpus_dir [--repeats N] [--baseline FILE]
+                               [--save-baseline] [--time-tolerance 0.5]
+                               [--bootstrap]
+
+--bootstrap writes <name>.json from the current extractor output for texts
+that have none; review them before relying on them.
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+
+import extract_po_details as details
+from extract_po_info import extract_page_count
+from ocr_artifact import format_page_texts, load_ocr_artifact, page_texts
+from reextract_po import ROUTER_HEADER, split_saved_text
+
+# Extra milliseconds a median may exceed its allowance by before counting as a regression
+TIME_SLACK_MS = 0.5
+ARTIFACT_SUFFIX = "_ocr.json"
+LATENCY_NAMES = ["document_index"] + list(details.EXTRACTOR_VERSIONS)
+
+
+def load_artifact_document(artifact_path):
+    """(text, router_text, table_pages) of an OCR artifact, split as the pipeline splits it"""
+    pages = load_ocr_artifact(artifact_path) or []
+    texts = page_texts(pages)
+    # Basic extraction takes the PO page count from the "Page 1 of N" footer
+    page_count = min(extract_page_count(texts[0]) or len(pages), len(pages)) if pages else 0
+    text = format_page_texts(texts[:page_count])
+    router_text = None
+    if len(pages) > page_count:
+        router_text = f"{ROUTER_HEADER}{texts[page_count]}\n\n"
+        text += router_text
+    return text, router_text, pages[:page_count]
+
+
+def load_corpus(corpus_dir):
+    """[(name, text, router_text, table_pages or None, expected fields or None)] sorted by name"""
+    sources = {}
+    for path in glob.glob(os.path.join(corpus_dir, "*.txt")):
+        sources[os.path.splitext(os.path.basename(path))[0]] = path
+    # An artifact wins over saved text: it carries the word boxes
+    for path in glob.glob(os.path.join(corpus_dir, f"*{ARTIFACT_SUFFIX}")):
+        sources[os.path.basename(path)[:-len(ARTIFACT_SUFFIX)]] = path
+
+    documents = []
+    for name, path in sorted(sources.items()):
+        if path.endswith(ARTIFACT_SUFFIX):
+            text, router_text, table_pages = load_artifact_document(path)
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                po_text, router_text = split_saved_text(f.read())
+            text, table_pages = po_text + (router_text or ""), None
+        expected = None
+        expected_path = os.path.join(corpus_dir, f"{name}.json")
+        if os.path.isfile(expected_path):
+            with open(expected_path, 'r', encoding='utf-8') as f:
+                expected = json.load(f)
+        documents.append((name, text, router_text, table_pages, expected))
+    return documents
+
+
+def run_document(text, router_text, table_pages):
+    """(fields as stored in JSON, {extractor: ms}) for one document"""
+    # Shared by the extractors: timed on its own so it is not charged to whichever runs first
+    start = time.perf_counter()
+    details.document_index(text)
+    if router_text:
+        details.document_index(router_text)
+    timings = {"document_index": (time.perf_counter() - start) * 1000.0}
+    # Extractors report their progress; keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        fields = details.extract_fields(text, router_text, table_pages, timings=timings)
+    del fields["extractor_versions"]
+    # Compare as stored: JSON turns tuples into lists and keys into strings
+    return json.loads(json.dumps(fields, default=str)), timings
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0..100)"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def evaluate(documents, repeats):
+    """Accuracy and latency report over the corpus documents with expected values"""
+    passing = {}   # field -> documents getting it right
+    scored = {}    # field -> documents expecting it
+    failures = []  # (document, field, expected, actual)
+    latencies = {name: [] for name in LATENCY_NAMES}
+
+    # Document index and part reference caches are per process: warm them up once
+    for _, text, router_text, table_pages, _ in documents[:1]:
+        run_document(text, router_text, table_pages)
+
+    for name, text, router_text, table_pages, expected in documents:
+        for _ in range(repeats):
+            # Cold document index each repeat: every PO is new to the pipeline
+            details.document_index.cache_clear()
+            actual, timings = run_document(text, router_text, table_pages)
+            for extractor, ms in timings.items():
+                latencies[extractor].append(ms)
+        for field, value in expected.items():
+            scored.setdefault(field, []).append(name)
+            if actual.get(field) == value:
+                passing.setdefault(field, []).append(name)
+            else:
+                failures.append((name, field, value, actual.get(field)))
+
+    return {
+        "accuracy": {field: len(passing.get(field, [])) / len(names) for field, names in scored.items()},
+        "passing": {field: sorted(passing.get(field, [])) for field in scored},
+        "scored": {field: len(names) for field, names in scored.items()},
+        "latency_ms": {
+            extractor: {
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p95": percentile(values, 95),
+                "max": max(values),
+            }
+            for extractor, values in latencies.items() if values
+        },
+        "failures": failures,
+    }
+
+
+def find_regressions(report, baseline, time_tolerance):
+    """Descriptions of accuracy / latency regressions against the baseline"""
+    regressions = []
+    for field, names in baseline.get("passing", {}).items():
+        now_passing = set(report["passing"].get(field, []))
+        scored = field in report["passing"]
+        for name in names:
+            if scored and name not in now_passing:
+                regressions.append(f"accuracy: {name} no longer gets {field} right")
+    for extractor, base in baseline.get("latency_ms", {}).items():
+        current = report["latency_ms"].get(extractor)
+        if current is None:
+            continue
+        allowed = base["p50"] * (1 + time_tolerance) + TIME_SLACK_MS
+        if current["p50"] > allowed:
+            regressions.append(f"latency: {extractor} median {current['p50']:.3f} ms "
+                               f"> {allowed:.3f} ms (baseline {base['p50']:.3f} ms)")
+    return regressions
+
+
+def bootstrap(corpus_dir, documents):
+    """Write expected JSON from the current output for texts without one"""
+    written = 0
+    for name, text, router_text, table_pages, expected in documents:
+        if expected is not None:
+            continue
+        actual, _ = run_document(text, router_text, table_pages)
+        with open(os.path.join(corpus_dir, f"{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump(actual, f, indent=2)
+        written += 1
+    print(f"Wrote {written} expected files from current output - review before using as golden values")
+
+
+def short(value, width=50):
+    text = json.dumps(value, default=str)
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extractor accuracy and latency over a golden corpus')
+    parser.add_argument('corpus', help='Directory of <name>_ocr.json artifacts / <name>.txt saved texts '
+                                       'and <name>.json expected fields')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per document')
+    parser.add_argument('--baseline', help='Baseline file (default <corpus>/baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+    parser.add_argument('--time-tolerance', type=float, default=0.5,
+                        help='Allowed median slowdown as a fraction of the baseline (default 0.5)')
+    parser.add_argument('--bootstrap', action='store_true', help='Write missing <name>.json from the current output')
+    args = parser.parse_args()
+
+    documents = load_corpus(args.corpus)
+    if not documents:
+        print(f"No corpus texts found in {args.corpus}")
+        sys.exit(2)
+    if args.bootstrap:
+        bootstrap(args.corpus, documents)
+        return
+    documents = [doc for doc in documents if doc[4] is not None]
+    if not documents:
+        print(f"No expected <name>.json files in {args.corpus} (see --bootstrap)")
+        sys.exit(2)
+
+    report = evaluate(documents, max(1, args.repeats))
+    # part_number (and router validation) depend on the reference list
+    report["part_reference"] = details.part_reference_fingerprint()
+    print(f"{len(documents)} documents, {args.repeats} repeats")
+    print("Accuracy:")
+    for field in sorted(report["accuracy"]):
+        print(f"  {field:<34} {100 * report['accuracy'][field]:6.1f}%  ({report['scored'][field]} docs)")
+    print("Latency (ms):")
+    print(f"  {'extractor':<34} {'p50':>8} {'p90':>8} {'p95':>8} {'max':>8}")
+    for extractor, stats in report["latency_ms"].items():
+        print(f"  {extractor:<34} {stats['p50']:8.3f} {stats['p90']:8.3f} {stats['p95']:8.3f} {stats['max']:8.3f}")
+    if report["failures"]:
+        print("Mismatches:")
+        for name, field, expected, actual in report["failures"]:
+            print(f"  {name} {field}: expected {short(expected)}, got {short(actual)}")
+
+    baseline_path = args.baseline or os.path.join(args.corpus, "baseline.json")
+    if args.save_baseline:
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump({key: report[key] for key in ("accuracy", "passing", "latency_ms", "part_reference")},
+                      f, indent=2)
+        print(f"Saved baseline: {baseline_path}")
+        return
+    if not os.path.isfile(baseline_path):
+        print(f"No baseline at {baseline_path}; run with --save-baseline to create one")
+        return
+
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get("part_reference") != report["part_reference"]:
+        recorded = baseline.get("part_reference")
+        print(f"Baseline was taken against a different part number reference "
+              f"({'unrecorded' if recorded is None else recorded or 'none'} vs {report['part_reference'] or 'none'}); "
+              f"not comparing. Re-run with --save-baseline once the results are reviewed")
+        sys.exit(2)
+    regressions = find_regressions(report, baseline, args.time_tolerance)
+    if regressions:
+        print(f"REGRESSIONS ({len(regressions)}):")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Field Extraction Benchmark
+Times the extract_po_details field extractors on saved page text, including
+the cost of building the shared DocumentIndex they read from.
+
+- "index" is one DocumentIndex build for the document
+- "warm" runs each extractor with the index already built (the pipeline case:
+  one build per job, shared by every extractor)
+- "cold" clears the index cache before every extractor, i.e. what each
+  extractor would pay if it re-split and re-cased the text on its own
+
+Inputs are text files or PO folders holding extracted_text_comprehensive.txt.
+
+Usage:
+    python benchmark_extraction.py text_or_folder [...] [--repeats N]
+"""
+
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+import extract_po_details as details
+from document_index import DocumentIndex, document_index
+
+TEXT_FILE = "extracted_text_comprehensive.txt"
+
+EXTRACTORS = [
+    ("production_order", lambda text: details.extract_production_order(text)),
+    ("revision", lambda text: details.extract_revision(text)),
+    ("part_number", lambda text: details.extract_part_number(text, details.extract_production_order(text))),
+    ("quantity_and_dock_date", lambda text: details.extract_quantity_and_dock_date(text)),
+    ("payment_terms", lambda text: details.extract_payment_terms(text)),
+    ("vendor_info", lambda text: details.extract_vendor_info(text)),
+    ("buyer_name", lambda text: details.extract_buyer_name(text)),
+    ("dpas_ratings", lambda text: details.extract_dpas_ratings(text)),
+    ("quality_clauses", lambda text: details.extract_quality_clauses(text)),
+    ("router_validation", lambda text: details.extract_router_validation_info(text)),
+]
+
+
+def load_texts(paths):
+    """[(name, text)] for every text file / PO folder given"""
+    texts = []
+    for path in paths:
+        if os.path.isdir(path):
+            path = os.path.join(path, TEXT_FILE)
+        if not os.path.isfile(path):
+            print(f"Skipping {path}: no text file")
+            continue
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            texts.append((os.path.basename(os.path.dirname(path)) or path, f.read()))
+    return texts
+
+
+def time_ms(func, *args):
+    start = time.perf_counter()
+    # Extractors print their progress; keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args)
+    return (time.perf_counter() - start) * 1000.0
+
+
+def run(texts, repeats):
+    """{label: [ms per document per repeat]} for the index build and each extractor warm/cold"""
+    results = {"index": []}
+    for name, _ in EXTRACTORS:
+        results[f"{name} warm"] = []
+        results[f"{name} cold"] = []
+    for _ in range(repeats):
+        for _, text in texts:
+            results["index"].append(time_ms(DocumentIndex, text))
+            for name, extractor in EXTRACTORS:
+                document_index.cache_clear()
+                results[f"{name} cold"].append(time_ms(extractor, text))
+                results[f"{name} warm"].append(time_ms(extractor, text))
+    return results
+
+
+def main():
+    args = sys.argv[1:]
+    repeats = 5
+    if "--repeats" in args:
+        position = args.index("--repeats")
+        repeats = int(args[position + 1])
+        del args[position:position + 2]
+    if not args:
+        print("Usage: python benchmark_extraction.py text_or_folder [...] [--repeats N]")
+        sys.exit(1)
+
+    texts = load_texts(args)
+    if not texts:
+        sys.exit(1)
+    print(f"{len(texts)} documents, {repeats} repeats")
+
+    results = run(texts, repeats)
+    print(f"  {'index build':<34} {statistics.median(results['index']):8.3f} ms")
+    warm_total = cold_total = 0.0
+    for name, _ in EXTRACTORS:
+        warm = statistics.median(results[f"{name} warm"])
+        cold = statistics.median(results[f"{name} cold"])
+        warm_total += warm
+        cold_total += cold
+        print(f"  {name:<34} {warm:8.3f} ms warm {cold:8.3f} ms cold")
+    print(f"  {'all extractors':<34} {warm_total:8.3f} ms warm {cold_total:8.3f} ms cold")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+OCR Engine Benchmark
+Compares per-call cost of pytesseract (fork/exec + temp files per call)
+with the warm tesserocr handles in ocr_engine.py
+
+- "overhead" is measured on a tiny blank image, where recognition work is
+  negligible and the time is almost entirely process start-up, traineddata
+  loading and image hand-off
+- "page" is measured on a real rendered page to show the end-to-end gain
+
+Usage:
+    python benchmark_ocr_engine.py input.pdf [calls]
+"""
+
+import statistics
+import sys
+import time
+
+import fitz
+import numpy as np
+from PIL import Image
+import pytesseract
+
+import ocr_engine
+
+CONFIGS = [
+    "--oem 3 --psm 6",
+    "--oem 3 --psm 4",
+]
+
+
+def time_calls(func, img, config, calls):
+    """Per-call wall-clock times in milliseconds"""
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        func(img, config=config)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return timings
+
+
+def summarize(label, timings):
+    print(f"  {label:<28} mean {statistics.mean(timings):8.1f} ms   "
+          f"median {statistics.median(timings):8.1f} ms   min {min(timings):8.1f} ms")
+    return statistics.median(timings)
+
+
+def render_page(pdf_path, page_num=0, scale=3):
+    doc = fitz.open(pdf_path)
+    pix = doc[page_num].get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, alpha=False)
+    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    doc.close()
+    return img
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python benchmark_ocr_engine.py input.pdf [calls]")
+        sys.exit(1)
+
+    pdf_path = sys.argv[1]
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    tiny = Image.fromarray(np.full((32, 64), 255, dtype=np.uint8))
+    page = render_page(pdf_path)
+
+    print(f"OCR engine backend: {ocr_engine.backend_name()}")
+    print(f"Calls per measurement: {calls} (page: {max(1, calls // 5)})")
+
+    for config in CONFIGS:
+        print(f"\nConfig: {config}")
+        before = summarize("pytesseract overhead", time_calls(pytesseract.image_to_string, tiny, config, calls))
+        # First engine call initialises the handle; keep it out of the numbers
+        ocr_engine.image_to_string(tiny, config=config)
+        after = summarize("ocr_engine overhead", time_calls(ocr_engine.image_to_string, tiny, config, calls))
+        print(f"  per-call overhead saved: {before - after:.1f} ms ({before / max(after, 0.001):.1f}x)")
+
+        page_calls = max(1, calls // 5)
+        before = summarize("pytesseract page", time_calls(pytesseract.image_to_string, page, config, page_calls))
+        after = summarize("ocr_engine page", time_calls(ocr_engine.image_to_string, page, config, page_calls))
+        print(f"  per-page time saved: {before - after:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
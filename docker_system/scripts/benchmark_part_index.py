@@ -0,0 +1,98 @@
+"""
+Part Number Index Benchmark
+Compares fuzzy part-number lookup with difflib.get_close_matches over the
+whole reference set (the old validate_part_number_with_reference step 3)
+against the part_index.PartNumberIndex lookup, for growing catalog sizes.
+
+Catalogs are synthetic part numbers in the PartNumbers.xlsx formats
+(970000-101, WA904-8, KITF1116-1); queries are catalog parts with one OCR
+confusion or one random edit.
+
+Usage:
+    python benchmark_part_index.py [size ...] [--queries N]
+"""
+
+import random
+import statistics
+import string
+import sys
+import time
+from difflib import get_close_matches
+
+from part_index import CONFUSABLE, PartNumberIndex
+
+DEFAULT_SIZES = [1000, 10000, 50000]
+REVERSE_CONFUSABLE = {digit: letter for letter, digit in CONFUSABLE.items()}
+
+
+def make_catalog(size, rng):
+    parts = set()
+    while len(parts) < size:
+        kind = rng.random()
+        if kind < 0.5:
+            parts.add(f"{rng.randint(100000, 999999)}-{rng.randint(1, 999)}")
+        elif kind < 0.8:
+            letters = "".join(rng.choice(string.ascii_uppercase) for _ in range(2))
+            parts.add(f"{letters}{rng.randint(100, 9999)}-{rng.randint(1, 99)}")
+        else:
+            parts.add(f"KITF{rng.randint(1000, 9999)}-{rng.randint(1, 9)}")
+    return sorted(parts)
+
+
+def make_query(part, rng):
+    """part with one OCR confusion, else one random substitution"""
+    positions = [i for i, c in enumerate(part) if c in CONFUSABLE or c in REVERSE_CONFUSABLE]
+    if positions and rng.random() < 0.7:
+        i = rng.choice(positions)
+        swap = CONFUSABLE.get(part[i]) or REVERSE_CONFUSABLE[part[i]]
+        return part[:i] + swap + part[i + 1:]
+    i = rng.randrange(len(part))
+    return part[:i] + rng.choice(string.digits) + part[i + 1:]
+
+
+def time_lookups(func, queries):
+    """(median microseconds per lookup, results)"""
+    timings = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(func(query))
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings), results
+
+
+def main():
+    args = sys.argv[1:]
+    query_count = 200
+    if "--queries" in args:
+        position = args.index("--queries")
+        query_count = int(args[position + 1])
+        del args[position:position + 2]
+    sizes = [int(a) for a in args] or DEFAULT_SIZES
+
+    rng = random.Random(42)
+    for size in sizes:
+        catalog = make_catalog(size, rng)
+        catalog_set = set(catalog)
+        targets = rng.sample(catalog, min(query_count, size))
+        queries = [make_query(part, rng) for part in targets]
+
+        start = time.perf_counter()
+        index = PartNumberIndex(catalog)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        index_us, index_results = time_lookups(lambda q: index.lookup(q, limit=1), queries)
+        # difflib is slow on big catalogs: time a sample of the queries
+        difflib_queries = queries[:max(1, min(len(queries), 2000000 // size))]
+        difflib_us, difflib_results = time_lookups(
+            lambda q: get_close_matches(q, catalog_set, n=1, cutoff=0.85), difflib_queries)
+
+        index_hits = sum(1 for r, t in zip(index_results, targets) if r and r[0][0] == t)
+        difflib_hits = sum(1 for r, t in zip(difflib_results, targets) if r and r[0] == t)
+        print(f"{size:>7} parts  build {build_ms:7.1f} ms   "
+              f"index {index_us:9.1f} us/lookup ({100 * index_hits / len(queries):.0f}% correct)   "
+              f"difflib {difflib_us:9.1f} us/lookup ({100 * difflib_hits / len(difflib_queries):.0f}% correct)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Preprocessing Profile Report
+Runs every preprocessing profile (or the ones named) over the pages of a PDF
+and reports, per profile, the time spent in each step, the OCR time and the
+first-pass OCR quality (mean word confidence, words per page and how many
+pages pass the ocr_strategy "good enough" thresholds).
+
+The cheapest profile that keeps as many pages good as the best one is
+printed as the recommendation for PREPROCESS_PROFILE. The OCR cache is
+bypassed so every run really calls Tesseract.
+
+Usage:
+    python benchmark_preprocessing.py input.pdf [profile ...]
+"""
+
+import sys
+import time
+
+import fitz
+
+import ocr_cache
+import ocr_engine
+import ocr_strategy
+import preprocessing
+from ocr_pdf_searchable import detect_orientation_fast, render_page_images, rotate_image
+
+OCR_CONFIG = "--oem 3 --psm 6"
+
+
+def oriented_pages(pdf_path):
+    """Oriented OCR rasters of every non-blank page"""
+    doc = fitz.open(pdf_path)
+    pages = []
+    for page in doc:
+        img, thumb, _ = render_page_images(page)
+        if img is None:
+            continue
+        angle, _ = detect_orientation_fast(thumb, img)
+        pages.append(rotate_image(img, angle).copy())
+    doc.close()
+    return pages
+
+
+def run_profile(pages, profile):
+    """Per-step seconds, OCR seconds and per-page (mean_conf, anchors, words, good)"""
+    step_seconds = {}
+    ocr_seconds = 0.0
+    quality = []
+    for page_num, img in enumerate(pages):
+        processed, prep = preprocessing.run_profile(img.copy(), profile)
+        for step, seconds in prep["timings"].items():
+            step_seconds[step] = step_seconds.get(step, 0.0) + seconds
+        t0 = time.perf_counter()
+        data = ocr_engine.image_to_data(processed, config=OCR_CONFIG)
+        ocr_seconds += time.perf_counter() - t0
+        text = ocr_strategy.text_from_data(data)
+        mean_conf, anchors, words = ocr_strategy.score_result(data, text, "po")
+        # Only the first page is expected to carry the PO anchors
+        good = (mean_conf >= ocr_strategy.MIN_MEAN_CONF and words >= ocr_strategy.MIN_WORDS
+                and (anchors > 0 or page_num > 0))
+        quality.append((mean_conf, anchors, words, good))
+    return step_seconds, ocr_seconds, quality
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python benchmark_preprocessing.py input.pdf [profile ...]")
+        sys.exit(1)
+
+    pdf_path = sys.argv[1]
+    profiles = sys.argv[2:] or list(preprocessing.PROFILES)
+    ocr_cache._disabled = True
+
+    pages = oriented_pages(pdf_path)
+    n = len(pages)
+    print(f"{n} pages, profiles: {', '.join(profiles)}")
+
+    rows = []
+    for profile in profiles:
+        if profile not in preprocessing.PROFILES:
+            print(f"Skipping unknown profile '{profile}'")
+            continue
+        step_seconds, ocr_seconds, quality = run_profile(pages, profile)
+        pre_ms = sum(step_seconds.values()) * 1000 / n
+        ocr_ms = ocr_seconds * 1000 / n
+        mean_conf = sum(q[0] for q in quality) / n
+        words = sum(q[2] for q in quality) / n
+        good = sum(1 for q in quality if q[3])
+        rows.append((profile, pre_ms, ocr_ms, good))
+
+        steps = "  ".join(f"{step} {seconds * 1000 / n:.1f}" for step, seconds in step_seconds.items())
+        print(f"\n[{profile}]  preprocess {pre_ms:.1f} ms/page  ({steps})")
+        print(f"  OCR {ocr_ms:.1f} ms/page   mean conf {mean_conf:.1f}   "
+              f"words/page {words:.0f}   good first pass {good}/{n}")
+
+    if not rows:
+        return
+    best_good = max(r[3] for r in rows)
+    cheapest = min((r for r in rows if r[3] == best_good), key=lambda r: r[1] + r[2])
+    print(f"\nRecommended PREPROCESS_PROFILE={cheapest[0]} "
+          f"({cheapest[1] + cheapest[2]:.0f} ms/page, {best_good}/{n} pages good)")
+
+
+if __name__ == "__main__":
+    main()
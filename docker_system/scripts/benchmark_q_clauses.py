@@ -0,0 +1,138 @@
+"""
+Q Clause Extraction Benchmark
+Compares extract_po_details.extract_quality_clauses (shared table loaded once,
+single-pass q_clauses.scan_clauses) with the previous implementation, which
+rebuilt the classification dict on every call and searched the document again
+for every clause it did not know. Also checks both return the same result.
+
+Inputs are text files or PO folders holding extracted_text_comprehensive.txt.
+
+Usage:
+    python benchmark_q_clauses.py text_or_folder [...] [--repeats N]
+"""
+
+import re
+import statistics
+import sys
+
+import extract_po_details as details
+from benchmark_extraction import load_texts, time_ms
+from document_index import document_index
+
+
+def previous_extract_quality_clauses(text):
+    """extract_quality_clauses before the shared table / scanner"""
+    quality_clauses = {}
+
+    q_clause_classification = {
+        "auto_accept": {
+            "Q1": {"description": "QUALITY SYSTEMS REQUIREMENTS", "timesheet_impact": False, "action": "ACCEPT", "notes": "Standard quality compliance"},
+            "Q5": {"description": "CERTIFICATION OF CONFORMANCE AND RECORD RETENTION", "timesheet_impact": False, "action": "ACCEPT", "notes": "Standard COC"},
+            "Q26": {"description": "PACKING FOR SHIPMENT", "timesheet_impact": False, "action": "ACCEPT", "notes": "Standard packing"}
+        },
+        "review_required": {
+            "Q2": {"description": "SURVEILLANCE BY MEGGITT AND RIGHT OF ENTRY", "timesheet_impact": True, "action": "REVIEW", "notes": "Customer access required", "alert_level": "MEDIUM"},
+            "Q9": {"description": "CORRECTIVE ACTION", "timesheet_impact": True, "action": "REVIEW", "notes": "CA documentation required", "alert_level": "MEDIUM"},
+            "Q11": {"description": "SPECIAL PROCESS SOURCES REQUIRED", "timesheet_impact": True, "action": "REVIEW", "notes": "Verify certifications", "alert_level": "HIGH"},
+            "Q13": {"description": "REPORT OF DISCREPANCY # Quality Notification (QN)", "timesheet_impact": True, "action": "REVIEW", "notes": "QN reporting required", "alert_level": "HIGH"},
+            "Q14": {"description": "FOREIGN OBJECT DAMAGE (FOD)", "timesheet_impact": True, "action": "REVIEW", "notes": "FOD prevention measures", "alert_level": "MEDIUM"}
+        },
+        "object_to": {
+            "Q15": {"description": "ANTI-TERRORIST POLICY", "timesheet_impact": False, "action": "OBJECT", "notes": "Standard objection", "alert_level": "HIGH"},
+            "Q32": {"description": "FLOWDOWN OF REQUIREMENTS [QUALITY AND ENVIRONMENTAL]", "timesheet_impact": False, "action": "OBJECT", "notes": "Flowdown too broad", "alert_level": "HIGH"},
+            "Q33": {"description": "FAR and DOD FAR SUPPLEMENTAL FLOWDOWN PROVISIONS", "timesheet_impact": False, "action": "OBJECT", "notes": "FAR inappropriate for commercial", "alert_level": "CRITICAL"}
+        }
+    }
+
+    known_clauses = {}
+    for category, clauses in q_clause_classification.items():
+        for q_number, info in clauses.items():
+            known_clauses[q_number] = info["description"]
+
+    index = document_index(text)
+    q_numbers_found = re.findall(r'(Q\d+)', index.upper)
+
+    seen = set()
+    unique_q_numbers = []
+    for q in q_numbers_found:
+        if q not in seen:
+            seen.add(q)
+            unique_q_numbers.append(q)
+
+    for q_number in unique_q_numbers:
+        if q_number in known_clauses:
+            quality_clauses[q_number] = known_clauses[q_number]
+        else:
+            lines = index.lines
+            for i in index.find_lines(q_number, 'upper')[:1]:
+                line = lines[i]
+                description_parts = []
+                remaining = line.split(q_number, 1)
+                if len(remaining) > 1:
+                    desc = remaining[1].strip()
+                    if desc:
+                        description_parts.append(desc)
+
+                for j in range(i + 1, min(i + 3, len(lines))):
+                    next_line = lines[j].strip()
+                    if next_line and not re.match(r'^Q\d+', next_line.upper()) and len(next_line) < 60:
+                        description_parts.append(next_line)
+                    else:
+                        break
+
+                if description_parts:
+                    quality_clauses[q_number] = ' '.join(description_parts).strip()
+
+    q_clause_analysis = details.classify_q_clauses_for_business(quality_clauses, q_clause_classification)
+    return {
+        'raw_clauses': list(quality_clauses.keys()),
+        'quality_clauses_dict': quality_clauses,
+        'classified_clauses': q_clause_analysis,
+        'summary': q_clause_analysis.get('summary', {}),
+        'overall_status': q_clause_analysis.get('action_required', False)
+    }
+
+
+IMPLEMENTATIONS = [
+    ("previous", previous_extract_quality_clauses),
+    ("scanner", details.extract_quality_clauses),
+]
+
+
+def main():
+    args = sys.argv[1:]
+    repeats = 20
+    if "--repeats" in args:
+        position = args.index("--repeats")
+        repeats = int(args[position + 1])
+        del args[position:position + 2]
+    if not args:
+        print("Usage: python benchmark_q_clauses.py text_or_folder [...] [--repeats N]")
+        sys.exit(1)
+
+    texts = load_texts(args)
+    if not texts:
+        sys.exit(1)
+
+    mismatches = [name for name, text in texts
+                  if previous_extract_quality_clauses(text) != details.extract_quality_clauses(text)]
+    for name in mismatches:
+        print(f"MISMATCH: {name}")
+
+    timings = {label: [] for label, _ in IMPLEMENTATIONS}
+    for _ in range(repeats):
+        for _, text in texts:
+            for label, func in IMPLEMENTATIONS:
+                # Include the document index build, as the first extractor of a job pays it
+                document_index.cache_clear()
+                timings[label].append(time_ms(func, text))
+
+    print(f"{len(texts)} documents, {repeats} repeats, {len(mismatches)} mismatches")
+    for label, _ in IMPLEMENTATIONS:
+        print(f"  {label:<10} {statistics.median(timings[label]):8.3f} ms median "
+              f"{max(timings[label]):8.3f} ms max")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Text Layer Benchmark
+Compares the per-word insert_text loop with the batched TextWriter layer used
+by pdf_to_searchable: write time and output PDF size.
+
+Word boxes come from the PDF's OCR artifact when one exists next to it,
+otherwise from the PDF's own text layer (so no Tesseract is needed).
+
+Usage:
+    python benchmark_text_layer.py input.pdf [repeats]
+"""
+
+import statistics
+import sys
+import time
+
+import fitz
+
+from ocr_artifact import artifact_path_for, load_ocr_artifact, word_rows
+from ocr_pdf_searchable import write_text_layer
+
+# Image pixels per PDF point for words taken from the text layer
+WORD_SCALE = 3
+
+
+def load_page_words(pdf_path):
+    """[(page_rect, words, scale_x, scale_y)] for every page"""
+    doc = fitz.open(pdf_path)
+    artifact = load_ocr_artifact(artifact_path_for(pdf_path))
+    pages = []
+    for page_num, page in enumerate(doc):
+        if artifact and page_num < len(artifact):
+            record = artifact[page_num]
+            words = word_rows(record)
+            scale_x = record["pdf_width"] / record["image_width"]
+            scale_y = record["pdf_height"] / record["image_height"]
+        else:
+            words = [[w[4], w[0] * WORD_SCALE, w[1] * WORD_SCALE,
+                      (w[2] - w[0]) * WORD_SCALE, (w[3] - w[1]) * WORD_SCALE, 90]
+                     for w in page.get_text("words")]
+            scale_x = scale_y = 1 / WORD_SCALE
+        pages.append((fitz.Rect(page.rect), words, scale_x, scale_y))
+    doc.close()
+    return pages
+
+
+def run(pages, batched):
+    """Build a document with text layers only; returns (seconds, pdf bytes)"""
+    out = fitz.open()
+    start = time.perf_counter()
+    for rect, words, scale_x, scale_y in pages:
+        page = out.new_page(width=rect.width, height=rect.height)
+        write_text_layer(page, words, scale_x, scale_y, batched=batched)
+    elapsed = time.perf_counter() - start
+    size = len(out.tobytes(garbage=3, deflate=True))
+    out.close()
+    return elapsed, size
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python benchmark_text_layer.py input.pdf [repeats]")
+        sys.exit(1)
+
+    pdf_path = sys.argv[1]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    pages = load_page_words(pdf_path)
+    word_total = sum(len(p[1]) for p in pages)
+    print(f"{len(pages)} pages, {word_total} words, {repeats} repeats")
+
+    results = {}
+    for label, batched in (("per-word insert_text", False), ("TextWriter per page", True)):
+        runs = [run(pages, batched) for _ in range(repeats)]
+        seconds = statistics.median(r[0] for r in runs)
+        size = runs[0][1]
+        results[label] = (seconds, size)
+        print(f"  {label:<22} {seconds * 1000 / len(pages):8.1f} ms/page   {size / 1024:8.1f} KB")
+
+    (old_s, old_size), (new_s, new_size) = results.values()
+    print(f"Speed-up: {old_s / max(new_s, 1e-9):.1f}x   size saved: {(old_size - new_size) / 1024:.1f} KB "
+          f"({100 * (old_size - new_size) / max(old_size, 1):.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
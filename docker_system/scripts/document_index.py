@@ -0,0 +1,91 @@
+"""
+Document index shared by the field extractors
+Built once per document text: lines with their character offsets, upper and
+lower case copies, "PAGE N:" page boundaries and an inverted index from
+tokens to the lines holding them, so extractors jump straight to their anchor
+lines instead of each re-splitting and rescanning the whole text.
+
+document_index(text) returns the index for a text, reusing the one built for
+the same text by an earlier extractor.
+"""
+
+import bisect
+import re
+from functools import lru_cache
+
+TOKEN_RE = re.compile(r'[A-Z0-9]+')
+PAGE_HEADER_RE = re.compile(r'^(?:PAGE (\d+)|FIRST ROUTER PAGE):$')
+
+
+class DocumentIndex:
+    """Read-only views of one document text for the extractors"""
+
+    def __init__(self, text):
+        self.text = text
+        self.upper = text.upper()
+        self.lower = text.lower()
+        self.lines = text.split('\n')
+        self.upper_lines = [line.upper() for line in self.lines]
+        self.lower_lines = [line.lower() for line in self.lines]
+
+        # Offset of each line's first character in text
+        self.line_offsets = []
+        offset = 0
+        for line in self.lines:
+            self.line_offsets.append(offset)
+            offset += len(line) + 1
+
+        # (page label, first line) for each "PAGE N:" / "FIRST ROUTER PAGE:" header
+        self.pages = []
+        tokens = {}
+        for number, line in enumerate(self.upper_lines):
+            header = PAGE_HEADER_RE.match(line)
+            if header:
+                self.pages.append((header.group(1) or "router", number))
+            for token in set(TOKEN_RE.findall(line)):
+                tokens.setdefault(token, []).append(number)
+        self.tokens = tokens
+
+    def line_at(self, offset):
+        """Line number holding the character at offset"""
+        return bisect.bisect_right(self.line_offsets, offset) - 1
+
+    def page_of(self, line_number):
+        """Page label ("1", "2", ..., "router") of a line, or None before the first header"""
+        starts = [start for _, start in self.pages]
+        position = bisect.bisect_right(starts, line_number) - 1
+        return self.pages[position][0] if position >= 0 else None
+
+    def lines_with_token(self, *tokens):
+        """Sorted numbers of the lines holding any of the (upper case) tokens as a whole token"""
+        if len(tokens) == 1:
+            return self.tokens.get(tokens[0], [])
+        found = set()
+        for token in tokens:
+            found.update(self.tokens.get(token, ()))
+        return sorted(found)
+
+    def find_lines(self, needle, case="exact"):
+        """Sorted numbers of the lines containing needle; case is "exact", "upper" or "lower" """
+        haystack = {"exact": self.text, "upper": self.upper, "lower": self.lower}[case]
+        if not needle or '\n' in needle:
+            return []
+        if len(haystack) != len(self.text):
+            # Case mapping changed some lengths (e.g. "ß" -> "SS"): offsets no longer line up
+            lines = {"upper": self.upper_lines, "lower": self.lower_lines}[case]
+            return [number for number, line in enumerate(lines) if needle in line]
+        found = []
+        position = haystack.find(needle)
+        while position != -1:
+            line = self.line_at(position)
+            found.append(line)
+            # Continue on the next line: one hit per line is enough
+            next_start = self.line_offsets[line + 1] if line + 1 < len(self.lines) else len(haystack)
+            position = haystack.find(needle, next_start)
+        return found
+
+
+@lru_cache(maxsize=4)
+def document_index(text):
+    """Index of text (the PO text and router text of a job stay cached together)"""
+    return DocumentIndex(text)
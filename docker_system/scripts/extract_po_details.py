@@ -3,38 +3,79 @@ Extract detailed information from PO PDF file
 """
 
 import fitz
-import pytesseract
-from PIL import Image
-import io
+import layout_templates
+import ocr_strategy
+import part_index
+import part_snapshot
+import preprocessing
+import q_clauses
+import raster
+import table_reader
+from document_index import document_index
+import hashlib
 import re
 import json
 import os
+import time
 from pathlib import Path
 
+from ocr_artifact import artifact_path_for, format_page_texts, load_ocr_artifact, page_texts
+from po_job import StageError
+
+# Unit-of-measure tokens marking line-item rows
+UNIT_TOKENS = ("EA", "LBS", "PCS", "EACH", "PIECE", "PIECES")
+
 # Use system tesseract in container (no hardcoded Windows path)
 
+PART_NUMBERS_PATH = "/app/docs/PartNumbers.xlsx"
+
+# Version of each field extractor, stored with an input fingerprint in the PO
+# record ("extractor_versions"). Bump a version when the extractor's output for
+# the same input can change: extract_fields then recomputes only that
+# extractor's fields (and fields computed from them) on the next run.
+EXTRACTOR_VERSIONS = {
+    "production_order": 1,
+    "revision": 1,
+    "part_number": 1,
+    "quantity_and_dock_date": 1,
+    "payment_terms": 1,
+    "vendor_info": 1,
+    "buyer_name": 1,
+    "dpas_ratings": 1,
+    "quality_clauses": 1,
+    "router_info": 1,
+    "router_validation": 1,
+}
+
+# extract_router_validation_info keys -> PO record fields
+ROUTER_INFO_FIELDS = {
+    "router_part_number": "router_part_number",
+    "router_order_number": "router_order_number",
+    "router_doc_rev": "router_doc_rev",
+    "router_proc_rev": "router_proc_rev",  # NEW FIELD
+    "extraction_success": "router_extraction_success",
+}
+
 # Global cache for part numbers validation
 _PART_NUMBERS_CACHE = None
 _PART_TO_FULL_CACHE = None
+_PART_INDEX_CACHE = None
+_PART_REFERENCE_HASH = None  # part_reference_fingerprint() the caches were loaded for
 
 def load_part_numbers_for_validation():
-    """Load part numbers from Excel file for validation (with caching)"""
-    global _PART_NUMBERS_CACHE, _PART_TO_FULL_CACHE
+    """Load part numbers for validation from the precompiled snapshot (cached until the spreadsheet changes)"""
+    global _PART_NUMBERS_CACHE, _PART_TO_FULL_CACHE, _PART_INDEX_CACHE, _PART_REFERENCE_HASH
     
+    reference_hash = part_reference_fingerprint()
     if _PART_NUMBERS_CACHE is not None:
-        return _PART_NUMBERS_CACHE, _PART_TO_FULL_CACHE
+        if reference_hash == _PART_REFERENCE_HASH:
+            return _PART_NUMBERS_CACHE, _PART_TO_FULL_CACHE
+        print("Part number reference changed, reloading")
+        _PART_NUMBERS_CACHE = _PART_TO_FULL_CACHE = _PART_INDEX_CACHE = None
+    _PART_REFERENCE_HASH = reference_hash
         
     try:
-        # Try to import openpyxl for Excel reading
-        try:
-            from openpyxl import load_workbook
-        except ImportError:
-            print("Info: openpyxl not available, part number validation disabled")
-            _PART_NUMBERS_CACHE = set()
-            _PART_TO_FULL_CACHE = {}
-            return _PART_NUMBERS_CACHE, _PART_TO_FULL_CACHE
-            
-        excel_path = "/app/docs/PartNumbers.xlsx"
+        excel_path = PART_NUMBERS_PATH
         
         if not os.path.exists(excel_path):
             print(f"Warning: Part numbers file not found at {excel_path}")
@@ -42,30 +83,18 @@ def load_part_numbers_for_validation():
             _PART_TO_FULL_CACHE = {}
             return _PART_NUMBERS_CACHE, _PART_TO_FULL_CACHE
             
-        # Load Excel file with openpyxl
-        workbook = load_workbook(excel_path, read_only=True)
-        worksheet = workbook.active
-        
-        part_numbers = set()
-        part_to_full = {}
-        
-        # Assume first row is headers, start from row 2
-        for row in worksheet.iter_rows(min_row=2, values_only=True):
-            if row and row[0]:  # Check if first column (Part Number) has data
-                full_part = str(row[0]).strip()
-                if '*' in full_part:
-                    clean_part = full_part.split('*')[0].upper().strip()
-                else:
-                    clean_part = full_part.upper().strip()
-                
-                part_numbers.add(clean_part)
-                part_to_full[clean_part] = full_part
-        
-        workbook.close()
+        # Snapshot is rebuilt from the spreadsheet only when the spreadsheet changed
+        part_numbers, part_to_full, index = part_snapshot.load_reference(excel_path)
         _PART_NUMBERS_CACHE = part_numbers
         _PART_TO_FULL_CACHE = part_to_full
-        print(f"Loaded {len(part_numbers)} part numbers for validation from Excel")
+        _PART_INDEX_CACHE = index
+        print(f"Loaded {len(part_numbers)} part numbers for validation")
         
+    except ImportError:
+        # Only rebuilding the snapshot from the spreadsheet needs openpyxl
+        print("Info: openpyxl not available to rebuild the part number snapshot, part number validation disabled")
+        _PART_NUMBERS_CACHE = set()
+        _PART_TO_FULL_CACHE = {}
     except Exception as e:
         print(f"Warning: Could not load part numbers for validation: {e}")
         _PART_NUMBERS_CACHE = set()
@@ -73,6 +102,15 @@ def load_part_numbers_for_validation():
         
     return _PART_NUMBERS_CACHE, _PART_TO_FULL_CACHE
 
+def load_part_number_index():
+    """Fuzzy lookup index over the reference part numbers (from the snapshot when available)"""
+    global _PART_INDEX_CACHE
+    if _PART_INDEX_CACHE is None:
+        part_numbers, _ = load_part_numbers_for_validation()
+        if _PART_INDEX_CACHE is None:
+            _PART_INDEX_CACHE = part_index.PartNumberIndex(part_numbers)
+    return _PART_INDEX_CACHE
+
 def fix_common_ocr_errors(text):
     """Fix common OCR character recognition errors in part numbers"""
     if not text:
@@ -143,17 +181,16 @@ def validate_part_number_with_reference(ocr_part_number):
             corrected_full = candidate.upper() + original_op_part
             return corrected_full, 0.95, f"OCR correction: {clean_part} → {candidate.upper()}"
             
-    # 3. Fuzzy matching for close matches
-    from difflib import get_close_matches
+    # 3. Fuzzy matching: one edit plus OCR confusions (part_index)
     try:
-        close_matches = get_close_matches(clean_part, part_numbers, n=3, cutoff=0.85)
+        close_matches = load_part_number_index().lookup(clean_part, limit=1)
         if close_matches:
-            best_match = close_matches[0]
+            best_match, distance = close_matches[0]
             # Use original OP code, not database OP code
             corrected_full = best_match + original_op_part
-            return corrected_full, 0.8, f"Fuzzy match: {clean_part} → {best_match}"
-    except:
-        pass
+            return corrected_full, 0.8, f"Fuzzy match: {clean_part} → {best_match} (distance {distance})"
+    except Exception as e:
+        print(f"Warning: Fuzzy part number lookup failed: {e}")
         
     # 4. Return original if no match found
     return ocr_part_number, 0.3, f"No match found in reference database"
@@ -162,6 +199,8 @@ def extract_text_from_pdf(pdf_path):
     """Extract all text from PDF using OCR with better accuracy - processes ALL pages in the PDF"""
     doc = fitz.open(pdf_path)
     all_text = ""
+    template = None
+    template_checked = False
     
     # Process EVERY page in the PDF (this already scanned all pages)
     for page_num in range(len(doc)):
@@ -170,52 +209,24 @@ def extract_text_from_pdf(pdf_path):
         # Try to extract text directly first
         page_text = page.get_text()
         
-        # If no text found or minimal text, use OCR
-        if len(page_text.strip()) < 50:
-            # Use adaptive resolution based on source quality
-            # For 300dpi scans, use higher scaling; for 600dpi, moderate scaling
-            matrices = [
-                fitz.Matrix(4, 4),  # Higher res for 300dpi scans
-                fitz.Matrix(3, 3),  # Standard high res
-                fitz.Matrix(2, 2)   # Lower res for already high-quality scans
-            ]
+        # If no text found or minimal text, use OCR (blank backs/separators skipped)
+        if len(page_text.strip()) < 50 and not preprocessing.is_blank(raster.render_gray(page, scale=1)):
+            ocr_text, info = ocr_strategy.ocr_page(page, profile="po")
+            if info.get("calls"):
+                print(f"Page {page_num + 1}: OCR {info.get('candidate')} "
+                      f"(conf {info.get('mean_conf')}, anchors {info.get('anchors')}, calls {info['calls']})")
+            page_text = ocr_text if ocr_text else page_text
             
-            best_text = ""
-            best_length = 0
-            
-            for matrix in matrices:
-                try:
-                    pix = page.get_pixmap(matrix=matrix)
-                    img_data = pix.tobytes("png")
-                    img = Image.open(io.BytesIO(img_data)).convert('L')
-                    
-                    # Enhanced OCR configs for different scan qualities
-                    configs = [
-                        r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz/-*().,: ',
-                        r'--oem 3 --psm 4',
-                        r'--oem 3 --psm 3',
-                        r'--oem 1 --psm 6',  # Legacy engine for difficult scans
-                        r'--oem 2 --psm 6'   # Cube engine
-                    ]
-                    
-                    for config in configs:
-                        try:
-                            ocr_text = pytesseract.image_to_string(img, config=config)
-                            if len(ocr_text) > best_length:
-                                best_text = ocr_text
-                                best_length = len(ocr_text)
-                        except:
-                            continue
-                    
-                    # If we got decent results, don't try more matrices
-                    if best_length > 200:
-                        break
-                        
-                except Exception as e:
-                    print(f"OCR matrix {matrix} failed: {e}")
-                    continue
-            
-            page_text = best_text if best_text else page_text
+            # Known PO form: its zones, each read at its own settings, follow the page text
+            if not template_checked and layout_templates.ZONE_OCR:
+                template = layout_templates.match_template(page)
+                template_checked = True
+                if template:
+                    print(f"Layout template: {template['name']}")
+            if template:
+                zone_text = layout_templates.ocr_page_zones(page, template, first_page=(page_num == 0))
+                if zone_text:
+                    page_text = page_text.rstrip("\n") + "\n\n" + zone_text
         
         all_text += f"PAGE {page_num + 1}:\n{page_text}\n\n"
     
@@ -268,25 +279,78 @@ def extract_part_number(text, production_order):
     if not production_order:
         return None
     
-    lines = text.split('\n')
+    index = document_index(text)
+    lines = index.lines
     
-    # Look for production order and then search nearby lines for part number
+    # Jump to the production order's line and search nearby lines for part number
     # Enhanced to work with comprehensive text from multiple sections
-    for i, line in enumerate(lines):
-        if production_order in line:
-            # Search in a wider context around the production order
-            start_idx = max(0, i-15)  # Increased search range for comprehensive text
-            end_idx = min(len(lines), i+10)
-            context_lines = lines[start_idx:end_idx]
+    for i in index.find_lines(production_order):
+        # Search in a wider context around the production order
+        start_idx = max(0, i-15)  # Increased search range for comprehensive text
+        end_idx = min(len(lines), i+10)
+        context_lines = lines[start_idx:end_idx]
+        
+        # Pattern 1: Support both digit-digit (157710-30) and alpha+digits with optional dash (WA904-8)
+        for j, context_line in enumerate(context_lines):
+            # Look for part with OP on same line first
+            dash_pattern_match = re.search(r'(?:\b(\d+[-_]\d+)\b|\b([A-Z]{1,4}\d{2,6}(?:[-_]\d{1,3})?)\b)\s*[*]?([Oo]p\d+)', context_line, re.IGNORECASE)
+            if dash_pattern_match:
+                part_base = dash_pattern_match.group(1) or dash_pattern_match.group(2)
+                part_base = part_base.upper()
+                op_part = dash_pattern_match.group(3).upper()
+                raw_part = f"{part_base}*{op_part}"
+                
+                # Use database validation first (includes OCR corrections)
+                validated_part, confidence, correction_info = validate_part_number_with_reference(raw_part)
+                if confidence > 0.8:  # High confidence correction from database
+                    print(f"Part number validation: {raw_part} → {validated_part} ({correction_info})")
+                    return validated_part
+                
+                # Fallback to simple OCR corrections if database validation failed
+                corrected_candidates = fix_common_ocr_errors(part_base)
+                if corrected_candidates and len(corrected_candidates) > 1:
+                    # Use the first corrected candidate (after the original)
+                    corrected_part = f"{corrected_candidates[1]}*{op_part}"
+                    print(f"OCR correction applied: {raw_part} → {corrected_part}")
+                    return corrected_part
+                
+                return raw_part
             
-            # Pattern 1: Support both digit-digit (157710-30) and alpha+digits with optional dash (WA904-8)
-            for j, context_line in enumerate(context_lines):
-                # Look for part with OP on same line first
-                dash_pattern_match = re.search(r'(?:\b(\d+[-_]\d+)\b|\b([A-Z]{1,4}\d{2,6}(?:[-_]\d{1,3})?)\b)\s*[*]?([Oo]p\d+)', context_line, re.IGNORECASE)
-                if dash_pattern_match:
-                    part_base = dash_pattern_match.group(1) or dash_pattern_match.group(2)
-                    part_base = part_base.upper()
-                    op_part = dash_pattern_match.group(3).upper()
+            # Look for a part pattern that might have OP on next line or nearby
+            dash_match = re.search(r'(\d+[-_]\d+|[A-Z]{1,4}\d{2,6}(?:[-_]\d{1,3})?)', context_line, re.IGNORECASE)
+            if dash_match:
+                part_base = dash_match.group(1).upper()
+                
+                # Search in multiple subsequent lines for OP pattern
+                for k in range(j+1, min(j+5, len(context_lines))):
+                    if k < len(context_lines):
+                        search_line = context_lines[k]
+                        op_match = re.search(r'[*]?([Oo]p\d+)', search_line, re.IGNORECASE)
+                        if op_match:
+                            op_part = op_match.group(1).upper()
+                            raw_part = f"{part_base}*{op_part}"
+                            
+                            # Use database validation first (includes OCR corrections)
+                            validated_part, confidence, correction_info = validate_part_number_with_reference(raw_part)
+                            if confidence > 0.8:  # High confidence correction from database
+                                print(f"Part number validation: {raw_part} → {validated_part} ({correction_info})")
+                                return validated_part
+                            
+                            # Fallback to simple OCR corrections if database validation failed
+                            corrected_candidates = fix_common_ocr_errors(part_base)
+                            if corrected_candidates and len(corrected_candidates) > 1:
+                                # Use the first corrected candidate (after the original)
+                                corrected_part = f"{corrected_candidates[1]}*{op_part}"
+                                print(f"OCR correction applied: {raw_part} → {corrected_part}")
+                                return corrected_part
+                            
+                            return raw_part
+                
+                # If no OP found, also search in the broader context around this part number
+                context_text = ' '.join(context_lines[max(0, j-3):min(len(context_lines), j+8)])
+                op_match = re.search(rf'{re.escape(part_base)}.*?([Oo]p\d+)', context_text, re.IGNORECASE)
+                if op_match:
+                    op_part = op_match.group(1).upper()
                     raw_part = f"{part_base}*{op_part}"
                     
                     # Use database validation first (includes OCR corrections)
@@ -305,107 +369,22 @@ def extract_part_number(text, production_order):
                     
                     return raw_part
                 
-                # Look for a part pattern that might have OP on next line or nearby
-                dash_match = re.search(r'(\d+[-_]\d+|[A-Z]{1,4}\d{2,6}(?:[-_]\d{1,3})?)', context_line, re.IGNORECASE)
-                if dash_match:
-                    part_base = dash_match.group(1).upper()
-                    
-                    # Search in multiple subsequent lines for OP pattern
-                    for k in range(j+1, min(j+5, len(context_lines))):
-                        if k < len(context_lines):
-                            search_line = context_lines[k]
-                            op_match = re.search(r'[*]?([Oo]p\d+)', search_line, re.IGNORECASE)
-                            if op_match:
-                                op_part = op_match.group(1).upper()
-                                raw_part = f"{part_base}*{op_part}"
-                                
-                                # Use database validation first (includes OCR corrections)
-                                validated_part, confidence, correction_info = validate_part_number_with_reference(raw_part)
-                                if confidence > 0.8:  # High confidence correction from database
-                                    print(f"Part number validation: {raw_part} → {validated_part} ({correction_info})")
-                                    return validated_part
-                                
-                                # Fallback to simple OCR corrections if database validation failed
-                                corrected_candidates = fix_common_ocr_errors(part_base)
-                                if corrected_candidates and len(corrected_candidates) > 1:
-                                    # Use the first corrected candidate (after the original)
-                                    corrected_part = f"{corrected_candidates[1]}*{op_part}"
-                                    print(f"OCR correction applied: {raw_part} → {corrected_part}")
-                                    return corrected_part
-                                
-                                return raw_part
-                    
-                    # If no OP found, also search in the broader context around this part number
-                    context_text = ' '.join(context_lines[max(0, j-3):min(len(context_lines), j+8)])
-                    op_match = re.search(rf'{re.escape(part_base)}.*?([Oo]p\d+)', context_text, re.IGNORECASE)
+                # Store this as a candidate in case we don't find anything better
+                candidate_part = part_base
+        
+        # Pattern 2: Look for just digits (like 521350) near production order
+        for j, context_line in enumerate(context_lines):
+            # Look for 6-digit numbers that appear before Op or near production order
+            digit_matches = re.findall(r'\b(\d{6})\b', context_line)
+            for digit_match in digit_matches:
+                # Check if this appears near an Op pattern
+                context_text = ' '.join(context_lines)
+                if re.search(rf'{digit_match}.*?[Oo]p\d+', context_text, re.IGNORECASE):
+                    # Find the Op number
+                    op_match = re.search(rf'{digit_match}.*?([Oo]p\d+)', context_text, re.IGNORECASE)
                     if op_match:
                         op_part = op_match.group(1).upper()
-                        raw_part = f"{part_base}*{op_part}"
-                        
-                        # Use database validation first (includes OCR corrections)
-                        validated_part, confidence, correction_info = validate_part_number_with_reference(raw_part)
-                        if confidence > 0.8:  # High confidence correction from database
-                            print(f"Part number validation: {raw_part} → {validated_part} ({correction_info})")
-                            return validated_part
-                        
-                        # Fallback to simple OCR corrections if database validation failed
-                        corrected_candidates = fix_common_ocr_errors(part_base)
-                        if corrected_candidates and len(corrected_candidates) > 1:
-                            # Use the first corrected candidate (after the original)
-                            corrected_part = f"{corrected_candidates[1]}*{op_part}"
-                            print(f"OCR correction applied: {raw_part} → {corrected_part}")
-                            return corrected_part
-                        
-                        return raw_part
-                    
-                    # Store this as a candidate in case we don't find anything better
-                    candidate_part = part_base
-            
-            # Pattern 2: Look for just digits (like 521350) near production order
-            for j, context_line in enumerate(context_lines):
-                # Look for 6-digit numbers that appear before Op or near production order
-                digit_matches = re.findall(r'\b(\d{6})\b', context_line)
-                for digit_match in digit_matches:
-                    # Check if this appears near an Op pattern
-                    context_text = ' '.join(context_lines)
-                    if re.search(rf'{digit_match}.*?[Oo]p\d+', context_text, re.IGNORECASE):
-                        # Find the Op number
-                        op_match = re.search(rf'{digit_match}.*?([Oo]p\d+)', context_text, re.IGNORECASE)
-                        if op_match:
-                            op_part = op_match.group(1).upper()
-                            raw_part = f"{digit_match}*{op_part}"
-                            
-                            # Validate and correct the part number
-                            validated_part, confidence, correction_info = validate_part_number_with_reference(raw_part)
-                            if confidence > 0.8:  # High confidence correction
-                                print(f"Part number validation: {raw_part} → {validated_part} ({correction_info})")
-                                return validated_part
-                            else:
-                                return raw_part
-                        else:
-                            # Validate standalone digit part
-                            validated_part, confidence, correction_info = validate_part_number_with_reference(digit_match)
-                            if confidence > 0.8:
-                                print(f"Part number validation: {digit_match} → {validated_part} ({correction_info})")
-                                return validated_part
-                            else:
-                                return digit_match
-            
-            # Pattern 3: Look for part patterns without OP, but search harder for OP
-            candidate_part = None
-            for j, context_line in enumerate(context_lines):
-                dash_matches = re.findall(r'(\d+[-_]\d+|[A-Z]{1,4}\d{2,6}(?:[-_]\d{1,3})?)', context_line, re.IGNORECASE)
-                if dash_matches:
-                    candidate_part = dash_matches[-1].upper()  # Take the last/closest one to production order
-                    
-                    # Search the entire context for an OP that might go with this part
-                    full_context = ' '.join(context_lines)
-                    # Look for OP20, OP30, etc. anywhere in the context
-                    op_matches = re.findall(r'[Oo]p\d+', full_context, re.IGNORECASE)
-                    if op_matches:
-                        # Take the first OP found (most likely to be associated)
-                        op_part = op_matches[0].upper()
-                        raw_part = f"{candidate_part}*{op_part}"
+                        raw_part = f"{digit_match}*{op_part}"
                         
                         # Validate and correct the part number
                         validated_part, confidence, correction_info = validate_part_number_with_reference(raw_part)
@@ -415,36 +394,68 @@ def extract_part_number(text, production_order):
                         else:
                             return raw_part
                     else:
-                        # Return the part without OP for now, but keep looking
-                        break
-            
-            # If we found a candidate part but no OP, add default *OP20
-            if candidate_part:
-                raw_part = f"{candidate_part}*OP20"
-                # Validate and correct the part number using reference database
-                validated_part, confidence, correction_info = validate_part_number_with_reference(raw_part)
-                if confidence > 0.8:  # High confidence correction
-                    print(f"Part number validation: {raw_part} → {validated_part} ({correction_info})")
-                    return validated_part
+                        # Validate standalone digit part
+                        validated_part, confidence, correction_info = validate_part_number_with_reference(digit_match)
+                        if confidence > 0.8:
+                            print(f"Part number validation: {digit_match} → {validated_part} ({correction_info})")
+                            return validated_part
+                        else:
+                            return digit_match
+        
+        # Pattern 3: Look for part patterns without OP, but search harder for OP
+        candidate_part = None
+        for j, context_line in enumerate(context_lines):
+            dash_matches = re.findall(r'(\d+[-_]\d+|[A-Z]{1,4}\d{2,6}(?:[-_]\d{1,3})?)', context_line, re.IGNORECASE)
+            if dash_matches:
+                candidate_part = dash_matches[-1].upper()  # Take the last/closest one to production order
+                
+                # Search the entire context for an OP that might go with this part
+                full_context = ' '.join(context_lines)
+                # Look for OP20, OP30, etc. anywhere in the context
+                op_matches = re.findall(r'[Oo]p\d+', full_context, re.IGNORECASE)
+                if op_matches:
+                    # Take the first OP found (most likely to be associated)
+                    op_part = op_matches[0].upper()
+                    raw_part = f"{candidate_part}*{op_part}"
+                    
+                    # Validate and correct the part number
+                    validated_part, confidence, correction_info = validate_part_number_with_reference(raw_part)
+                    if confidence > 0.8:  # High confidence correction
+                        print(f"Part number validation: {raw_part} → {validated_part} ({correction_info})")
+                        return validated_part
+                    else:
+                        return raw_part
                 else:
-                    return raw_part
-            
-            # Pattern 4: Look for standalone numbers near production order
-            for j, context_line in enumerate(context_lines):
-                if j < len(context_lines) - 2:  # Not the production order line itself
-                    standalone_matches = re.findall(r'\b(\d{5,7})\b', context_line)
-                    for match in standalone_matches:
-                        # Skip obvious non-part numbers (production orders start with 12)
-                        if not match.startswith('12') and not match.startswith('455'):
-                            # Validate standalone part numbers too
-                            validated_part, confidence, correction_info = validate_part_number_with_reference(match)
-                            if confidence > 0.8:
-                                print(f"Part number validation: {match} → {validated_part} ({correction_info})")
-                                return validated_part
-                            else:
-                                return match
-            
-            break  # Found production order, stop looking
+                    # Return the part without OP for now, but keep looking
+                    break
+        
+        # If we found a candidate part but no OP, add default *OP20
+        if candidate_part:
+            raw_part = f"{candidate_part}*OP20"
+            # Validate and correct the part number using reference database
+            validated_part, confidence, correction_info = validate_part_number_with_reference(raw_part)
+            if confidence > 0.8:  # High confidence correction
+                print(f"Part number validation: {raw_part} → {validated_part} ({correction_info})")
+                return validated_part
+            else:
+                return raw_part
+        
+        # Pattern 4: Look for standalone numbers near production order
+        for j, context_line in enumerate(context_lines):
+            if j < len(context_lines) - 2:  # Not the production order line itself
+                standalone_matches = re.findall(r'\b(\d{5,7})\b', context_line)
+                for match in standalone_matches:
+                    # Skip obvious non-part numbers (production orders start with 12)
+                    if not match.startswith('12') and not match.startswith('455'):
+                        # Validate standalone part numbers too
+                        validated_part, confidence, correction_info = validate_part_number_with_reference(match)
+                        if confidence > 0.8:
+                            print(f"Part number validation: {match} → {validated_part} ({correction_info})")
+                            return validated_part
+                        else:
+                            return match
+        
+        break  # Found production order, stop looking
     
     # Apply validation to any discovered part number before returning
     if candidate_part:
@@ -460,10 +471,13 @@ def extract_quantity_and_dock_date(text):
     quantity = None
     dock_date = None
     
-    lines = text.split('\n')
+    index = document_index(text)
+    lines = index.lines
+    # Item rows carry a unit token; strategies keyed on units only visit those lines
+    unit_lines = index.lines_with_token(*UNIT_TOKENS)
     
     # Strategy 0: HIGH PRIORITY - Look for quantities that appear after the word "Quantity" (most reliable)
-    text_lower = text.lower()
+    text_lower = index.lower
     if 'quantity' in text_lower:
         # Find all occurrences of "quantity" and score them by context quality
         quantity_candidates = []
@@ -609,7 +623,8 @@ def extract_quantity_and_dock_date(text):
         return None
 
     # Try line item 10 first
-    for i, line in enumerate(lines):
+    for i in index.lines_with_token('10'):
+        line = lines[i]
         if is_item_line(line, '10'):
             q = extract_qty_from_line(line, lines[i+1:i+6])
             if q:
@@ -617,7 +632,8 @@ def extract_quantity_and_dock_date(text):
                 break
     # Fallback to line item 20
     if not quantity:
-        for i, line in enumerate(lines):
+        for i in index.lines_with_token('20'):
+            line = lines[i]
             if is_item_line(line, '20'):
                 q = extract_qty_from_line(line, lines[i+1:i+6])
                 if q:
@@ -625,7 +641,8 @@ def extract_quantity_and_dock_date(text):
                     break
     
     # Strategy 1: Row-oriented extraction where a detail line contains qty(.00), unit, and date
-    for i, line in enumerate(lines):
+    for i in unit_lines:
+        line = lines[i]
         # Must contain a unit and a date to be considered an item row
         if re.search(r'\b(EA|LBS|PCS|EACH|PIECES?)\b', line, re.IGNORECASE) and re.search(r'\b\d{1,2}/\d{1,2}/\d{4}\b', line):
             # Find .00 or integer tokens near the unit token
@@ -655,7 +672,8 @@ def extract_quantity_and_dock_date(text):
 
     # Strategy 1b: If the tokenization above missed, look in a small window around unit/date
     if not quantity:
-        for i, line in enumerate(lines):
+        for i in unit_lines:
+            line = lines[i]
             if re.search(r'\b(EA|LBS|PCS|EACH|PIECES?)\b', line, re.IGNORECASE):
                 window = ' '.join(lines[max(0, i-1):i+2])
                 # Prefer a small integer with .00 in the window
@@ -669,7 +687,8 @@ def extract_quantity_and_dock_date(text):
                     break
 
     # Strategy 2: Smart context-aware extraction (respect column order; avoid Net Per)
-    for i, line in enumerate(lines):
+    for i in unit_lines:
+        line = lines[i]
         if re.search(r'\b(EA|LBS|PCS|EACH|PIECES?)\b', line, re.IGNORECASE) and re.search(r'\d', line):
             # Column anchors
             m_unit = re.search(r'\b(EA|LBS|PCS|EACH|PIECES?)\b', line, re.IGNORECASE)
@@ -705,7 +724,8 @@ def extract_quantity_and_dock_date(text):
     # Strategy 3: Vertical table format - detect around either the unit line or the Quantity label
     # Look for pattern: Quantity label with a nearby decimal and unit, or standalone unit line with nearby Quantity
     if not quantity:
-        for i, line in enumerate(lines):
+        for i in sorted(set(unit_lines).union(index.lines_with_token('QUANTITY'))):
+            line = lines[i]
             # Case A: Unit on its own line, find Quantity label nearby
             if re.match(r'^\s*(EA|LBS|PCS|EACH|PIECES?)\s*$', line, re.IGNORECASE):
                 area = lines[max(0, i-6):i+7]
@@ -777,8 +797,9 @@ def extract_quantity_and_dock_date(text):
     # Strategy 5: Generic fallback with strict validation
     if not quantity:
         # Look for any .00 values but apply strict filtering
-        # Split text into lines and check each line carefully
-        for line in lines:
+        # Check each unit line carefully
+        for i in unit_lines:
+            line = lines[i]
             # Skip header lines and look for data lines
             if re.search(r'\b(EA|LBS|PCS|EACH|PIECES?)\b', line, re.IGNORECASE):
                 # This line contains units - likely a data line
@@ -818,10 +839,12 @@ def extract_payment_terms(text):
     
     # The text shows "30 Days from" on one line and "Date" and "of" "Invoice" on subsequent lines
     # Look for this pattern across multiple lines
-    lines = text.split('\n')
+    index = document_index(text)
+    lines = index.lines
+    payment_lines = index.find_lines('payment', 'lower')
 
     # First, anchor on the 'Payment terms' label and scan the following lines
-    for i in range(len(lines)):
+    for i in payment_lines:
         line = lines[i]
         label_here = re.search(r'payment\s*terms\.?', line, re.IGNORECASE) is not None
         # Handle split label across two lines ("Payment" then "terms")
@@ -842,7 +865,8 @@ def extract_payment_terms(text):
                         return standard_terms, False
                     return '30 Days', True
     
-    for i, line in enumerate(lines):
+    for i in index.lines_with_token('30'):
+        line = lines[i]
         if re.search(r'\b30\b', line) and 'days' in line.lower():
             # Check a wider window to accommodate word-wrapped tokens
             combined = ' '.join([l.strip() for l in lines[i:i+8] if l.strip()])
@@ -858,7 +882,8 @@ def extract_payment_terms(text):
         return terms, is_non_standard
     
     # Look for any mention of payment terms in broader context
-    for i, line in enumerate(lines):
+    for i in payment_lines:
+        line = lines[i]
         if 'payment' in line.lower() and 'terms' in line.lower():
             # Try to build a contiguous phrase following the label
             combined = ' '.join([l.strip() for l in lines[i:i+6] if l.strip()])
@@ -868,15 +893,17 @@ def extract_payment_terms(text):
             return line_clean, True  # Found but likely non-standard
     
     # Default case - if we found "30 Days from" pattern but incomplete, assume standard
-    for line in lines:
-        if '30' in line and 'days' in line.lower() and 'from' in line.lower():
+    for i in index.find_lines('30'):
+        line = lines[i]
+        if 'days' in line.lower() and 'from' in line.lower():
             return standard_terms, False  # Assume standard terms
     
     return None, True  # No terms found, flag as non-standard
 
 def extract_vendor_info(text):
     """Extract vendor information and return (vendor_name, non_tek_flag)"""
-    lines = text.split('\n')
+    index = document_index(text)
+    lines = index.lines
     vendor_name = None
     
     # Strategy 1: Look for known vendor patterns first
@@ -886,7 +913,7 @@ def extract_vendor_info(text):
     ]
     
     for vendor_key, vendor_full in known_vendors:
-        if vendor_key.upper() in text.upper():
+        if vendor_key.upper() in index.upper:
             vendor_name = vendor_full
             break
     
@@ -905,27 +932,28 @@ def extract_vendor_info(text):
 
     # Strategy 2: Generic vendor extraction - look for vendor field patterns
     if not vendor_name:
-        for i, line in enumerate(lines):
-            line_upper = line.upper()
-            # Look for vendor section indicators
-            if any(indicator in line_upper for indicator in ['VENDOR ADDRESS', 'VENDOR', 'SUPPLIER', 'FROM:']):
-                # Check next few lines for vendor name
-                for j in range(i + 1, min(i + 4, len(lines))):
-                    next_line = lines[j].strip()
-                    # Skip obvious non-vendor entries
-                    if (next_line and 
-                        not any(word in next_line.lower() for word in ['address', 'phone', 'fax', 'number', 'email']) and
-                        len(next_line) > 5 and 
-                        not next_line.isdigit() and
-                        not re.match(r'^\d+\s+(.*)', next_line)):  # Skip address numbers
-                        
-                        # Clean up the vendor name
-                        vendor_name = next_line.strip()
-                        # Remove common prefixes/suffixes
-                        vendor_name = re.sub(r'^(To:|From:|Ship to:|Bill to:)\s*', '', vendor_name, flags=re.IGNORECASE)
-                        break
-                if vendor_name:
+        # Vendor section indicator lines ('VENDOR ADDRESS' is covered by 'VENDOR')
+        indicator_lines = set()
+        for indicator in ['VENDOR', 'SUPPLIER', 'FROM:']:
+            indicator_lines.update(index.find_lines(indicator, 'upper'))
+        for i in sorted(indicator_lines):
+            # Check next few lines for vendor name
+            for j in range(i + 1, min(i + 4, len(lines))):
+                next_line = lines[j].strip()
+                # Skip obvious non-vendor entries
+                if (next_line and 
+                    not any(word in next_line.lower() for word in ['address', 'phone', 'fax', 'number', 'email']) and
+                    len(next_line) > 5 and 
+                    not next_line.isdigit() and
+                    not re.match(r'^\d+\s+(.*)', next_line)):  # Skip address numbers
+                    
+                    # Clean up the vendor name
+                    vendor_name = next_line.strip()
+                    # Remove common prefixes/suffixes
+                    vendor_name = re.sub(r'^(To:|From:|Ship to:|Bill to:)\s*', '', vendor_name, flags=re.IGNORECASE)
                     break
+            if vendor_name:
+                break
     
     # Strategy 3: Look for company patterns (all caps, INC, LLC, etc.)
     if not vendor_name:
@@ -961,7 +989,8 @@ def extract_vendor_info(text):
 
 def extract_buyer_name(text):
     """Extract buyer's name from the document"""
-    lines = text.split('\n')
+    index = document_index(text)
+    lines = index.lines
 
     # Try robust capture across newlines immediately following the label
     m_block = re.search(r'Buyer/phone\s+([A-Za-z][A-Za-z\-\.]+(?:\s+[A-Za-z][A-Za-z\-\.]+)+)\s*/', text, re.IGNORECASE)
@@ -975,27 +1004,26 @@ def extract_buyer_name(text):
             return buyer
 
     # Generic approach: Look for buyer name pattern - appears after "Buyer/phone" field
-    for i, line in enumerate(lines):
-        line_lower = line.lower()
-        if 'buyer/phone' in line_lower:
-            # Try inline: "Buyer/phone <Name> / <phone>"
-            m = re.search(r'buyer/phone\s+([A-Za-z]+(?:\s+[A-Za-z\-]+)+)\s*/', line, re.IGNORECASE)
-            if m:
-                return m.group(1).strip()
-            # Handle line breaks where name spans the next lines before the '/'
-            name_parts = []
-            for j in range(i + 1, min(i + 6, len(lines))):
-                nxt = lines[j].strip()
-                # Stop if we hit a slash (likely phone) or digits/email
-                if '/' in nxt or re.search(r'\d|@', nxt):
-                    break
-                if nxt and re.fullmatch(r'[A-Za-z][A-Za-z\-\.]*', nxt):
-                    name_parts.append(nxt)
-                # Stop after capturing two parts (First Last)
-                if len(name_parts) >= 2:
-                    break
-            if name_parts:
-                return ' '.join(name_parts)
+    for i in index.find_lines('buyer/phone', 'lower'):
+        line = lines[i]
+        # Try inline: "Buyer/phone <Name> / <phone>"
+        m = re.search(r'buyer/phone\s+([A-Za-z]+(?:\s+[A-Za-z\-]+)+)\s*/', line, re.IGNORECASE)
+        if m:
+            return m.group(1).strip()
+        # Handle line breaks where name spans the next lines before the '/'
+        name_parts = []
+        for j in range(i + 1, min(i + 6, len(lines))):
+            nxt = lines[j].strip()
+            # Stop if we hit a slash (likely phone) or digits/email
+            if '/' in nxt or re.search(r'\d|@', nxt):
+                break
+            if nxt and re.fullmatch(r'[A-Za-z][A-Za-z\-\.]*', nxt):
+                name_parts.append(nxt)
+            # Stop after capturing two parts (First Last)
+            if len(name_parts) >= 2:
+                break
+        if name_parts:
+            return ' '.join(name_parts)
 
     # Alternative: Look for email patterns and extract name before @
     email_pattern = r'([A-Za-z\s]+)\s*[<(]?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})[>)]?'
@@ -1030,11 +1058,12 @@ def extract_dpas_ratings(text):
     dpas_ratings = []
     
     # Look for DPAS Rating: followed by the ratings
-    lines = text.split('\n')
+    index = document_index(text)
+    lines = index.lines
     
-    for i, line in enumerate(lines):
-        line_upper = line.upper()
-        if 'DPAS' in line_upper and 'RATING' in line_upper:
+    for i in index.find_lines('DPAS', 'upper'):
+        line = lines[i]
+        if 'RATING' in index.upper_lines[i]:
             # Check the same line and next few lines for ratings
             search_text = line
             for j in range(i + 1, min(i + 3, len(lines))):
@@ -1071,7 +1100,7 @@ def extract_dpas_ratings(text):
     # If not found in structured way, search more broadly
     if not dpas_ratings:
         # Clean up common OCR errors first
-        text_cleaned = text.upper()
+        text_cleaned = index.upper
         text_cleaned = re.sub(r'DO([AC])·', r'DO\g<1>1', text_cleaned)  # DOA· → DOA1
         text_cleaned = re.sub(r'DO([AC])[Il]', r'DO\g<1>1', text_cleaned)  # DOAI → DOA1
         
@@ -1081,7 +1110,7 @@ def extract_dpas_ratings(text):
         
         # Fallback: look for partial patterns and try to fix them
         if not dpas_ratings:
-            partial_matches = re.findall(r'D[OX][AC][·Il0-9]', text.upper())
+            partial_matches = re.findall(r'D[OX][AC][·Il0-9]', index.upper)
             for match in partial_matches:
                 fixed_match = match.replace('·', '1').replace('I', '1').replace('l', '1').replace('O', '0')
                 if re.match(r'D[OX][AC]\d', fixed_match):
@@ -1099,77 +1128,11 @@ def extract_dpas_ratings(text):
 
 def extract_quality_clauses(text):
     """Extract Quality Clauses (Q numbers with descriptions) from the document with enhanced classification"""
-    quality_clauses = {}
-    
-    # Define Q clause business classification
-    q_clause_classification = {
-        # Auto-accept - Standard clauses that don't affect timesheet pricing
-        "auto_accept": {
-            "Q1": {"description": "QUALITY SYSTEMS REQUIREMENTS", "timesheet_impact": False, "action": "ACCEPT", "notes": "Standard quality compliance"},
-            "Q5": {"description": "CERTIFICATION OF CONFORMANCE AND RECORD RETENTION", "timesheet_impact": False, "action": "ACCEPT", "notes": "Standard COC"},
-            "Q26": {"description": "PACKING FOR SHIPMENT", "timesheet_impact": False, "action": "ACCEPT", "notes": "Standard packing"}
-        },
-        # Review required - May affect timesheet/pricing  
-        "review_required": {
-            "Q2": {"description": "SURVEILLANCE BY MEGGITT AND RIGHT OF ENTRY", "timesheet_impact": True, "action": "REVIEW", "notes": "Customer access required", "alert_level": "MEDIUM"},
-            "Q9": {"description": "CORRECTIVE ACTION", "timesheet_impact": True, "action": "REVIEW", "notes": "CA documentation required", "alert_level": "MEDIUM"},
-            "Q11": {"description": "SPECIAL PROCESS SOURCES REQUIRED", "timesheet_impact": True, "action": "REVIEW", "notes": "Verify certifications", "alert_level": "HIGH"},
-            "Q13": {"description": "REPORT OF DISCREPANCY # Quality Notification (QN)", "timesheet_impact": True, "action": "REVIEW", "notes": "QN reporting required", "alert_level": "HIGH"},
-            "Q14": {"description": "FOREIGN OBJECT DAMAGE (FOD)", "timesheet_impact": True, "action": "REVIEW", "notes": "FOD prevention measures", "alert_level": "MEDIUM"}
-        },
-        # Object to - Typically reject or negotiate
-        "object_to": {
-            "Q15": {"description": "ANTI-TERRORIST POLICY", "timesheet_impact": False, "action": "OBJECT", "notes": "Standard objection", "alert_level": "HIGH"},
-            "Q32": {"description": "FLOWDOWN OF REQUIREMENTS [QUALITY AND ENVIRONMENTAL]", "timesheet_impact": False, "action": "OBJECT", "notes": "Flowdown too broad", "alert_level": "HIGH"},
-            "Q33": {"description": "FAR and DOD FAR SUPPLEMENTAL FLOWDOWN PROVISIONS", "timesheet_impact": False, "action": "OBJECT", "notes": "FAR inappropriate for commercial", "alert_level": "CRITICAL"}
-        }
-    }
+    # Business classification shared with the Q clause tools (q_clause_classification.json)
+    q_clause_classification = q_clauses.load_classification()
     
-    # Flatten classification for description lookup
-    known_clauses = {}
-    for category, clauses in q_clause_classification.items():
-        for q_number, info in clauses.items():
-            known_clauses[q_number] = info["description"]
-    
-    # Extract Q numbers that actually appear in the text
-    q_numbers_found = re.findall(r'(Q\d+)', text.upper())
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_q_numbers = []
-    for q in q_numbers_found:
-        if q not in seen:
-            seen.add(q)
-            unique_q_numbers.append(q)
-    
-    # Map found Q numbers to their descriptions
-    for q_number in unique_q_numbers:
-        if q_number in known_clauses:
-            quality_clauses[q_number] = known_clauses[q_number]
-        else:
-            # For unknown Q numbers, try to extract description from context
-            lines = text.split('\n')
-            for i, line in enumerate(lines):
-                if q_number in line.upper():
-                    # Try to get description from same line or following lines
-                    description_parts = []
-                    remaining = line.split(q_number, 1)
-                    if len(remaining) > 1:
-                        desc = remaining[1].strip()
-                        if desc:
-                            description_parts.append(desc)
-                    
-                    # Look at next couple lines for continuation
-                    for j in range(i + 1, min(i + 3, len(lines))):
-                        next_line = lines[j].strip()
-                        if next_line and not re.match(r'^Q\d+', next_line.upper()) and len(next_line) < 60:
-                            description_parts.append(next_line)
-                        else:
-                            break
-                    
-                    if description_parts:
-                        quality_clauses[q_number] = ' '.join(description_parts).strip()
-                    break
+    # Q numbers in order of appearance, with table or in-text descriptions
+    quality_clauses = q_clauses.scan_clauses(text)
     
     # Classify the Q clauses for business processing
     q_clause_analysis = classify_q_clauses_for_business(quality_clauses, q_clause_classification)
@@ -1289,7 +1252,7 @@ def extract_router_validation_info(router_text):
         "extraction_success": False
     }
     
-    lines = router_text.split('\n')
+    lines = document_index(router_text).lines
     
     # Pattern matching for router page fields
     for i, line in enumerate(lines):
@@ -1501,51 +1464,13 @@ def extract_text_from_first_router_page(pdf_path):
     page_text = page.get_text()
     
     # If no text found or minimal text, use OCR
-    if len(page_text.strip()) < 50:
+    if len(page_text.strip()) < 50 and not preprocessing.is_blank(raster.render_gray(page, scale=1)):
         try:
-            # Use adaptive resolution for first router page
-            matrices = [
-                fitz.Matrix(3, 3),  # Standard high res
-                fitz.Matrix(2, 2),  # Lower res for already high-quality scans
-                fitz.Matrix(4, 4)   # Higher res for difficult scans
-            ]
-            
-            best_text = ""
-            best_length = 0
-            
-            for matrix in matrices:
-                try:
-                    pix = page.get_pixmap(matrix=matrix)
-                    img_data = pix.tobytes("png")
-                    img = Image.open(io.BytesIO(img_data)).convert('L')
-                    
-                    # Enhanced OCR configs for router pages
-                    configs = [
-                        r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz/-*().,: ',
-                        r'--oem 3 --psm 4',
-                        r'--oem 3 --psm 3',
-                        r'--oem 1 --psm 6',
-                        r'--oem 2 --psm 6'
-                    ]
-                    
-                    for config in configs:
-                        try:
-                            ocr_text = pytesseract.image_to_string(img, config=config)
-                            if len(ocr_text) > best_length:
-                                best_text = ocr_text
-                                best_length = len(ocr_text)
-                        except:
-                            continue
-                    
-                    # If we got decent results, don't try more matrices
-                    if best_length > 100:
-                        break
-                        
-                except Exception as e:
-                    print(f"OCR matrix {matrix} failed for router page: {e}")
-                    continue
-            
-            page_text = best_text if best_text else page_text
+            ocr_text, info = ocr_strategy.ocr_page(page, profile="router")
+            if info.get("calls"):
+                print(f"Router page: OCR {info.get('candidate')} "
+                      f"(conf {info.get('mean_conf')}, anchors {info.get('anchors')}, calls {info['calls']})")
+            page_text = ocr_text if ocr_text else page_text
             
         except Exception as e:
             print(f"Error processing first router page: {e}")
@@ -1553,154 +1478,247 @@ def extract_text_from_first_router_page(pdf_path):
     doc.close()
     return f"FIRST ROUTER PAGE:\n{page_text}\n\n"
 
-def main():
-    # Find the most recent PO folder (starts with 455)
-    po_folders = [d for d in os.listdir('.') if os.path.isdir(d) and d.startswith('455')]
-    if not po_folders:
-        print("No PO folders found")
-        return
-    
-    # Get the most recently modified PO folder
-    po_folder = max(po_folders, key=lambda d: os.path.getmtime(d))
-    po_number = po_folder
-    po_file = os.path.join(po_folder, f"PO_{po_number}.pdf")
-    router_file = os.path.join(po_folder, f"Router_{po_number}.pdf")
-    json_file = os.path.join(po_folder, f"{po_number}_info.json")
+def find_ocr_artifact(po_folder, source_file):
+    """Locate the OCR artifact of a PO's searchable PDF (before or after it is moved into the folder)"""
+    if not source_file:
+        return None
+    for pdf_path in (source_file, os.path.join(po_folder, os.path.basename(source_file))):
+        artifact = artifact_path_for(pdf_path)
+        if os.path.exists(artifact):
+            return artifact
+    return None
+
+def write_json_atomic(path, data):
+    """Write JSON to a temporary file and rename it over path, so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def input_fingerprint(*inputs):
+    """Short hash of an extractor's inputs (strings or JSON-serialisable values)"""
+    h = hashlib.blake2b(digest_size=12)
+    for value in inputs:
+        if not isinstance(value, str):
+            value = json.dumps(value, sort_keys=True, default=str)
+        h.update(value.encode('utf-8', 'surrogatepass'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+def part_reference_fingerprint():
+    """Hash of the part number reference list used for validation ('' without one)"""
+    if not os.path.exists(PART_NUMBERS_PATH):
+        return ""
+    try:
+        return part_snapshot.reference_hash(PART_NUMBERS_PATH)
+    except Exception as e:
+        print(f"Warning: Could not fingerprint part number reference: {e}")
+        return ""
+
+def extract_fields(text, router_text=None, table_pages=None, previous=None, timings=None):
+    """Run the field extractors over a PO's text
     
-    if not os.path.exists(po_file):
-        print(f"PO file not found: {po_file}")
-        return
+    text is the PO pages (plus first router page) in the 'PAGE N:' layout,
+    router_text the first router page on its own (None without a router) and
+    table_pages the OCR page records of the PO pages, whose word boxes let the
+    line-item table be read by column
     
-    print("Extracting detailed text from ALL PO pages...")
-    text = extract_text_from_pdf(po_file)
+    previous is the PO's stored record: an extractor whose version and input
+    fingerprint match its "extractor_versions" entry there keeps its stored
+    fields instead of running again
     
-    # ENHANCEMENT: Also extract text from first page of router section
-    router_info = {}
-    router_validation = {}
+    timings, when given, receives each extractor's wall time in milliseconds
     
-    if os.path.exists(router_file):
-        print("Extracting text from first router page for additional information...")
-        router_text = extract_text_from_first_router_page(router_file)
-        text += router_text  # Combine PO text with first router page text
-        print("Combined PO text with first router page text for comprehensive extraction")
-        
-        # NEW: Extract validation information and Proc Rev from router
-        print("\n🔍 Extracting router validation information...")
-        router_info = extract_router_validation_info(router_text)
-        
-        if router_info["extraction_success"]:
-            print(f"✅ Router information extracted:")
-            print(f"   Router Part Number: {router_info['router_part_number']}")
-            print(f"   Router Order Number: {router_info['router_order_number']}")
-            print(f"   Router Doc Rev: {router_info['router_doc_rev']}")
-            print(f"   Router Proc Rev: {router_info['router_proc_rev']}")
+    Returns the fields to merge into the PO's _info.json
+    """
+    previous = previous or {}
+    previous_versions = previous.get("extractor_versions") or {}
+    versions = {}
+    fields = {}
+    text_fingerprint = input_fingerprint(text)
+    
+    def run(name, outputs, inputs, extract):
+        """Fields of one extractor: stored ones when still current, else extract()"""
+        start = time.perf_counter()
+        stamp = {"version": EXTRACTOR_VERSIONS[name], "fingerprint": input_fingerprint(*inputs)}
+        versions[name] = stamp
+        if previous_versions.get(name) == stamp and all(field in previous for field in outputs):
+            values = [previous[field] for field in outputs]
+            print(f"{name}: version and inputs unchanged, keeping stored fields")
         else:
-            print("⚠️ Limited router information extracted")
-            
-    else:
-        print("No router file found - processing only PO pages")
-        router_info = {
-            "router_part_number": None,
-            "router_order_number": None, 
-            "router_doc_rev": None,
-            "router_proc_rev": None,
-            "extraction_success": False
-        }
+            values = extract()
+            values = list(values) if len(outputs) > 1 else [values]
+        fields.update(zip(outputs, values))
+        if timings is not None:
+            timings[name] = (time.perf_counter() - start) * 1000.0
+        return values if len(outputs) > 1 else values[0]
     
     print("\\nExtracting Production Order...")
-    production_order = extract_production_order(text)
+    production_order = run("production_order", ["production_order"], [text_fingerprint],
+                           lambda: extract_production_order(text))
     print(f"Production Order: {production_order}")
     
     print("\\nExtracting Revision...")
-    revision = extract_revision(text)
+    revision = run("revision", ["revision"], [text_fingerprint], lambda: extract_revision(text))
     print(f"Revision: {revision}")
     
     print("\\nExtracting Part Number...")
-    part_number = extract_part_number(text, production_order)
+    part_number = run("part_number", ["part_number"],
+                      [text_fingerprint, production_order, part_reference_fingerprint()],
+                      lambda: extract_part_number(text, production_order))
     print(f"Part Number: {part_number}")
     
     print("\\nExtracting Quantity and Dock Date...")
-    quantity, dock_date = extract_quantity_and_dock_date(text)
+    def read_quantity():
+        quantity, dock_date = None, None
+        if table_pages:
+            # Word boxes available: read the line-item table by column position
+            quantity, dock_date = table_reader.read_quantity_and_dock_date(table_pages)
+            if quantity is not None:
+                print("Quantity and dock date read from the line-item table columns")
+        if quantity is None:
+            quantity, dock_date = extract_quantity_and_dock_date(text)
+        return quantity, dock_date
+    
+    table_words = [page.get("words") for page in table_pages] if table_pages else None
+    quantity, dock_date = run("quantity_and_dock_date", ["quantity", "dock_date"],
+                              [text_fingerprint, table_words], read_quantity)
     print(f"Quantity: {quantity}")
     print(f"Dock Date: {dock_date}")
     
     print("\\nExtracting Payment Terms...")
-    payment_terms, payment_terms_flag = extract_payment_terms(text)
+    payment_terms, payment_terms_flag = run("payment_terms", ["payment_terms", "payment_terms_non_standard_flag"],
+                                            [text_fingerprint], lambda: extract_payment_terms(text))
     print(f"Payment Terms: {payment_terms}")
     print(f"Non-standard Payment Terms Flag: {payment_terms_flag}")
     
     print("\\nExtracting Vendor Information...")
-    vendor_name, vendor_flag = extract_vendor_info(text)
+    vendor_name, vendor_flag = run("vendor_info", ["vendor_name", "vendor_non_tek_flag"],
+                                   [text_fingerprint], lambda: extract_vendor_info(text))
     print(f"Vendor: {vendor_name}")
     print(f"Non-Tek Vendor Flag: {vendor_flag}")
     
     print("\\nExtracting Buyer Name...")
-    buyer_name = extract_buyer_name(text)
+    buyer_name = run("buyer_name", ["buyer_name"], [text_fingerprint], lambda: extract_buyer_name(text))
     print(f"Buyer: {buyer_name}")
     
     print("\\nExtracting DPAS Ratings...")
-    dpas_ratings = extract_dpas_ratings(text)
+    dpas_ratings = run("dpas_ratings", ["dpas_ratings"], [text_fingerprint], lambda: extract_dpas_ratings(text))
     print(f"DPAS Ratings: {dpas_ratings}")
     
     print("\\nExtracting Quality Clauses...")
-    quality_clauses_analysis = extract_quality_clauses(text)
-    quality_clauses = quality_clauses_analysis.get('quality_clauses_dict', {})
+    def read_quality_clauses():
+        analysis = extract_quality_clauses(text)
+        return analysis.get('quality_clauses_dict', {}), analysis
+    
+    quality_clauses, quality_clauses_analysis = run(
+        "quality_clauses", ["quality_clauses", "quality_clauses_analysis"],
+        [text_fingerprint, q_clauses.table_hash()], read_quality_clauses)
     print(f"Quality Clauses Found: {len(quality_clauses)} clauses")
     print(f"Classification Summary: {quality_clauses_analysis.get('summary', {})}")
     
-    # Load existing JSON
+    # NEW: Extract validation information and Proc Rev from router
+    def read_router():
+        if router_text is not None:
+            print("\n🔍 Extracting router validation information...")
+        router_info = extract_router_validation_info(router_text)
+        if router_text is not None:
+            if router_info["extraction_success"]:
+                print(f"✅ Router information extracted:")
+                print(f"   Router Part Number: {router_info['router_part_number']}")
+                print(f"   Router Order Number: {router_info['router_order_number']}")
+                print(f"   Router Doc Rev: {router_info['router_doc_rev']}")
+                print(f"   Router Proc Rev: {router_info['router_proc_rev']}")
+            else:
+                print("⚠️ Limited router information extracted")
+        return [router_info[key] for key in ROUTER_INFO_FIELDS]
+    
+    router_values = run("router_info", list(ROUTER_INFO_FIELDS.values()), [router_text or ""], read_router)
+    router_info = dict(zip(ROUTER_INFO_FIELDS, router_values))
+    
+    # NEW: Validate PO and Router document matching
+    def validate_router():
+        if router_info.get("extraction_success"):
+            print("\\n🔍 Validating PO and Router document matching...")
+            
+            # Create temporary PO info for validation (with extracted values)
+            temp_po_info = {
+                "part_number": part_number,
+                "purchase_order_number": production_order,  # Use production_order as PO number
+                "rev": revision
+            }
+            
+            router_validation = validate_po_router_match(temp_po_info, router_info)
+            print(f"   {router_validation['validation_summary']}")
+            
+            if router_validation["discrepancies"]:
+                print("   📋 Validation details:")
+                for discrepancy in router_validation["discrepancies"]:
+                    print(f"      • {discrepancy}")
+            return router_validation
+        print("\\n⚠️ Skipping PO/Router validation - insufficient router data")
+        return {"documents_match": None, "validation_summary": "Router validation skipped - insufficient data"}
+    
+    run("router_validation", ["router_validation"],
+        [part_number, production_order, revision, router_info], validate_router)
+    
+    fields["extractor_versions"] = versions
+    return fields
+
+def extract_details_for_folder(po_folder, po_number=None, ocr_pages=None):
+    """Run the detailed extraction for one PO folder and update its _info.json
+    
+    ocr_pages are the OCR stage's page records; when omitted the artifact
+    file next to the searchable PDF is used, and only without either are
+    the PDFs read (and OCR'd if needed) again
+    
+    Returns the updated PO info dict, or None when the PO file is missing
+    """
+    po_number = po_number or os.path.basename(os.path.normpath(po_folder))
+    po_file = os.path.join(po_folder, f"PO_{po_number}.pdf")
+    router_file = os.path.join(po_folder, f"Router_{po_number}.pdf")
+    json_file = os.path.join(po_folder, f"{po_number}_info.json")
+    
+    if not os.path.exists(po_file):
+        print(f"PO file not found: {po_file}")
+        return None
+    
+    # Load existing JSON (written by the basic extraction stage)
     with open(json_file, 'r') as f:
         po_info = json.load(f)
     
-    # NEW: Validate PO and Router document matching
-    if router_info.get("extraction_success"):
-        print("\\n🔍 Validating PO and Router document matching...")
-        
-        # Create temporary PO info for validation (with extracted values)
-        temp_po_info = {
-            "part_number": part_number,
-            "purchase_order_number": production_order,  # Use production_order as PO number
-            "rev": revision
-        }
-        
-        router_validation = validate_po_router_match(temp_po_info, router_info)
-        print(f"   {router_validation['validation_summary']}")
-        
-        if router_validation["discrepancies"]:
-            print("   📋 Validation details:")
-            for discrepancy in router_validation["discrepancies"]:
-                print(f"      • {discrepancy}")
+    # Reuse the OCR stage's page texts instead of reading/OCR'ing the PDFs again
+    page_count = po_info.get("page_count")
+    if ocr_pages is None:
+        ocr_pages = load_ocr_artifact(find_ocr_artifact(po_folder, po_info.get("source_file")))
+    use_artifact = bool(ocr_pages) and bool(page_count)
+    
+    if use_artifact:
+        print("Using OCR artifact text for ALL PO pages (no re-OCR)...")
+        text = format_page_texts(page_texts(ocr_pages, 0, page_count))
     else:
-        print("\\n⚠️ Skipping PO/Router validation - insufficient router data")
-        router_validation = {"documents_match": None, "validation_summary": "Router validation skipped - insufficient data"}
-    
-    # Add new information including enhanced Q clause analysis and router validation
-    po_info.update({
-        "production_order": production_order,
-        "revision": revision,
-        "part_number": part_number,
-        "quantity": quantity,
-        "dock_date": dock_date,
-        "payment_terms": payment_terms,
-        "payment_terms_non_standard_flag": payment_terms_flag,
-        "vendor_name": vendor_name,
-        "vendor_non_tek_flag": vendor_flag,
-        "buyer_name": buyer_name,
-        "dpas_ratings": dpas_ratings,
-        "quality_clauses": quality_clauses,
-        "quality_clauses_analysis": quality_clauses_analysis,
-        # NEW: Router validation information
-        "router_part_number": router_info.get("router_part_number"),
-        "router_order_number": router_info.get("router_order_number"),
-        "router_doc_rev": router_info.get("router_doc_rev"),
-        "router_proc_rev": router_info.get("router_proc_rev"),  # NEW FIELD
-        "router_extraction_success": router_info.get("extraction_success"),
-        "router_validation": router_validation
-    })
+        print("Extracting detailed text from ALL PO pages...")
+        text = extract_text_from_pdf(po_file)
+    
+    # ENHANCEMENT: Also extract text from first page of router section
+    router_text = None
+    if os.path.exists(router_file):
+        print("Extracting text from first router page for additional information...")
+        if use_artifact and len(ocr_pages) > page_count:
+            router_text = f"FIRST ROUTER PAGE:\n{ocr_pages[page_count].get('text', '')}\n\n"
+        else:
+            router_text = extract_text_from_first_router_page(router_file)
+        text += router_text  # Combine PO text with first router page text
+        print("Combined PO text with first router page text for comprehensive extraction")
+    else:
+        print("No router file found - processing only PO pages")
+    
+    # Fields whose extractor version and inputs match the stored record are kept as they are
+    po_info.update(extract_fields(text, router_text, ocr_pages[:page_count] if use_artifact else None,
+                                  previous=po_info))
     
     # Save updated JSON
-    with open(json_file, 'w') as f:
-        json.dump(po_info, f, indent=2)
+    write_json_atomic(json_file, po_info)
     
     print(f"\\nUpdated JSON file: {json_file}")
     print("\\nExtracted information:")
@@ -1723,10 +1741,13 @@ def main():
         try:
             shutil.move(original_pdf, destination)
             print(f"\\nMoved original PDF to: {destination}")
+            # Keep the OCR artifact next to its PDF
+            artifact = artifact_path_for(original_pdf)
+            if os.path.exists(artifact):
+                shutil.move(artifact, artifact_path_for(destination))
             # Update JSON to reflect new location
             po_info["source_file"] = os.path.basename(original_pdf)
-            with open(json_file, 'w') as f:
-                json.dump(po_info, f, indent=2)
+            write_json_atomic(json_file, po_info)
         except Exception as e:
             print(f"\\nWarning: Could not move original PDF: {e}")
     else:
@@ -1734,6 +1755,31 @@ def main():
     
     print(f"\\nComplete processing finished for PO {po_number}")
     print(f"All files organized in folder: {po_folder}")
+    return po_info
+
+def run_detail_extraction(job):
+    """In-process detailed extraction stage for a POJob (uses job.po_folder from the basic stage)"""
+    po_info = extract_details_for_folder(job.po_folder, job.po_number, job.ocr_pages)
+    if po_info is None:
+        raise StageError("detail_extract", f"PO file not found in {job.po_folder}")
+    job.po_info = po_info
+    moved_pdf = os.path.join(job.po_folder, os.path.basename(job.searchable_pdf))
+    if os.path.exists(moved_pdf):
+        job.searchable_pdf = moved_pdf
+        if os.path.exists(artifact_path_for(moved_pdf)):
+            job.ocr_artifact = artifact_path_for(moved_pdf)
+    return job
+
+def main():
+    # Find the most recent PO folder (starts with 455)
+    po_folders = [d for d in os.listdir('.') if os.path.isdir(d) and d.startswith('455')]
+    if not po_folders:
+        print("No PO folders found")
+        return
+    
+    # Get the most recently modified PO folder
+    po_folder = max(po_folders, key=lambda d: os.path.getmtime(d))
+    extract_details_for_folder(po_folder)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
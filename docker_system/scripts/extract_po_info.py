@@ -3,19 +3,22 @@ Extract Purchase Order Information and Split PDF
 """
 
 import fitz
-import pytesseract
-from PIL import Image
-import io
+import ocr_engine
+import pdf_optimizer
+import raster
 import re
 import json
 import os
 
+from ocr_artifact import artifact_path_for, load_ocr_artifact, page_texts
+from po_job import POJob, StageError
+
 # Use system tesseract (container has it installed)
 
-def extract_text_from_pdf(pdf_path):
-    """Extract all text from PDF using OCR"""
+def extract_page_texts(pdf_path):
+    """Extract the text of every PDF page (OCR fallback for pages without a text layer)"""
     doc = fitz.open(pdf_path)
-    all_text = ""
+    page_texts = []
     
     for page_num in range(len(doc)):
         page = doc[page_num]
@@ -25,14 +28,19 @@ def extract_text_from_pdf(pdf_path):
         
         # If no text found, use OCR
         if not page_text.strip():
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-            img_data = pix.tobytes("png")
-            img = Image.open(io.BytesIO(img_data))
-            page_text = pytesseract.image_to_string(img)
+            img = raster.render_gray(page, scale=raster.render_scale(page, 2 / raster.BASE_SCALE))
+            page_text = ocr_engine.image_to_string(img)
         
-        all_text += f"PAGE {page_num + 1}:\n{page_text}\n\n"
+        page_texts.append(page_text)
     
     doc.close()
+    return page_texts
+
+def extract_text_from_pdf(pdf_path):
+    """Extract all text from PDF using OCR"""
+    all_text = ""
+    for page_num, page_text in enumerate(extract_page_texts(pdf_path)):
+        all_text += f"PAGE {page_num + 1}:\n{page_text}\n\n"
     return all_text
 
 def extract_po_number(text):
@@ -65,49 +73,70 @@ def extract_page_count(text):
                     continue
     return None
 
-def create_po_folder(po_number):
+def create_po_folder(po_number, base_dir=None):
     """Create folder with PO number name"""
-    folder_path = os.path.join(os.getcwd(), po_number)
+    folder_path = os.path.join(base_dir or os.getcwd(), po_number)
     os.makedirs(folder_path, exist_ok=True)
     return folder_path
 
-def split_pdf(input_pdf, po_number, page_count, output_folder):
-    """Split PDF into PO section and Router section"""
+def split_pdf(input_pdf, po_number, page_count, output_folder, output_sizes=None):
+    """Split PDF into PO section and Router section
+    
+    Each part is copied with a single insert_pdf call (shared fonts/images are
+    copied once) and saved compactly; output_sizes, when given, receives
+    "po"/"router": (bytes written, bytes without optimisation or None)
+    """
     doc = fitz.open(input_pdf)
     total_pages = len(doc)
     
     # Create PO document (first 'page_count' pages)
     po_doc = fitz.open()
-    for page_num in range(min(page_count, total_pages)):
-        po_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
+    po_doc.insert_pdf(doc, from_page=0, to_page=min(page_count, total_pages) - 1)
     
     po_filename = f"PO_{po_number}.pdf"
     po_path = os.path.join(output_folder, po_filename)
-    po_doc.save(po_path)
+    sizes = {"po": pdf_optimizer.save_optimized(po_doc, po_path)}
     po_doc.close()
     
     # Create Router document (remaining pages)
     if total_pages > page_count:
         router_doc = fitz.open()
-        for page_num in range(page_count, total_pages):
-            router_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
+        router_doc.insert_pdf(doc, from_page=page_count, to_page=total_pages - 1)
         
         router_filename = f"Router_{po_number}.pdf"
         router_path = os.path.join(output_folder, router_filename)
-        router_doc.save(router_path)
+        sizes["router"] = pdf_optimizer.save_optimized(router_doc, router_path)
         router_doc.close()
     else:
         router_path = None
     
     doc.close()
+    for part, (written, plain_size) in sizes.items():
+        saved = f" ({plain_size - written} saved)" if plain_size is not None else ""
+        print(f"Saved {part} PDF: {written} bytes{saved}")
+    if output_sizes is not None:
+        output_sizes.update(sizes)
     return po_path, router_path
 
-def main():
-    # Get searchable PDF name from environment variable or use default
-    input_pdf = os.environ.get("SEARCHABLE_PDF", "final_searchable_output.pdf")
-    
-    print("Extracting text from PDF...")
-    text = extract_text_from_pdf(input_pdf)
+def run_basic_extraction(job):
+    """
+    In-process basic extraction stage for a POJob
+    - Uses the OCR stage's page texts (job / artifact), reading job.searchable_pdf only without them
+    - Finds the PO number and page count
+    - Creates the PO folder, writes the initial JSON and splits the PDF
+    Raises StageError when the PO number or page count cannot be found
+    """
+    input_pdf = job.searchable_pdf
+    
+    if not job.page_texts:
+        # Prefer the OCR stage's artifact over reading the PDF text again
+        job.ocr_pages = job.ocr_pages or load_ocr_artifact(artifact_path_for(input_pdf))
+        if job.ocr_pages:
+            job.page_texts = page_texts(job.ocr_pages)
+        else:
+            print("Extracting text from PDF...")
+            job.page_texts = extract_page_texts(input_pdf)
+    text = job.text
     
     print("Extracting purchase order number...")
     po_number = extract_po_number(text)
@@ -116,14 +145,10 @@ def main():
     page_count = extract_page_count(text)
     
     if not po_number:
-        print("Could not find purchase order number starting with 455")
-        import sys as _sys
-        _sys.exit(1)
+        raise StageError("basic_extract", "Could not find purchase order number starting with 455")
     
     if not page_count:
-        print("Could not find page count information")
-        import sys as _sys
-        _sys.exit(1)
+        raise StageError("basic_extract", "Could not find page count information")
     
     print(f"Found PO Number: {po_number}")
     print(f"Found Page Count: {page_count}")
@@ -132,11 +157,12 @@ def main():
     po_info = {
         "purchase_order_number": po_number,
         "page_count": page_count,
-        "source_file": input_pdf
+        "source_file": input_pdf,
+        "blank_pages": job.blank_pages
     }
     
     # Create folder
-    output_folder = create_po_folder(po_number)
+    output_folder = create_po_folder(po_number, job.work_dir)
     
     # Save JSON file
     json_path = os.path.join(output_folder, f"{po_number}_info.json")
@@ -148,13 +174,36 @@ def main():
     
     # Split PDF
     print("Splitting PDF...")
-    po_path, router_path = split_pdf(input_pdf, po_number, page_count, output_folder)
+    po_path, router_path = split_pdf(input_pdf, po_number, page_count, output_folder,
+                                     output_sizes=job.output_sizes)
     
     print(f"Created PO file: {po_path}")
     if router_path:
         print(f"Created Router file: {router_path}")
     else:
         print("No additional pages for Router file")
+    
+    job.po_number = po_number
+    job.page_count = page_count
+    job.po_folder = output_folder
+    job.json_path = json_path
+    job.po_pdf = po_path
+    job.router_pdf = router_path
+    job.po_info = po_info
+    return job
+
+def main():
+    # Get searchable PDF name from environment variable or use default
+    input_pdf = os.environ.get("SEARCHABLE_PDF", "final_searchable_output.pdf")
+    
+    job = POJob(input_pdf)
+    job.searchable_pdf = input_pdf
+    try:
+        run_basic_extraction(job)
+    except StageError as e:
+        print(e)
+        import sys as _sys
+        _sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
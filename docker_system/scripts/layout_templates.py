@@ -0,0 +1,136 @@
+"""
+PO layout templates
+Registry of known PO forms mapping extracted fields to fixed page zones, each
+OCR'd at its own resolution with its own page segmentation mode / whitelist.
+
+A template is recognised from a few small detection zones on the first page.
+The OCR stage then reads each page's zones in addition to the full-page OCR
+and appends their text to the page text, so small print (line items,
+clauses) is also read at a resolution suited to it. Pages of unrecognised
+layouts only get the full-page OCR. Set LAYOUT_ZONE_OCR=false to skip the
+zones.
+
+Rects are relative to the page (x0, y0, x1, y1 in 0..1) so they hold for any
+scan resolution.
+"""
+
+import os
+import re
+
+import fitz
+
+import ocr_engine
+import raster
+
+ZONE_OCR = os.getenv("LAYOUT_ZONE_OCR", "true").lower() == "true"
+
+HEADER_WHITELIST = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz/-*().,:@_&"
+
+TEMPLATES = [
+    {
+        "name": "parker_meggitt_po",
+        # Every detection zone must match for the template to apply
+        "detect": [
+            {"rect": (0.10, 0.12, 0.45, 0.19), "pattern": r"purchase\s*order", "scale": 2, "psm": 6},
+            {"rect": (0.55, 0.18, 0.85, 0.24), "pattern": r"455\d{7}", "scale": 3, "psm": 6},
+        ],
+        # "Page X of N" and the PO number; read by batch_splitter on pages lazy OCR deferred
+        "page_marker": {"rect": (0.55, 0.15, 0.95, 0.24), "scale": 3, "psm": 6},
+        # Zones in reading order; "pages" is "first" or "all"
+        "zones": [
+            {
+                "name": "header",
+                "rect": (0.12, 0.13, 0.95, 0.385),
+                "pages": "first",
+                "scale": 3,
+                "psm": 6,
+                "whitelist": HEADER_WHITELIST,
+            },
+            {
+                "name": "body",
+                "rect": (0.12, 0.36, 0.92, 0.80),
+                "pages": "all",
+                "scale": 4,  # small table print: line items, clauses
+                "psm": 6,
+                "whitelist": None,
+            },
+        ],
+    },
+]
+
+
+def _zone_config(zone):
+    config = f"--oem 3 --psm {zone.get('psm', 6)}"
+    if zone.get("whitelist"):
+        config += f" -c tessedit_char_whitelist={zone['whitelist']}"
+    return config
+
+
+def _zone_rect(page, rect):
+    x0, y0, x1, y1 = rect
+    r = page.rect
+    return fitz.Rect(r.x0 + x0 * r.width, r.y0 + y0 * r.height,
+                     r.x0 + x1 * r.width, r.y0 + y1 * r.height)
+
+
+def render_zone(page, zone):
+    """Grayscale raster of one template zone of a fitz page"""
+    scale = raster.render_scale(page, zone.get("scale", raster.BASE_SCALE) / raster.BASE_SCALE)
+    return raster.render_gray(page, scale=scale, clip=_zone_rect(page, zone["rect"]))
+
+
+def ocr_zone(page, zone):
+    """OCR one template zone of a fitz page"""
+    return ocr_engine.image_to_string(render_zone(page, zone), config=_zone_config(zone))
+
+
+def zone_text(page, zone):
+    """Text of a zone: the page's own text layer when it has one, otherwise OCR"""
+    text = page.get_text(clip=_zone_rect(page, zone["rect"]))
+    return text if text.strip() else ocr_zone(page, zone)
+
+
+def match_template(page):
+    """First registered template whose detection zones all match the page (or None)"""
+    for template in TEMPLATES:
+        try:
+            if all(re.search(check["pattern"], ocr_zone(page, check), re.IGNORECASE)
+                   for check in template["detect"]):
+                return template
+        except Exception as e:
+            print(f"Layout detection for {template['name']} failed: {e}")
+    return None
+
+
+def template_named(name):
+    """Registered template by name (None when unknown)"""
+    for template in TEMPLATES:
+        if template["name"] == name:
+            return template
+    return None
+
+
+def render_page_zones(page, template, first_page):
+    """[(zone name, raster)] of the template zones that apply to a page"""
+    return [(zone["name"], render_zone(page, zone)) for zone in template["zones"]
+            if first_page or zone.get("pages", "all") != "first"]
+
+
+def ocr_zone_images(template, zone_images):
+    """Text of rendered zones (render_page_zones) in reading order (None when nothing was read)"""
+    zones = {zone["name"]: zone for zone in template["zones"]}
+    parts = []
+    for name, img in zone_images:
+        try:
+            text = ocr_engine.image_to_string(img, config=_zone_config(zones[name]))
+        except Exception as e:
+            print(f"Zone OCR {template['name']}/{name} failed: {e}")
+            continue
+        if text.strip():
+            parts.append(text.rstrip("\n") + "\n")
+    return "\n".join(parts) if parts else None
+
+
+def ocr_page_zones(page, template, first_page):
+    """Text of a page assembled from its template zones (None when nothing was read)"""
+    return ocr_zone_images(template, render_page_zones(page, template, first_page))
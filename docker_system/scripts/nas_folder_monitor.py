@@ -201,16 +201,33 @@ class POProcessorHandler(FileSystemEventHandler):
             script_dir = Path(__file__).parent
             os.chdir(script_dir)
             
-            # Import processing functions
-            from process_po_complete import process_pdf_file
+            # Import processing functions (loaded once per monitor process)
+            from process_po_complete import run_batch_pipeline
             
-            # Process the PDF
-            success = process_pdf_file(str(pdf_path))
+            # Process the PDF in-process (one job per PO when the scan is a multi-PO batch)
+            jobs = run_batch_pipeline(str(pdf_path))
+            # Deferred router text layers are written into the PO folder; finish before it moves
+            for job in jobs:
+                job.wait_for_text_layer()
             
-            if success:
-                self.handle_successful_processing(pdf_path)
+            if len(jobs) == 1:
+                if jobs[0].success:
+                    self.handle_successful_processing(pdf_path, jobs[0].po_folder)
+                else:
+                    self.handle_failed_processing(pdf_path, "Processing failed")
+                return
+            
+            # Batch: every PO that made it gets its own folder and notification
+            failed = []
+            for job in jobs:
+                if job.success:
+                    self.handle_successful_processing(pdf_path, job.po_folder, move_original=False)
+                else:
+                    failed.append(f"{job.base_name}: {job.error or 'Processing failed'}")
+            if failed:
+                self.handle_failed_processing(pdf_path, f"{len(failed)} of {len(jobs)} POs in batch failed - " + "; ".join(failed))
             else:
-                self.handle_failed_processing(pdf_path, "Processing failed")
+                self.move_to_processed(pdf_path)
                 
         except Exception as e:
             logging.error(f"Error processing {pdf_path}: {e}")
@@ -218,12 +235,23 @@ class POProcessorHandler(FileSystemEventHandler):
         finally:
             os.chdir(original_cwd)
     
-    def handle_successful_processing(self, original_pdf):
-        """Handle successful processing"""
+    def move_to_processed(self, original_pdf):
+        """Move the original scan to the processed folder; returns its new path"""
+        processed_pdf = self.processed_folder / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{original_pdf.name}"
+        shutil.move(str(original_pdf), str(processed_pdf))
+        logging.info(f"  - Original PDF moved to: {processed_pdf}")
+        return processed_pdf
+    
+    def handle_successful_processing(self, original_pdf, po_folder=None, move_original=True):
+        """Handle successful processing (move_original=False for one PO of a batch scan)"""
         try:
-            # Find the created PO folder
-            script_dir = Path(__file__).parent
-            po_folders = [d for d in script_dir.iterdir() if d.is_dir() and d.name.startswith('455')]
+            if po_folder:
+                # Folder reported by the pipeline job
+                po_folders = [Path(po_folder)]
+            else:
+                # Fall back to the most recent PO folder next to the scripts
+                script_dir = Path(__file__).parent
+                po_folders = [d for d in script_dir.iterdir() if d.is_dir() and d.name.startswith('455')]
             
             if po_folders:
                 # Get the most recently created PO folder
@@ -236,13 +264,12 @@ class POProcessorHandler(FileSystemEventHandler):
                     shutil.rmtree(destination)
                 shutil.move(str(latest_po_folder), str(destination))
                 
-                # Move original PDF to processed folder
-                processed_pdf = self.processed_folder / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{original_pdf.name}"
-                shutil.move(str(original_pdf), str(processed_pdf))
-                
                 logging.info(f"Successfully processed PO {po_number}")
                 logging.info(f"  - PO folder moved to: {destination}")
-                logging.info(f"  - Original PDF moved to: {processed_pdf}")
+                
+                # Move original PDF to processed folder
+                if move_original:
+                    self.move_to_processed(original_pdf)
                 
                 # Try to read additional PO details from JSON
                 part_number = "Not extracted"
@@ -0,0 +1,116 @@
+"""
+Per-job OCR artifact
+Page texts and word boxes written once by the OCR stage and read by every
+later stage (PO number / page count detection, field extraction, router
+validation) instead of re-reading or re-OCR'ing the PDF
+
+Word boxes are stored per page in columnar form (one list per attribute, in
+image pixels) so geometric readers can scan them without per-word objects
+"""
+
+import json
+import os
+
+ARTIFACT_VERSION = 2
+
+WORD_COLUMNS = ("text", "left", "top", "width", "height", "conf")
+
+
+def artifact_path_for(pdf_path):
+    """Artifact file that sits next to a searchable PDF"""
+    return os.path.splitext(pdf_path)[0] + "_ocr.json"
+
+
+def ocr_words(ocr, min_conf=5):
+    """Word boxes from a pytesseract image_to_data dict as [text, left, top, width, height, conf] rows"""
+    words = []
+    n = len(ocr["text"]) if "text" in ocr else 0
+    for i in range(n):
+        txt = (ocr["text"][i] or "").strip()
+        if not txt:
+            continue
+        conf_raw = ocr.get("conf", ["-1"])[i]
+        try:
+            conf = int(float(conf_raw)) if str(conf_raw) != "-1" else 0
+        except Exception:
+            conf = 0
+        if conf < min_conf:
+            continue
+        w = ocr["width"][i]
+        h = ocr["height"][i]
+        if h <= 1 or w <= 1:
+            continue
+        words.append([txt, ocr["left"][i], ocr["top"][i], w, h, conf])
+    return words
+
+
+def words_to_columns(words):
+    """[text, left, top, width, height, conf] rows -> {column: [values]}"""
+    columns = {name: [] for name in WORD_COLUMNS}
+    for row in words:
+        for name, value in zip(WORD_COLUMNS, row):
+            columns[name].append(value)
+    return columns
+
+
+def word_rows(record):
+    """[text, left, top, width, height, conf] rows of a page record"""
+    words = record.get("words") or {}
+    if isinstance(words, list):
+        return words
+    return [list(row) for row in zip(*(words.get(name, []) for name in WORD_COLUMNS))]
+
+
+def build_page_record(page_num, text, words, image_size, pdf_size, rotation=0,
+                      orientation_method=None, timings=None):
+    """One page entry of the artifact"""
+    return {
+        "page": page_num + 1,
+        "text": text,
+        "image_width": image_size[0],
+        "image_height": image_size[1],
+        "pdf_width": pdf_size[0],
+        "pdf_height": pdf_size[1],
+        "rotation": rotation,
+        "orientation_method": orientation_method,
+        "timings": timings or {},
+        "words": words_to_columns(words),
+    }
+
+
+def save_ocr_artifact(path, pages, source_pdf=None):
+    """Write the page records to disk"""
+    artifact = {
+        "version": ARTIFACT_VERSION,
+        "source_pdf": source_pdf,
+        "pages": pages,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, separators=(",", ":"))
+    return path
+
+
+def load_ocr_artifact(path):
+    """Read page records from disk (None when the artifact is missing or unreadable)"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            artifact = json.load(f)
+    except Exception as e:
+        print(f"Warning: Could not read OCR artifact {path}: {e}")
+        return None
+    if artifact.get("version") != ARTIFACT_VERSION:
+        print(f"Warning: Ignoring OCR artifact {path} with version {artifact.get('version')}")
+        return None
+    return artifact.get("pages")
+
+
+def page_texts(pages, start=0, end=None):
+    """Texts of pages[start:end]"""
+    return [p.get("text", "") for p in pages[start:end]]
+
+
+def format_page_texts(texts, first_page=1):
+    """Join page texts in the 'PAGE N:' layout the extractors expect"""
+    return "".join(f"PAGE {first_page + i}:\n{t}\n\n" for i, t in enumerate(texts))
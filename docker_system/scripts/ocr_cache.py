@@ -0,0 +1,193 @@
+"""
+Content-addressed OCR result cache
+Stores Tesseract results (text, word boxes / confidences, OSD) in SQLite keyed
+by a hash of the exact raster handed to Tesseract plus the OCR settings, so
+re-running a PO over unchanged pages skips Tesseract entirely.
+
+Entries are evicted least-recently-used once the store grows past
+OCR_CACHE_MAX_MB; the store's total size is kept in a meta row updated with
+each write. Hits only queue their last_used update, written in batches (with
+the next write, every OCR_CACHE_TOUCH_BATCH hits and at exit), so LRU order is
+approximate. Set OCR_CACHE_ENABLED=false to bypass the cache.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+CACHE_PATH = os.getenv("OCR_CACHE_PATH", "/app/logs/ocr_cache.sqlite")
+MAX_BYTES = int(float(os.getenv("OCR_CACHE_MAX_MB", "512")) * 1024 * 1024)
+TOUCH_BATCH = int(os.getenv("OCR_CACHE_TOUCH_BATCH", "64"))
+# Bump when a change makes earlier cached results invalid
+CACHE_VERSION = 1
+
+_conn = None
+_conn_pid = None
+_lock = threading.Lock()
+_disabled = os.getenv("OCR_CACHE_ENABLED", "true").lower() != "true"
+_touches = {}  # key -> last hit time, not yet written
+
+stats = {"hits": 0, "misses": 0}
+
+
+def _connect():
+    """Per-process connection (None when the cache is disabled or unusable)"""
+    global _conn, _conn_pid, _disabled
+    if _disabled:
+        return None
+    if _conn is not None and _conn_pid == os.getpid():
+        return _conn
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_results ("
+            " key TEXT PRIMARY KEY, kind TEXT, value BLOB, size INTEGER,"
+            " created REAL, last_used REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_results_last_used ON ocr_results(last_used)")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value INTEGER)")
+        # Running total of the stored sizes; seeded once for stores created before it existed
+        conn.execute(
+            "INSERT OR IGNORE INTO cache_meta (key, value)"
+            " SELECT 'total_size', COALESCE(SUM(size), 0) FROM ocr_results"
+        )
+        conn.commit()
+    except Exception as e:
+        print(f"Warning: OCR cache unavailable ({CACHE_PATH}): {e}")
+        _disabled = True
+        return None
+    _conn, _conn_pid = conn, os.getpid()
+    return _conn
+
+
+def make_key(kind, img, settings):
+    """Hash of the raster plus everything that influences the OCR result"""
+    if _disabled:
+        return None
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{CACHE_VERSION}|{kind}|{settings}|".encode())
+    if isinstance(img, np.ndarray):
+        arr = np.ascontiguousarray(img)
+        h.update(f"{arr.shape}|{arr.dtype}|".encode())
+        h.update(arr.data)
+    else:
+        h.update(f"{img.mode}|{img.size}|".encode())
+        h.update(img.tobytes())
+    return h.hexdigest()
+
+
+def get(key):
+    """Cached value for key (None on a miss)"""
+    if key is None:
+        return None
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute("SELECT value FROM ocr_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                stats["misses"] += 1
+                return None
+            _touches[key] = time.time()
+            if len(_touches) >= TOUCH_BATCH:
+                _flush_touches(conn)
+                conn.commit()
+            stats["hits"] += 1
+            return json.loads(zlib.decompress(row[0]))
+        except Exception as e:
+            print(f"Warning: OCR cache read failed: {e}")
+            return None
+
+
+def put(key, kind, value):
+    """Store a JSON-serialisable OCR result and evict old entries if over budget"""
+    if key is None:
+        return
+    blob = zlib.compress(json.dumps(value, separators=(",", ":")).encode(), 6)
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return
+        try:
+            # Other processes write too: read the replaced size and update the total in one transaction
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT size FROM ocr_results WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO ocr_results (key, kind, value, size, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, blob, len(blob), now, now),
+            )
+            _add_to_total(conn, len(blob) - (row[0] if row else 0))
+            _flush_touches(conn)
+            _evict(conn)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Warning: OCR cache write failed: {e}")
+
+
+def _add_to_total(conn, delta):
+    conn.execute("UPDATE cache_meta SET value = value + ? WHERE key = 'total_size'", (delta,))
+
+
+def _flush_touches(conn):
+    """Write the queued last_used updates (caller commits)"""
+    if _touches:
+        conn.executemany("UPDATE ocr_results SET last_used = ? WHERE key = ?",
+                         [(used, key) for key, used in _touches.items()])
+        _touches.clear()
+
+
+def flush():
+    """Write any queued last_used updates now"""
+    with _lock:
+        if not _touches or _disabled or _conn is None or _conn_pid != os.getpid():
+            return
+        try:
+            _flush_touches(_conn)
+            _conn.commit()
+        except Exception as e:
+            print(f"Warning: OCR cache write failed: {e}")
+
+
+atexit.register(flush)
+
+
+def _evict(conn):
+    """Drop least recently used entries until the store is under 90% of the budget (caller commits)"""
+    total = conn.execute("SELECT value FROM cache_meta WHERE key = 'total_size'").fetchone()[0]
+    if total <= MAX_BYTES:
+        return
+    target = int(MAX_BYTES * 0.9)
+    freed = 0
+    doomed = []
+    for key, size in conn.execute("SELECT key, size FROM ocr_results ORDER BY last_used"):
+        if total - freed <= target:
+            break
+        doomed.append((key,))
+        freed += size
+    conn.executemany("DELETE FROM ocr_results WHERE key = ?", doomed)
+    _add_to_total(conn, -freed)
+    print(f"OCR cache: evicted {len(doomed)} entries ({freed / 1024 / 1024:.1f} MB)")
+
+
+def cached(kind, img, settings, compute):
+    """compute() through the cache for this raster and settings"""
+    key = make_key(kind, img, settings)
+    value = get(key)
+    if value is None:
+        value = compute()
+        put(key, kind, value)
+    return value
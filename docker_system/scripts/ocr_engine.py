@@ -0,0 +1,326 @@
+"""
+Long-lived OCR engine
+Keeps a pool of warm Tesseract API handles (tesserocr) per process so the
+traineddata is loaded once and images are passed in memory, instead of
+pytesseract's fork/exec of the tesseract binary plus temp files per call.
+
+The functions mirror the pytesseract calls the pipeline uses:
+    image_to_string(img, config)  -> str
+    image_to_data(img, config)    -> dict (pytesseract Output.DICT layout)
+    image_to_osd(img)             -> str  (tesseract OSD text layout)
+
+When tesserocr is not installed (or OCR_ENGINE=pytesseract) every call
+falls back to pytesseract, so behaviour is unchanged on such hosts.
+
+Results go through ocr_cache, so an identical raster with identical settings
+and the same Tesseract build and traineddata is only OCR'd once.
+"""
+
+import glob
+import hashlib
+import os
+import queue
+import shlex
+import threading
+
+import numpy as np
+from PIL import Image
+import pytesseract
+
+import ocr_cache
+
+# Default page segmentation mode of the tesseract CLI (PSM.AUTO)
+DEFAULT_PSM = 3
+DEFAULT_OEM = 3
+
+_DATA_KEYS = ("level", "page_num", "block_num", "par_num", "line_num", "word_num",
+              "left", "top", "width", "height", "conf", "text")
+
+_tesserocr = None          # module once imported, False when unavailable
+_pools = {}                # (lang, oem, osd) -> _HandlePool
+_pools_lock = threading.Lock()
+_pools_pid = None          # handles never cross a fork
+_failed_keys = set()       # engine keys whose Init failed; those calls use pytesseract
+_identity = None           # Tesseract version + traineddata hash, see engine_identity
+
+
+def _load_tesserocr():
+    """Import tesserocr on first use (None when disabled or not installed)"""
+    global _tesserocr
+    if _tesserocr is None:
+        if os.getenv("OCR_ENGINE", "tesserocr").lower() == "pytesseract":
+            _tesserocr = False
+        else:
+            try:
+                import tesserocr
+                _tesserocr = tesserocr
+            except ImportError:
+                print("Info: tesserocr not available, OCR engine uses pytesseract")
+                _tesserocr = False
+    return _tesserocr or None
+
+
+def backend_name():
+    """'tesserocr' when warm handles are in use, else 'pytesseract'"""
+    return "tesserocr" if _load_tesserocr() else "pytesseract"
+
+
+def parse_config(config):
+    """Split a pytesseract config string into (oem, psm, variables)"""
+    oem, psm, variables = DEFAULT_OEM, DEFAULT_PSM, {}
+    tokens = shlex.split(config or "")
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == "--oem" and i + 1 < len(tokens):
+            oem = int(tokens[i + 1])
+            i += 2
+        elif token == "--psm" and i + 1 < len(tokens):
+            psm = int(tokens[i + 1])
+            i += 2
+        elif token == "-c" and i + 1 < len(tokens):
+            name, _, value = tokens[i + 1].partition("=")
+            variables[name] = value
+            i += 2
+        else:
+            i += 1
+    return oem, psm, variables
+
+
+class _HandlePool:
+    """Bounded pool of initialised PyTessBaseAPI handles for one (lang, oem) pair"""
+
+    def __init__(self, lang, oem, osd=False, size=None):
+        self.lang = lang
+        self.oem = oem
+        self.osd = osd
+        self.size = size or max(1, int(os.getenv("OCR_ENGINE_POOL_SIZE", "2")))
+        self.created = 0
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+
+    def _new_handle(self):
+        tesserocr = _load_tesserocr()
+        kwargs = {"lang": self.lang, "oem": self.oem}
+        # Discovered rather than taken from TESSDATA_PREFIX: a stale prefix must not disable the pool
+        tessdata = _tessdata_dir()
+        if tessdata:
+            kwargs["path"] = tessdata
+        if self.osd:
+            kwargs["psm"] = tesserocr.PSM.OSD_ONLY
+        return tesserocr.PyTessBaseAPI(**kwargs)
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                try:
+                    return self._new_handle()
+                except Exception:
+                    self.created -= 1
+                    raise
+        return self.idle.get()
+
+    def release(self, api):
+        api.Clear()
+        self.idle.put(api)
+
+
+def _get_pool(lang, oem, osd=False):
+    """Pool for an engine key, created lazily per process"""
+    global _pools_pid
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # Forked child: the parent's handles are not ours to use
+            _pools.clear()
+            _failed_keys.clear()
+            _pools_pid = os.getpid()
+        key = (lang, oem, osd)
+        if key not in _pools:
+            _pools[key] = _HandlePool(lang, oem, osd)
+        return _pools[key]
+
+
+def _set_image(api, img):
+    """Hand the pixels to Tesseract without encoding them to a file format"""
+    if isinstance(img, np.ndarray):
+        arr = np.ascontiguousarray(img)
+        height, width = arr.shape[:2]
+        bpp = 1 if arr.ndim == 2 else arr.shape[2]
+        api.SetImageBytes(arr.tobytes(), width, height, bpp, width * bpp)
+    else:
+        api.SetImage(img)
+
+
+def _run(config, img, work, lang="eng", osd=False):
+    """Run work(api) on a pooled handle configured from a pytesseract config string
+
+    Returns None when no warm handle can be used so callers fall back to pytesseract
+    """
+    if not _load_tesserocr():
+        return None
+    oem, psm, variables = parse_config(config)
+    key = (lang, oem, osd)
+    if key in _failed_keys:
+        return None
+    pool = _get_pool(lang, oem, osd)
+    try:
+        api = pool.acquire()
+    except Exception as e:
+        print(f"WARNING: OCR engine: tesserocr is installed but Tesseract handle {key} failed to "
+              f"initialise (tessdata: {_tessdata_dir()}): {e}; these calls fall back to the much "
+              f"slower pytesseract CLI")
+        _failed_keys.add(key)
+        return None
+
+    previous = {}
+    try:
+        if not osd:
+            api.SetPageSegMode(psm)
+        for name, value in variables.items():
+            previous[name] = api.GetVariableAsString(name)
+            api.SetVariable(name, value)
+        _set_image(api, img)
+        return work(api)
+    finally:
+        # Handles are shared between calls: restore any -c overrides
+        for name, value in previous.items():
+            if value is not None:
+                api.SetVariable(name, value)
+        pool.release(api)
+
+
+def _tessdata_dir():
+    """Directory holding the traineddata files Tesseract loads (None when not found)"""
+    candidates = [os.getenv("TESSDATA_PREFIX")]
+    tesserocr = _load_tesserocr()
+    if tesserocr:
+        try:
+            candidates.append(tesserocr.get_languages()[0])
+        except Exception:
+            pass
+    candidates += sorted(glob.glob("/usr/share/tesseract-ocr/*/tessdata"), reverse=True)
+    candidates += ["/usr/share/tessdata", "/usr/local/share/tessdata"]
+    for path in candidates:
+        if path and glob.glob(os.path.join(path, "*.traineddata")):
+            return path
+    return None
+
+
+def engine_identity():
+    """Tesseract version plus a hash of the installed traineddata files (computed once per process)"""
+    global _identity
+    if _identity is None:
+        tesserocr = _load_tesserocr()
+        try:
+            if tesserocr:
+                version = tesserocr.tesseract_version().split("\n")[0].strip()
+            else:
+                version = str(pytesseract.get_tesseract_version())
+        except Exception:
+            version = "unknown"
+        h = hashlib.blake2b(digest_size=12)
+        tessdata = _tessdata_dir()
+        for path in sorted(glob.glob(os.path.join(tessdata, "*.traineddata"))) if tessdata else []:
+            h.update(f"{os.path.basename(path)}|".encode())
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+        _identity = f"{version}|{h.hexdigest()}"
+    return _identity
+
+
+def _settings(config):
+    """Cache settings string: backend, engine build, traineddata and config all change the output"""
+    return f"{backend_name()}|{engine_identity()}|{config}"
+
+
+def _image_to_string(img, config):
+    result = _run(config, img, lambda api: api.GetUTF8Text())
+    if result is None:
+        return pytesseract.image_to_string(img, config=config)
+    return result
+
+
+def image_to_string(img, config=""):
+    """OCR an image to plain text"""
+    return ocr_cache.cached("string", img, _settings(config), lambda: _image_to_string(img, config))
+
+
+def _collect_data(api):
+    """Word-level results in pytesseract's image_to_data DICT layout"""
+    tesserocr = _load_tesserocr()
+    RIL = tesserocr.RIL
+    data = {key: [] for key in _DATA_KEYS}
+    api.Recognize()
+    ri = api.GetIterator()
+    if ri is None:
+        return data
+    block = par = line = word = 0
+    for r in tesserocr.iterate_level(ri, RIL.WORD):
+        if r.IsAtBeginningOf(RIL.BLOCK):
+            block, par, line, word = block + 1, 0, 0, 0
+        if r.IsAtBeginningOf(RIL.PARA):
+            par, line, word = par + 1, 0, 0
+        if r.IsAtBeginningOf(RIL.TEXTLINE):
+            line, word = line + 1, 0
+        word += 1
+        bbox = r.BoundingBox(RIL.WORD)
+        if bbox is None:
+            continue
+        try:
+            text = r.GetUTF8Text(RIL.WORD)
+        except RuntimeError:
+            text = ""
+        x1, y1, x2, y2 = bbox
+        for key, value in zip(_DATA_KEYS, (5, 1, block, par, line, word,
+                                           x1, y1, x2 - x1, y2 - y1,
+                                           round(r.Confidence(RIL.WORD), 2), text)):
+            data[key].append(value)
+    return data
+
+
+def _image_to_data(img, config):
+    result = _run(config, img, _collect_data)
+    if result is None:
+        return pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT, config=config)
+    return result
+
+
+def image_to_data(img, config=""):
+    """OCR an image to word boxes (dict with text/left/top/width/height/conf lists)"""
+    return ocr_cache.cached("data", img, _settings(config), lambda: _image_to_data(img, config))
+
+
+def _osd_text(api):
+    """Orientation/script detection formatted like `tesseract --psm 0` output"""
+    osd = api.DetectOrientationScript()
+    if not osd:
+        raise RuntimeError("Orientation detection failed")
+    orient_deg = osd["orient_deg"]
+    return (
+        "Page number: 0\n"
+        f"Orientation in degrees: {orient_deg}\n"
+        f"Rotate: {(360 - orient_deg) % 360}\n"
+        f"Orientation confidence: {osd['orient_conf']:.2f}\n"
+        f"Script: {osd['script_name']}\n"
+        f"Script confidence: {osd['script_conf']:.2f}\n"
+    )
+
+
+def _image_to_osd(img):
+    result = _run("--oem 1", img, _osd_text, osd=True)
+    if result is None:
+        if isinstance(img, np.ndarray):
+            img = Image.fromarray(img)
+        return pytesseract.image_to_osd(img)
+    return result
+
+
+def image_to_osd(img):
+    """Orientation and script detection"""
+    return ocr_cache.cached("osd", img, _settings("osd"), lambda: _image_to_osd(img))
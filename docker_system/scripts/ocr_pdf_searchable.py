@@ -5,34 +5,126 @@ This script uses Tesseract OCR to extract text from PDF pages and creates
 a searchable PDF by overlaying invisible text at the correct positions.
 """
 
-import io
+import contextlib
+import multiprocessing
 import os
+import queue
 import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 import fitz  # PyMuPDF
-import pytesseract
+import layout_templates
+import ocr_engine
+import pdf_optimizer
+import preprocessing
+import raster
 from PIL import Image
 import numpy as np
 import cv2
 
+from extract_po_info import extract_page_count
+from ocr_artifact import artifact_path_for, build_page_record, ocr_words, page_texts, save_ocr_artifact
 
-def detect_and_correct_orientation(img: Image.Image):
+
+# Quick orientation check: OSD on a small render first, full-resolution OSD
+# only when the thumbnail result is unreliable
+OSD_THUMB_SCALE = float(os.getenv("OSD_THUMB_SCALE", "1.5"))
+OSD_THUMB_MIN_CONF = float(os.getenv("OSD_THUMB_MIN_CONF", "2.0"))
+# Row/column ink-profile variance ratio beyond which text lines are clearly
+# horizontal (0/180) or vertical (90/270)
+PROFILE_RATIO = float(os.getenv("OSD_PROFILE_RATIO", "1.5"))
+
+
+def parse_osd(osd: str):
+    """(rotate angle, orientation confidence) from tesseract OSD output"""
+    angle, confidence = 0, 0.0
+    for line in osd.split("\n"):
+        if line.startswith("Rotate:"):
+            angle = int(line.split(":")[1].strip())
+        elif line.startswith("Orientation confidence:"):
+            confidence = float(line.split(":")[1].strip())
+    return angle, confidence
+
+
+def rotate_image(img, angle: int):
+    """Rotate a PIL image or grayscale array counter-clockwise by angle degrees"""
+    if angle == 0:
+        return img
+    if isinstance(img, np.ndarray):
+        # Same counter-clockwise turn as PIL's rotate(expand=True)
+        return np.ascontiguousarray(np.rot90(img, angle // 90))
+    return img.rotate(angle, expand=True)
+
+
+def text_line_direction(gray: np.ndarray):
+    """Projection-profile guess of the text line direction on a grayscale array
+
+    Returns 'horizontal' (page upright or upside down), 'vertical' (turned
+    90/270) or None when the profiles do not clearly disagree
+    """
+    ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    row_var = float(ink.sum(axis=1, dtype=np.int32).var())
+    col_var = float(ink.sum(axis=0, dtype=np.int32).var())
+    if row_var == 0 and col_var == 0:
+        return None
+    if row_var >= col_var * PROFILE_RATIO:
+        return "horizontal"
+    if col_var >= row_var * PROFILE_RATIO:
+        return "vertical"
+    return None
+
+
+def detect_orientation_fast(thumb, full_img=None):
+    """
+    Cheap orientation detection
+
+    Runs OSD on a small grayscale render of the page (render_thumbnail) and
+    accepts it when its confidence is high enough and it agrees with the
+    projection-profile line direction. Otherwise falls back to OSD on
+    full_img (when given).
+
+    Returns:
+        tuple: (rotation_angle, method) with method 'thumbnail', 'full' or 'failed'
+    """
+    direction = text_line_direction(thumb)
+    try:
+        angle, confidence = parse_osd(ocr_engine.image_to_osd(thumb))
+        agrees = direction is None or (direction == "horizontal") == (angle in (0, 180))
+        if confidence >= OSD_THUMB_MIN_CONF and agrees:
+            return angle, "thumbnail"
+        print(f"Thumbnail OSD ambiguous (rotate {angle}, conf {confidence:.2f}, lines {direction})")
+    except Exception as e:
+        print(f"Thumbnail OSD failed: {e}")
+
+    if full_img is None:
+        return 0, "failed"
+    try:
+        angle, _ = parse_osd(ocr_engine.image_to_osd(full_img))
+        return angle, "full"
+    except Exception as e:
+        print(f"Orientation detection failed: {e}")
+        return 0, "failed"
+
+
+def detect_and_correct_orientation(img):
     """
     Detect page orientation and rotate image for optimal OCR
 
     Args:
-        img: PIL Image object
+        img: PIL Image object or grayscale NumPy array
 
     Returns:
         tuple: (corrected_image, rotation_angle)
     """
     try:
-        osd = pytesseract.image_to_osd(img)
+        osd = ocr_engine.image_to_osd(img)
         print(f"OSD output: {osd}")
-        angle = int([line for line in osd.split("\n") if "Rotate:" in line][0].split(":")[1].strip())
+        angle, _ = parse_osd(osd)
         print(f"Detected rotation angle: {angle}°")
         if angle != 0:  # Fixed logic: angle 0 is falsy but still valid
-            img = img.rotate(angle, expand=True)
+            img = rotate_image(img, angle)
             print(f"Applied {angle}° rotation to image")
         else:
             print("No rotation needed - page is correctly oriented")
@@ -42,8 +134,14 @@ def detect_and_correct_orientation(img: Image.Image):
         return img, 0
 
 
-def preprocess_image(img: Image.Image) -> Image.Image:
-    """Light denoise + threshold to improve OCR."""
+def preprocess_image(img):
+    """Light denoise + threshold to improve OCR.
+
+    A writable grayscale array is processed in place and returned; a PIL image
+    is copied and a PIL image returned.
+    """
+    if isinstance(img, np.ndarray) and img.ndim == 2 and img.flags.writeable:
+        return preprocessing.run_profile(img, "default")[0]
     arr = np.array(img)
     if len(arr.shape) == 3:
         gray = cv2.cvtColor(arr, cv2.COLOR_BGR2GRAY)
@@ -54,7 +152,509 @@ def preprocess_image(img: Image.Image) -> Image.Image:
     return Image.fromarray(thr)
 
 
-def pdf_to_searchable(input_pdf: str, output_pdf: str, save_corrected_orientation: bool = False):
+def render_page_images(page):
+    """
+    Render the rasters OCR needs for a page
+
+    Returns:
+        tuple: (grayscale array at the page's OCR resolution, orientation
+        thumbnail array, seconds spent); the array is None for blank pages
+    """
+    t0 = time.perf_counter()
+    # Grayscale samples straight from the pixmap: no PNG encode/decode
+    thumb = raster.render_gray(page, scale=OSD_THUMB_SCALE)
+    if preprocessing.is_blank(thumb):
+        return None, thumb, time.perf_counter() - t0
+    img = raster.render_gray(page, scale=raster.render_scale(page))
+    return img, thumb, time.perf_counter() - t0
+
+
+def render_zone_images(page, template):
+    """Rasters of the layout template zones that apply to a page (None without a template)"""
+    if template is None:
+        return None
+    return layout_templates.render_page_zones(page, template, first_page=page.number == 0)
+
+
+def ocr_page(pdf_document, page_num: int, template: dict = None) -> dict:
+    """
+    Render, orient, preprocess and OCR a single page
+
+    Args:
+        pdf_document: open fitz document
+        page_num: zero-based page index
+        template: layout template matched on the document (its zones are OCR'd too)
+
+    Returns:
+        see ocr_rendered_page
+    """
+    page = pdf_document[page_num]
+    img, thumb, render_seconds = render_page_images(page)
+    zone_images = render_zone_images(page, template) if img is not None else None
+    return ocr_rendered_page(page_num, img, thumb, render_seconds, template, zone_images)
+
+
+def ocr_rendered_page(page_num: int, img, thumb, render_seconds: float = 0.0,
+                      template: dict = None, zone_images: list = None) -> dict:
+    """
+    Orient, preprocess and OCR an already rendered page (no fitz calls)
+
+    Args:
+        page_num: zero-based page index
+        img, thumb, render_seconds: render_page_images() results (img is modified in place)
+        template, zone_images: layout template and its rendered zones (render_zone_images)
+
+    Returns:
+        dict with page_num, rotation, orientation method, per-step timings,
+        image_size and the filtered OCR word boxes ("blank" set and no OCR
+        run when img is None); "zone_text" holds the template zones' text
+    """
+    timings = {"render": render_seconds}
+
+    if img is None:
+        print(f"Page {page_num + 1}: blank, OCR skipped")
+        return {
+            "page_num": page_num,
+            "rotation": 0,
+            "orientation_method": None,
+            "timings": {k: round(v, 3) for k, v in timings.items()},
+            "image_size": (thumb.shape[1], thumb.shape[0]),
+            "words": [],
+            "blank": True,
+        }
+
+    t0 = time.perf_counter()
+    rotation_angle, orientation_method = detect_orientation_fast(thumb, img)
+    corrected_img = rotate_image(img, rotation_angle)
+    timings["orientation"] = time.perf_counter() - t0
+    print(f"Page {page_num + 1}: rotation {rotation_angle}° ({orientation_method}, {timings['orientation']:.2f}s)")
+
+    # Configured preprocessing profile, timed per step (preprocess_<step>)
+    t0 = time.perf_counter()
+    processed_img, prep = preprocessing.run_profile(corrected_img)
+    timings["preprocess"] = time.perf_counter() - t0
+    for step, seconds in prep["timings"].items():
+        timings[f"preprocess_{step}"] = seconds
+
+    # OCR word-level data
+    t0 = time.perf_counter()
+    ocr = ocr_engine.image_to_data(processed_img, config="--oem 3 --psm 6")
+    timings["ocr"] = time.perf_counter() - t0
+
+    # Template zones are laid out on the upright page
+    zone_text = None
+    if zone_images and rotation_angle == 0:
+        t0 = time.perf_counter()
+        zone_text = layout_templates.ocr_zone_images(template, zone_images)
+        timings["zones"] = time.perf_counter() - t0
+
+    return {
+        "page_num": page_num,
+        "rotation": rotation_angle,
+        "orientation_method": orientation_method,
+        "timings": {k: round(v, 3) for k, v in timings.items()},
+        # Word boxes are mapped back through crop/deskew onto the oriented page raster
+        "image_size": (corrected_img.shape[1], corrected_img.shape[0]),
+        "words": preprocessing.map_words_back(ocr_words(ocr), prep),
+        "zone_text": zone_text,
+    }
+
+
+_TEXT_FONT = None
+
+
+def write_text_layer(page, words, scale_x: float, scale_y: float, batched: bool = True) -> int:
+    """
+    Add OCR words to a page as invisible text (render_mode=3)
+
+    Args:
+        page: fitz page to write on
+        words: [text, left, top, width, height, conf] rows in image pixels
+        scale_x, scale_y: image pixel -> PDF point factors
+        batched: build the whole layer with one TextWriter (one text object and
+            font resource per page) instead of one insert_text call per word
+
+    Returns:
+        Number of words written
+    """
+    global _TEXT_FONT
+    if batched and _TEXT_FONT is None:
+        _TEXT_FONT = fitz.Font("helv")
+    writer = fitz.TextWriter(page.rect) if batched else None
+
+    words_added = 0
+    for txt, x, y, w, h, conf in words:
+        pdf_x = x * scale_x
+        pdf_y = y * scale_y
+        pdf_h = h * scale_y
+        origin = (pdf_x, pdf_y + pdf_h * 0.85)
+        fontsize = max(pdf_h * 0.9, 4)
+        try:
+            if batched:
+                writer.append(origin, txt, font=_TEXT_FONT, fontsize=fontsize)
+            else:
+                page.insert_text(origin, txt, fontsize=fontsize, color=(0, 0, 0), render_mode=3)
+            words_added += 1
+        except Exception:
+            continue
+
+    if batched and words_added:
+        writer.write_text(page, color=(0, 0, 0), render_mode=3)
+    return words_added
+
+
+def place_page(output_pdf_doc, pdf_document, page_num: int, rotation_angle: int, pno: int = -1):
+    """
+    Add a page showing the source page in its original orientation
+
+    Pages OCR'd at 90/270 degrees get swapped dimensions so the upright OCR
+    coordinates fit them.
+
+    Returns:
+        (new page, target rect the OCR image maps onto)
+    """
+    page = pdf_document[page_num]
+    if rotation_angle in [90, 270]:
+        new_page = output_pdf_doc.new_page(pno, width=page.rect.height, height=page.rect.width)
+        target_rect = fitz.Rect(0, 0, page.rect.height, page.rect.width)
+    else:
+        new_page = output_pdf_doc.new_page(pno, width=page.rect.width, height=page.rect.height)
+        target_rect = page.rect
+    new_page.show_pdf_page(target_rect, pdf_document, page_num)
+    return new_page, target_rect
+
+
+def write_page(output_pdf_doc, pdf_document, page_num: int, result: dict,
+               save_corrected_orientation: bool = False) -> dict:
+    """
+    Add one page with its invisible OCR text layer to the output document
+
+    Args:
+        output_pdf_doc: fitz document being built
+        pdf_document: source fitz document
+        page_num: zero-based page index in the source
+        result: ocr_page() result for that page
+        save_corrected_orientation: see pdf_to_searchable
+
+    Returns:
+        The page's OCR artifact record
+    """
+    page = pdf_document[page_num]
+    rotation_angle = result["rotation"]
+
+    # Determine page dimensions and rendering approach
+    if save_corrected_orientation and rotation_angle != 0:
+        # Save with corrected orientation for better readability
+        if rotation_angle in [90, 270]:
+            new_page = output_pdf_doc.new_page(width=page.rect.height, height=page.rect.width)
+            target_rect = fitz.Rect(0, 0, page.rect.height, page.rect.width)
+        else:
+            new_page = output_pdf_doc.new_page(width=page.rect.width, height=page.rect.height) 
+            target_rect = page.rect
+        
+        # Create a rotated version of the original page for the corrected orientation
+        # This requires creating a transformation matrix for the rotation
+        if rotation_angle == 90:
+            mat = fitz.Matrix(0, 1, -1, 0, page.rect.width, 0)
+            render_rect = fitz.Rect(0, 0, page.rect.height, page.rect.width)
+        elif rotation_angle == 180:
+            mat = fitz.Matrix(-1, 0, 0, -1, page.rect.width, page.rect.height)
+            render_rect = page.rect
+        elif rotation_angle == 270:
+            mat = fitz.Matrix(0, -1, 1, 0, 0, page.rect.height)
+            render_rect = fitz.Rect(0, 0, page.rect.height, page.rect.width)
+        else:
+            mat = fitz.Matrix(1, 0, 0, 1, 0, 0)  # No rotation
+            render_rect = page.rect
+            
+        # Render the page with rotation applied
+        zoom = raster.render_scale(page)
+        temp_pix = page.get_pixmap(matrix=mat * fitz.Matrix(zoom, zoom), alpha=False)
+
+        # Insert the rotated pixmap into the new page
+        new_page.insert_image(target_rect, pixmap=temp_pix)
+        
+        print(f"Page {page_num + 1}: Corrected orientation by {rotation_angle}° for better readability")
+    else:
+        # Original behavior: render the original page as background (maintains original orientation)
+        new_page, target_rect = place_page(output_pdf_doc, pdf_document, page_num, rotation_angle)
+
+    # Map OCR coords to PDF coords
+    image_width, image_height = result["image_size"]
+    scale_x = target_rect.width / image_width
+    scale_y = target_rect.height / image_height
+
+    words = result["words"]
+    words_added = write_text_layer(new_page, words, scale_x, scale_y)
+
+    print(f"Page {page_num + 1}: added {words_added} words")
+
+    # Page text exactly as later stages would read it back from the output PDF,
+    # followed by the layout template zones read at their own settings
+    text = new_page.get_text()
+    if result.get("zone_text"):
+        text = text.rstrip("\n") + "\n\n" + result["zone_text"]
+    return build_page_record(
+        page_num,
+        text,
+        words,
+        result["image_size"],
+        (target_rect.width, target_rect.height),
+        rotation_angle,
+        orientation_method=result.get("orientation_method"),
+        timings=result.get("timings"),
+    )
+
+
+# --- Page-parallel OCR -------------------------------------------------------
+# Workers live for the whole process so interpreter start-up and imports are
+# paid once; each worker keeps the current input PDF open between pages.
+
+_OCR_POOL = None
+_OCR_POOL_WORKERS = 0
+_OCR_POOL_LOCK = threading.Lock()  # guards pool creation / reuse across threads
+_OCR_POOL_ACTIVE = 0  # ocr_pages_parallel calls currently using the pool
+_WORKER_DOC = None
+_WORKER_DOC_PATH = None  # (path, mtime, size) of the open document
+
+
+def get_ocr_worker_count(page_total: int) -> int:
+    """Bounded worker count: OCR_WORKERS env (default: CPU count, at most OCR_MAX_WORKERS=4)"""
+    try:
+        workers = int(os.getenv("OCR_WORKERS", "0"))
+    except ValueError:
+        workers = 0
+    if workers <= 0:
+        try:
+            max_workers = int(os.getenv("OCR_MAX_WORKERS", "4"))
+        except ValueError:
+            max_workers = 4
+        workers = min(os.cpu_count() or 1, max_workers)
+    return max(1, min(workers, page_total))
+
+
+def _init_ocr_worker(omp_threads: str):
+    """Pin Tesseract's OpenMP threads so N workers don't oversubscribe N cores"""
+    os.environ["OMP_THREAD_LIMIT"] = omp_threads
+
+
+def _ocr_page_worker(input_pdf: str, page_num: int, template_name: str = None) -> dict:
+    """Process-pool entry point: OCR one page of input_pdf (with the named layout template's zones)"""
+    global _WORKER_DOC, _WORKER_DOC_PATH
+    stat = os.stat(input_pdf)
+    doc_key = (input_pdf, stat.st_mtime_ns, stat.st_size)
+    if _WORKER_DOC_PATH != doc_key:
+        if _WORKER_DOC is not None:
+            _WORKER_DOC.close()
+        _WORKER_DOC = fitz.open(input_pdf)
+        _WORKER_DOC_PATH = doc_key
+    return ocr_page(_WORKER_DOC, page_num, layout_templates.template_named(template_name) if template_name else None)
+
+
+def _get_ocr_pool(workers: int):
+    """Create (or reuse) the process pool and register the caller as a user of it"""
+    global _OCR_POOL, _OCR_POOL_WORKERS, _OCR_POOL_ACTIVE
+    with _OCR_POOL_LOCK:
+        # Resize only while no other job is mapping pages on the pool
+        if _OCR_POOL is not None and _OCR_POOL_WORKERS != workers and _OCR_POOL_ACTIVE == 0:
+            _OCR_POOL.shutdown(wait=True)
+            _OCR_POOL = None
+        if _OCR_POOL is None:
+            _OCR_POOL = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_ocr_worker,
+                initargs=(os.getenv("OCR_OMP_THREADS", "1"),),
+            )
+            _OCR_POOL_WORKERS = workers
+        _OCR_POOL_ACTIVE += 1
+        return _OCR_POOL
+
+
+def _release_ocr_pool():
+    global _OCR_POOL_ACTIVE
+    with _OCR_POOL_LOCK:
+        _OCR_POOL_ACTIVE -= 1
+
+
+def _reset_ocr_pool():
+    """Drop a broken pool so the next job starts a fresh one"""
+    global _OCR_POOL, _OCR_POOL_WORKERS
+    with _OCR_POOL_LOCK:
+        if _OCR_POOL is not None:
+            _OCR_POOL.shutdown(wait=False, cancel_futures=True)
+        _OCR_POOL = None
+        _OCR_POOL_WORKERS = 0
+
+
+def ocr_pages_parallel(input_pdf: str, page_nums: list, workers: int, template: dict = None) -> list:
+    """OCR the given pages in a process pool; results come back in page_nums order"""
+    pool = _get_ocr_pool(workers)
+    template_name = template["name"] if template else None
+    try:
+        return list(pool.map(_ocr_page_worker, [input_pdf] * len(page_nums), page_nums,
+                             [template_name] * len(page_nums)))
+    finally:
+        _release_ocr_pool()
+
+
+# --- Streaming OCR -----------------------------------------------------------
+# The caller's thread renders pages a few ahead of OCR thread(s) that only
+# see NumPy arrays (fitz is not thread-safe) and writes finished pages, so
+# OCR overlaps render and text-layer time and at most a few page rasters are
+# alive at once.
+
+STREAM_MEMORY_MB = int(os.getenv("OCR_MEMORY_MB", "512"))
+STREAM_QUEUE_DEPTH = int(os.getenv("OCR_QUEUE_DEPTH", "4"))
+STREAM_OCR_THREADS = int(os.getenv("OCR_STREAM_THREADS", "1"))
+
+_STREAM_DONE = object()
+
+
+def stream_queue_depth(page, ocr_threads: int) -> int:
+    """Rendered pages allowed to wait for OCR under the OCR_MEMORY_MB ceiling"""
+    # OCR grayscale raster plus a possible rotated copy for every page in flight
+    zoom = raster.render_scale(page)
+    page_bytes = 2 * int(page.rect.width * zoom) * int(page.rect.height * zoom)
+    fit = STREAM_MEMORY_MB * 1024 * 1024 // max(page_bytes, 1) - ocr_threads
+    return max(1, min(STREAM_QUEUE_DEPTH, fit))
+
+
+@contextlib.contextmanager
+def ocr_pages_streaming(input_pdf: str, page_nums: list, ocr_threads: int = None, template: dict = None):
+    """
+    Context manager: OCR of the given pages on background threads
+
+    Pages are rendered on the calling thread from a separate handle on
+    input_pdf; entering renders the first few so OCR runs while the caller
+    does other work. Leaving stops the OCR threads and closes the handle,
+    also when not every result was taken.
+
+    Yields:
+        iterator of ocr_rendered_page results in page_nums order; taking a
+        result renders the pages that follow
+    """
+    page_nums = list(page_nums)
+    page_total = len(page_nums)
+    ocr_threads = max(1, ocr_threads or STREAM_OCR_THREADS)
+    render_doc = fitz.open(input_pdf)
+    depth = stream_queue_depth(render_doc[page_nums[0]], ocr_threads) if page_nums else 1
+    # Pages rendered but not yet handed back: queued plus being OCR'd
+    ahead = depth + ocr_threads
+    print(f"OCR: streaming {page_total} pages (queue depth {depth}, {ocr_threads} OCR thread(s))")
+
+    pages_q = queue.Queue()
+    results_q = queue.Queue()
+    stop = threading.Event()
+    rendered = 0
+
+    def render_next():
+        nonlocal rendered
+        page_num = page_nums[rendered]
+        page = render_doc[page_num]
+        img, thumb, render_seconds = render_page_images(page)
+        zone_images = render_zone_images(page, template) if img is not None else None
+        pages_q.put((rendered, page_num, img, thumb, render_seconds, zone_images))
+        rendered += 1
+
+    def consume():
+        while True:
+            item = pages_q.get()
+            if item is _STREAM_DONE:
+                break
+            if stop.is_set():
+                continue  # drain up to the end marker
+            index, page_num, img, thumb, render_seconds, zone_images = item
+            try:
+                results_q.put((index, ocr_rendered_page(page_num, img, thumb, render_seconds,
+                                                        template, zone_images)))
+            except Exception as e:
+                results_q.put((index, e))
+
+    def results():
+        pending = {}
+        for next_index in range(page_total):
+            while rendered < min(page_total, next_index + ahead):
+                render_next()
+            while next_index not in pending:
+                index, result = results_q.get()
+                if isinstance(result, Exception):
+                    raise result
+                pending[index] = result
+            yield pending.pop(next_index)
+
+    threads = [threading.Thread(target=consume, daemon=True) for _ in range(ocr_threads)]
+    for t in threads:
+        t.start()
+    try:
+        while rendered < min(page_total, ahead):
+            render_next()
+        yield results()
+    finally:
+        stop.set()
+        for _ in threads:
+            pages_q.put(_STREAM_DONE)
+        for t in threads:
+            t.join()
+        render_doc.close()
+
+
+# --- Lazy router OCR -----------------------------------------------------------
+# Only the PO pages and the first router page feed extraction.
+# OCR_ROUTER_TEXT_LAYER=full (default) OCRs every page up front. With the
+# opt-in "background" or "none", page 1 is OCR'd first to read "Page X of Y";
+# the remaining router pages are written without a text layer and marked
+# "deferred" in their OCR records. "background" adds their text layer later
+# in a low-priority subprocess (start_deferred_text_layers).
+
+ROUTER_TEXT_LAYER = os.getenv("OCR_ROUTER_TEXT_LAYER", "full").lower()
+
+
+def po_page_count_from_words(words: list):
+    """PO page count ('Page X of Y') from one page's OCR words, or None"""
+    return extract_page_count(" ".join(w[0] for w in words))
+
+
+@contextlib.contextmanager
+def ocr_results(input_pdf: str, page_nums: list, workers: int, template: dict = None):
+    """Context manager yielding OCR results for page_nums in order: process pool when workers > 1, else streaming"""
+    if not page_nums:
+        yield iter([])
+        return
+    workers = max(1, min(workers, len(page_nums)))
+    results = None
+    if workers > 1:
+        try:
+            print(f"OCR: {len(page_nums)} pages on {workers} worker processes")
+            results = ocr_pages_parallel(input_pdf, page_nums, workers, template)
+        except Exception as e:
+            # Deterministic fallback: redo every page in this process
+            print(f"Parallel OCR failed ({e}); falling back to in-process streaming mode")
+            _reset_ocr_pool()
+    if results is not None:
+        yield iter(results)
+        return
+    # OCR runs in background threads on pages this thread renders from a
+    # separate handle on the input file; the caller writes pages as soon as they are ready
+    with ocr_pages_streaming(input_pdf, page_nums, template=template) as results:
+        yield results
+
+
+def _deferred_result(page, page_num: int) -> dict:
+    """Stand-in OCR result for a page written without a text layer"""
+    return {
+        "page_num": page_num,
+        "rotation": 0,
+        "orientation_method": None,
+        "timings": {},
+        "image_size": (page.rect.width, page.rect.height),
+        "words": [],
+        "deferred": True,
+    }
+
+
+def pdf_to_searchable(input_pdf: str, output_pdf: str, save_corrected_orientation: bool = False,
+                      artifact_path: str = None, workers: int = None, output_sizes: dict = None,
+                      router_text_layer: str = None):
     """
     Convert a PDF to a searchable PDF by adding invisible OCR text overlay
     
@@ -63,6 +663,17 @@ def pdf_to_searchable(input_pdf: str, output_pdf: str, save_corrected_orientatio
         output_pdf: Path to output searchable PDF file  
         save_corrected_orientation: If True, saves pages in corrected orientation for better readability
                                    If False, preserves original page orientation (default behavior)
+        artifact_path: If given, the per-page texts and word boxes are also written there
+                       so later stages don't need to OCR the pages again
+        workers: Number of page-parallel OCR processes (default: get_ocr_worker_count);
+                 1 streams pages rendered here through OCR threads in this process
+        output_sizes: If given, receives "searchable": (bytes written, bytes without optimisation
+            or None, see pdf_optimizer.MEASURE_SAVINGS)
+        router_text_layer: "full", "background" or "none" (default: OCR_ROUTER_TEXT_LAYER);
+                           anything but "full" OCRs only the PO pages and the first router page
+
+    Returns:
+        list: one OCR record per page (see ocr_artifact.build_page_record)
     """
     if not os.path.exists(input_pdf):
         raise FileNotFoundError(input_pdf)
@@ -72,116 +683,188 @@ def pdf_to_searchable(input_pdf: str, output_pdf: str, save_corrected_orientatio
         pdf_document.close()
         raise ValueError("Input PDF has no pages")
 
-    output_pdf_doc = fitz.open()
-
-    for page_num in range(len(pdf_document)):
-        page = pdf_document[page_num]
-        pix = page.get_pixmap(matrix=fitz.Matrix(3, 3), alpha=False)
-        img = Image.open(io.BytesIO(pix.tobytes("png"))).convert("RGB")
+    page_total = len(pdf_document)
+    router_text_layer = (router_text_layer or ROUTER_TEXT_LAYER).lower()
 
-        corrected_img, rotation_angle = detect_and_correct_orientation(img)
-        processed_img = preprocess_image(corrected_img)
+    start = time.time()
+    # Known PO form: its zones are OCR'd on every page besides the full-page OCR
+    template = layout_templates.match_template(pdf_document[0]) if layout_templates.ZONE_OCR else None
+    if template:
+        print(f"Layout template: {template['name']}")
+    first_result = None
+    full_pages = page_total
+    if router_text_layer != "full" and page_total > 1:
+        # Page 1 first: its "Page X of Y" tells where the router starts
+        first_result = ocr_page(pdf_document, 0, template)
+        po_pages = po_page_count_from_words(first_result["words"])
+        if po_pages:
+            # PO pages plus the first router page get full OCR
+            full_pages = min(page_total, po_pages + 1)
+            print(f"Lazy OCR: {po_pages} PO page(s); OCR'ing {full_pages} of {page_total} pages now")
+        else:
+            print("Lazy OCR: page count not found on page 1, OCR'ing every page")
 
-        # OCR word-level data
-        ocr = pytesseract.image_to_data(processed_img, output_type=pytesseract.Output.DICT, config="--oem 3 --psm 6")
+    page_nums = list(range(1 if first_result else 0, full_pages))
+    if workers is None:
+        workers = get_ocr_worker_count(len(page_nums) or 1)
+    output_pdf_doc = fitz.open()
+    ocr_pages = []
+    with ocr_results(os.path.abspath(input_pdf), page_nums, workers, template) as results:
+        # OCR works on its own rasters: recompress the scan images once so the
+        # searchable PDF and every file split from it carry the smaller images
+        image_bytes_saved = pdf_optimizer.recompress_images(pdf_document)
 
-        # Determine page dimensions and rendering approach
-        if save_corrected_orientation and rotation_angle != 0:
-            # Save with corrected orientation for better readability
-            if rotation_angle in [90, 270]:
-                new_page = output_pdf_doc.new_page(width=page.rect.height, height=page.rect.width)
-                target_rect = fitz.Rect(0, 0, page.rect.height, page.rect.width)
-            else:
-                new_page = output_pdf_doc.new_page(width=page.rect.width, height=page.rect.height) 
-                target_rect = page.rect
-            
-            # Create a rotated version of the original page for the corrected orientation
-            # This requires creating a transformation matrix for the rotation
-            if rotation_angle == 90:
-                mat = fitz.Matrix(0, 1, -1, 0, page.rect.width, 0)
-                render_rect = fitz.Rect(0, 0, page.rect.height, page.rect.width)
-            elif rotation_angle == 180:
-                mat = fitz.Matrix(-1, 0, 0, -1, page.rect.width, page.rect.height)
-                render_rect = page.rect
-            elif rotation_angle == 270:
-                mat = fitz.Matrix(0, -1, 1, 0, 0, page.rect.height)
-                render_rect = fitz.Rect(0, 0, page.rect.height, page.rect.width)
+        # Assemble the output strictly in page order
+        for page_num in range(page_total):
+            if page_num == 0 and first_result is not None:
+                result = first_result
+            elif page_num < full_pages:
+                result = next(results)
             else:
-                mat = fitz.Matrix(1, 0, 0, 1, 0, 0)  # No rotation
-                render_rect = page.rect
-                
-            # Render the page with rotation applied
-            temp_pix = page.get_pixmap(matrix=mat * fitz.Matrix(3, 3), alpha=False)
-            temp_img = Image.open(io.BytesIO(temp_pix.tobytes("png")))
-            
-            # Insert the rotated image into the new page
-            temp_img_bytes = io.BytesIO()
-            temp_img.save(temp_img_bytes, format='PNG')
-            temp_img_bytes.seek(0)
-            
-            new_page.insert_image(target_rect, stream=temp_img_bytes.getvalue())
-            
-            print(f"Page {page_num + 1}: Corrected orientation by {rotation_angle}° for better readability")
-        else:
-            # Original behavior: preserve original page orientation
-            if rotation_angle in [90, 270]:
-                new_page = output_pdf_doc.new_page(width=page.rect.height, height=page.rect.width)
-                target_rect = fitz.Rect(0, 0, page.rect.height, page.rect.width)
-            else:
-                new_page = output_pdf_doc.new_page(width=page.rect.width, height=page.rect.height)
-                target_rect = page.rect
-
-            # Always render original page as background (maintains original orientation)
-            new_page.show_pdf_page(target_rect, pdf_document, page_num)
-
-        # Map OCR coords to PDF coords
-        scale_x = target_rect.width / processed_img.width
-        scale_y = target_rect.height / processed_img.height
-
-        words_added = 0
-        n = len(ocr["text"]) if "text" in ocr else 0
-        for i in range(n):
-            txt = (ocr["text"][i] or "").strip()
-            if not txt:
-                continue
-            conf_raw = ocr.get("conf", ["-1"]) [i]
-            try:
-                conf = int(conf_raw) if conf_raw != "-1" else 0
-            except Exception:
-                conf = 0
-            if conf < 5:
-                continue
-
-            x = ocr["left"][i]
-            y = ocr["top"][i]
-            w = ocr["width"][i]
-            h = ocr["height"][i]
-            if h <= 1 or w <= 1:
-                continue
-
-            pdf_x = x * scale_x
-            pdf_y = y * scale_y
-            pdf_h = h * scale_y
-
-            # Invisible text (render_mode=3)
-            try:
-                new_page.insert_text(
-                    (pdf_x, pdf_y + pdf_h * 0.85),
-                    txt,
-                    fontsize=max(pdf_h * 0.9, 4),
-                    color=(0, 0, 0),
-                    render_mode=3,
-                )
-                words_added += 1
-            except Exception:
-                continue
-
-        print(f"Page {page_num + 1}: added {words_added} words")
-
-    output_pdf_doc.save(output_pdf)
+                result = _deferred_result(pdf_document[page_num], page_num)
+            record = write_page(output_pdf_doc, pdf_document, page_num, result, save_corrected_orientation)
+            for flag in ("deferred", "blank"):
+                if result.get(flag):
+                    record[flag] = True
+            ocr_pages.append(record)
+    print(f"OCR of {full_pages} of {page_total} pages took {time.time() - start:.1f}s")
+
+    written, plain_size = pdf_optimizer.save_optimized(output_pdf_doc, output_pdf)
     output_pdf_doc.close()
     pdf_document.close()
-    print(f"Searchable PDF saved as {output_pdf}")
+    if plain_size is not None:
+        plain_size += image_bytes_saved
+        print(f"Searchable PDF saved as {output_pdf} ({written} bytes, {plain_size - written} saved)")
+    else:
+        print(f"Searchable PDF saved as {output_pdf} ({written} bytes)")
+    if output_sizes is not None:
+        output_sizes["searchable"] = (written, plain_size)
+    if artifact_path:
+        save_ocr_artifact(artifact_path, ocr_pages, source_pdf=os.path.basename(input_pdf))
+        print(f"OCR artifact saved as {artifact_path}")
+    return ocr_pages
+
+
+def add_deferred_text_layers(searchable_pdf: str, ocr_pages: list, artifact_path: str = None,
+                             router_pdf: str = None, page_count: int = None, source_pdf: str = None) -> int:
+    """
+    OCR the router pages pdf_to_searchable deferred and add their text layer to
+    the searchable PDF and the Router PDF split from it
+
+    Args:
+        searchable_pdf: pdf_to_searchable output
+        ocr_pages: its page records; updated in place and saved to artifact_path
+        router_pdf: Router PDF holding the searchable pages from page_count on
+        source_pdf: scan name recorded in the artifact
+
+    Returns:
+        Number of pages completed
+    """
+    deferred = [r["page"] - 1 for r in ocr_pages if r.get("deferred")]
+    if not deferred:
+        return 0
+
+    with ocr_pages_streaming(searchable_pdf, deferred) as results:
+        results = list(results)
+
+    targets = [(searchable_pdf, 0)]
+    if router_pdf and page_count:
+        targets.append((router_pdf, page_count))
+    for path, offset in targets:
+        if not path or not os.path.exists(path):
+            continue
+        doc = fitz.open(path)
+        source = None
+        for result in results:
+            page_num = result["page_num"]
+            index = page_num - offset
+            if result["rotation"] in [90, 270]:
+                # Lay the page out as write_page would have for this rotation
+                source = source or fitz.open(path)
+                doc.delete_page(index)
+                page, target_rect = place_page(doc, source, index, result["rotation"], pno=index)
+            else:
+                page, target_rect = doc[index], doc[index].rect
+            image_width, image_height = result["image_size"]
+            write_text_layer(page, result["words"], target_rect.width / image_width, target_rect.height / image_height)
+            if offset == 0:
+                record = ocr_pages[page_num]
+                record.pop("deferred", None)
+                record.update(build_page_record(
+                    page_num, page.get_text(), result["words"], result["image_size"],
+                    (target_rect.width, target_rect.height), result["rotation"],
+                    orientation_method=result.get("orientation_method"), timings=result.get("timings"),
+                ))
+                if result.get("blank"):
+                    record["blank"] = True
+        # Replace atomically: readers see either the old or the complete new file
+        tmp_path = f"{path}.tmp"
+        doc.save(tmp_path, **pdf_optimizer.SAVE_OPTIONS)
+        doc.close()
+        if source is not None:
+            source.close()
+        os.replace(tmp_path, path)
+
+    if artifact_path and os.path.exists(artifact_path):
+        save_ocr_artifact(artifact_path, ocr_pages, source_pdf=source_pdf)
+    return len(results)
+
+
+def _deferred_text_layer_process(base_name: str, *args):
+    """Subprocess entry point: add_deferred_text_layers at low priority"""
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+    start = time.time()
+    try:
+        pages = add_deferred_text_layers(*args)
+        print(f"Background text layer: {pages} router page(s) of {base_name} done in {time.time() - start:.1f}s")
+    except Exception as e:
+        print(f"Background text layer for {base_name} failed: {e}")
+
+
+def start_deferred_text_layers(job):
+    """
+    Run add_deferred_text_layers for a job in a low-priority subprocess
+
+    fitz is not thread-safe, so the pass gets its own process rather than a
+    thread beside the pipeline. job.wait_for_text_layer waits for it and
+    reloads the page records it wrote to the artifact.
+
+    Returns:
+        The started process (None when nothing is deferred)
+    """
+    if not any(r.get("deferred") for r in (job.ocr_pages or [])):
+        return None
+    # Spawned, not forked: the parent may be inside fitz or OCR on other threads
+    process = multiprocessing.get_context("spawn").Process(
+        target=_deferred_text_layer_process,
+        args=(job.base_name, job.searchable_pdf, job.ocr_pages, job.ocr_artifact,
+              job.router_pdf, job.page_count, os.path.basename(job.input_pdf)),
+        name=f"text-layer-{job.base_name}",
+    )
+    process.start()
+    return process
+
+
+def run_ocr_stage(job, save_corrected_orientation: bool = False):
+    """
+    In-process OCR stage: build the searchable PDF for a POJob
+
+    Args:
+        job: POJob whose input_pdf is OCR'd into job.searchable_pdf
+        save_corrected_orientation: see pdf_to_searchable
+
+    Returns:
+        The same job with total_pages, page_texts and ocr_pages filled in
+    """
+    job.ocr_artifact = artifact_path_for(job.searchable_pdf)
+    job.ocr_pages = pdf_to_searchable(job.input_pdf, job.searchable_pdf, save_corrected_orientation,
+                                      artifact_path=job.ocr_artifact, output_sizes=job.output_sizes)
+    job.total_pages = len(job.ocr_pages)
+    job.page_texts = page_texts(job.ocr_pages)
+    return job
 
 
 def main():
@@ -194,7 +877,8 @@ def main():
     save_corrected_orientation = len(sys.argv) == 4 and sys.argv[3] == "--correct-orientation"
     
     try:
-        pdf_to_searchable(input_pdf, output_pdf, save_corrected_orientation)
+        pdf_to_searchable(input_pdf, output_pdf, save_corrected_orientation,
+                          artifact_path=artifact_path_for(output_pdf))
         if save_corrected_orientation:
             print(f"Successfully created searchable PDF with corrected orientation: {output_pdf}")
         else:
@@ -0,0 +1,239 @@
+"""
+Adaptive OCR strategy
+Replaces the brute-force render-scale x tesseract-config sweep with an ordered
+candidate list that stops at the first good-enough result.
+
+Candidates are scored by mean word confidence plus anchor hits (labels every
+PO page carries). How often each candidate wins (first reaches the quality
+threshold) is persisted so the usual winner is tried first and most pages
+need a single OCR call. Wins are tallied in memory and merged into the stats
+file by flush_stats after each job (and at exit), under a file lock so
+concurrent processes do not overwrite each other's counts.
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; merges are then unlocked
+    fcntl = None
+
+import ocr_engine
+import raster
+
+WHITELIST_CONFIG = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz/-*().,: '
+
+CONFIGS = [
+    WHITELIST_CONFIG,
+    r'--oem 3 --psm 4',
+    r'--oem 3 --psm 3',
+    r'--oem 1 --psm 6',  # Legacy engine for difficult scans
+    r'--oem 2 --psm 6',  # Legacy + LSTM combined
+]
+
+# Nominal render scales tried per profile, in the historical order; 3 is the
+# OCR_TARGET_DPI raster and each is capped at the scan's resolution (raster.render_scale)
+PROFILE_SCALES = {
+    "po": [4, 3, 2],
+    "router": [3, 2, 4],
+}
+
+# Labels a correctly read page of each profile is expected to contain
+PROFILE_ANCHORS = {
+    "po": [
+        re.compile(r'purchase\s+order', re.IGNORECASE),
+        re.compile(r'quantity', re.IGNORECASE),
+        re.compile(r'\b455\d{7}\b'),
+    ],
+    "router": [
+        re.compile(r'order\s*(?:number|no)', re.IGNORECASE),
+        re.compile(r'\brev\b', re.IGNORECASE),
+        re.compile(r'part', re.IGNORECASE),
+    ],
+}
+
+MIN_MEAN_CONF = float(os.getenv("OCR_STRATEGY_MIN_CONF", "75"))
+MIN_WORDS = int(os.getenv("OCR_STRATEGY_MIN_WORDS", "20"))
+STATS_PATH = os.getenv("OCR_STRATEGY_STATS", "/app/logs/ocr_strategy_stats.json")
+
+_stats = None              # {profile: {candidate_key: wins}}
+_pending = {}              # wins of this process not yet in the stats file
+_stats_lock = threading.Lock()
+
+
+def candidate_key(scale, config):
+    return f"{scale}x|{config}"
+
+
+def default_candidates(profile="po"):
+    """(scale, config) pairs in the order the old sweep tried them"""
+    return [(scale, config) for scale in PROFILE_SCALES.get(profile, PROFILE_SCALES["po"]) for config in CONFIGS]
+
+
+def _read_stats_file():
+    if STATS_PATH and os.path.exists(STATS_PATH):
+        try:
+            with open(STATS_PATH, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not read OCR strategy stats {STATS_PATH}: {e}")
+    return {}
+
+
+def _load_stats():
+    global _stats
+    if _stats is None:
+        _stats = _read_stats_file()
+    return _stats
+
+
+def record_win(profile, scale, config):
+    """Count a winning candidate (written by the next flush_stats)"""
+    key = candidate_key(scale, config)
+    with _stats_lock:
+        for tally in (_load_stats(), _pending):
+            wins = tally.setdefault(profile, {})
+            wins[key] = wins.get(key, 0) + 1
+
+
+def flush_stats():
+    """Merge this process's new wins into the stats file"""
+    global _stats
+    with _stats_lock:
+        if not _pending or not STATS_PATH:
+            return
+        try:
+            os.makedirs(os.path.dirname(STATS_PATH) or ".", exist_ok=True)
+            with open(f"{STATS_PATH}.lock", "a") as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Re-read under the lock: other processes flush their wins too
+                stats = _read_stats_file()
+                for profile, wins in _pending.items():
+                    merged = stats.setdefault(profile, {})
+                    for key, count in wins.items():
+                        merged[key] = merged.get(key, 0) + count
+                tmp_path = f"{STATS_PATH}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(stats, f, indent=2)
+                os.replace(tmp_path, STATS_PATH)
+            _stats = stats
+            _pending.clear()
+        except Exception as e:
+            print(f"Warning: Could not save OCR strategy stats {STATS_PATH}: {e}")
+
+
+atexit.register(flush_stats)
+
+
+def ordered_candidates(profile="po"):
+    """Default candidates, most frequent past winners first (stable for ties)"""
+    candidates = default_candidates(profile)
+    with _stats_lock:
+        wins = dict(_load_stats().get(profile, {}))
+    return sorted(candidates, key=lambda c: -wins.get(candidate_key(*c), 0))
+
+
+def text_from_data(data):
+    """Rebuild tesseract's plain-text layout from image_to_data output"""
+    lines = []
+    current = None
+    words = []
+    last_block = None
+    for i, word in enumerate(data.get("text", [])):
+        word = (word or "").strip()
+        if not word:
+            continue
+        line_id = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        if line_id != current:
+            if words:
+                lines.append(" ".join(words))
+            if last_block is not None and line_id[:2] != last_block:
+                lines.append("")
+            current = line_id
+            last_block = line_id[:2]
+            words = []
+        words.append(word)
+    if words:
+        lines.append(" ".join(words))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def score_result(data, text, profile="po"):
+    """(mean word confidence, anchor hits, word count) of one OCR result"""
+    confs = []
+    for i, word in enumerate(data.get("text", [])):
+        if not (word or "").strip():
+            continue
+        try:
+            conf = float(data["conf"][i])
+        except (TypeError, ValueError):
+            continue
+        if conf >= 0:
+            confs.append(conf)
+    mean_conf = sum(confs) / len(confs) if confs else 0.0
+    anchors = sum(1 for pattern in PROFILE_ANCHORS.get(profile, []) if pattern.search(text))
+    return mean_conf, anchors, len(confs)
+
+
+def is_good_enough(mean_conf, anchors, word_count):
+    return mean_conf >= MIN_MEAN_CONF and word_count >= MIN_WORDS and anchors > 0
+
+
+def _zoom(page, scale):
+    return raster.render_scale(page, scale / raster.BASE_SCALE)
+
+
+def ocr_page(page, profile="po"):
+    """OCR a fitz page with the adaptive candidate order
+
+    Returns (text, info) where info holds the chosen candidate, its scores and
+    the number of OCR calls spent
+    """
+    zooms = {}
+    images = {}
+    tried = set()
+    best = None
+    winner = None
+    calls = 0
+    for scale, config in ordered_candidates(profile):
+        # Nominal scales above the scan's resolution collapse onto the same raster
+        if scale not in zooms:
+            zooms[scale] = _zoom(page, scale)
+        zoom = zooms[scale]
+        if (zoom, config) in tried:
+            continue
+        tried.add((zoom, config))
+        try:
+            if zoom not in images:
+                images[zoom] = raster.as_image(raster.render_gray(page, scale=zoom))
+            data = ocr_engine.image_to_data(images[zoom], config=config)
+        except Exception as e:
+            print(f"OCR candidate {candidate_key(scale, config)} failed: {e}")
+            continue
+        calls += 1
+        text = text_from_data(data)
+        mean_conf, anchors, word_count = score_result(data, text, profile)
+        rank = (anchors, mean_conf, len(text))
+        if best is None or rank > best[0]:
+            best = (rank, text, scale, config, mean_conf, anchors)
+        if is_good_enough(mean_conf, anchors, word_count):
+            winner = (scale, config)
+            break
+
+    if best is None:
+        return "", {"calls": calls}
+    # Only a candidate that reached the threshold earns a place further up the order
+    if winner is not None:
+        record_win(profile, *winner)
+    _, text, scale, config, mean_conf, anchors = best
+    return text, {
+        "candidate": candidate_key(scale, config),
+        "mean_conf": round(mean_conf, 1),
+        "anchors": anchors,
+        "calls": calls,
+    }
@@ -0,0 +1,96 @@
+"""
+Fuzzy part-number index
+Finds the reference part numbers closest to an OCR reading without comparing
+against the whole catalog.
+
+Distance is an OCR-weighted edit distance: swapping characters OCR commonly
+confuses (Q/9, O/0, S/5, B/8, G/6, I/1, Z/2) costs CONFUSION_COST, any other
+substitution, insertion or deletion costs 1.
+
+Lookups use symmetric deletes (as in SymSpell) over a "canonical" spelling
+where each confusable pair collapses to one character: the catalog is indexed
+by its canonical forms and their single-character deletes, so a query only
+probes len(query) + 1 dictionary keys and scores the few parts it finds.
+That covers every part within one plain edit plus any number of confusions.
+"""
+
+CONFUSABLE = {"Q": "9", "O": "0", "S": "5", "B": "8", "G": "6", "I": "1", "Z": "2"}
+CONFUSION_COST = 0.5
+
+_CANONICAL = str.maketrans(CONFUSABLE)
+
+
+def canonical(part):
+    """Upper-case spelling with each confusable letter replaced by its digit"""
+    return part.upper().translate(_CANONICAL)
+
+
+def _substitution_cost(a, b):
+    if a == b:
+        return 0.0
+    if a.translate(_CANONICAL) == b.translate(_CANONICAL):
+        return CONFUSION_COST
+    return 1.0
+
+
+def ocr_distance(a, b):
+    """OCR-weighted edit distance between two upper-case strings"""
+    if a == b:
+        return 0.0
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        current = [float(i)]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1.0,
+                current[j - 1] + 1.0,
+                previous[j - 1] + _substitution_cost(char_a, char_b),
+            ))
+        previous = current
+    return previous[-1]
+
+
+class PartNumberIndex:
+    """Symmetric-delete index over a set of (upper-case) part numbers"""
+
+    def __init__(self, part_numbers):
+        self.part_numbers = set(part_numbers)
+        self._canonical = {}  # canonical form -> parts
+        self._deletes = {}    # canonical form minus one character -> parts
+        for part in self.part_numbers:
+            form = canonical(part)
+            self._canonical.setdefault(form, []).append(part)
+            for i in range(len(form)):
+                self._deletes.setdefault(form[:i] + form[i + 1:], []).append(part)
+
+    def __len__(self):
+        return len(self.part_numbers)
+
+    def candidates(self, query):
+        """Parts within one plain edit (plus confusions) of query"""
+        form = canonical(query)
+        found = set(self._canonical.get(form, ()))
+        # Part has one extra character
+        found.update(self._deletes.get(form, ()))
+        for i in range(len(form)):
+            shorter = form[:i] + form[i + 1:]
+            # Query has one extra character / one character differs
+            found.update(self._canonical.get(shorter, ()))
+            found.update(self._deletes.get(shorter, ()))
+        return found
+
+    def lookup(self, query, max_distance=1.5, limit=5):
+        """
+        Closest reference parts to an OCR reading
+
+        Returns:
+            list of (part, distance) sorted by distance, at most limit entries
+        """
+        query = query.upper()
+        scored = []
+        for part in self.candidates(query):
+            distance = ocr_distance(query, part)
+            if distance <= max_distance:
+                scored.append((distance, part))
+        scored.sort()
+        return [(part, distance) for distance, part in scored[:limit]]
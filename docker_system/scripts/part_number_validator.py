@@ -4,36 +4,27 @@ Enhanced Part Number Validation System
 Uses reference list from PartNumbers.xlsx to validate and correct OCR results
 """
 
-import pandas as pd
 import re
-from difflib import SequenceMatcher, get_close_matches
+from difflib import SequenceMatcher
 from pathlib import Path
 import logging
 
+import part_snapshot
+from part_index import PartNumberIndex
+
 class PartNumberValidator:
     def __init__(self, excel_path="/volume1/Main/Main/ParkerPOsOCR/docs/PartNumbers.xlsx"):
         self.excel_path = excel_path
         self.part_numbers = set()
         self.part_to_full = {}  # Maps clean part number to full part+op
+        self.index = PartNumberIndex(self.part_numbers)
         self.load_part_numbers()
         
     def load_part_numbers(self):
-        """Load part numbers from Excel file"""
+        """Load part numbers from the precompiled snapshot of the Excel file"""
         try:
-            df = pd.read_excel(self.excel_path)
-            logging.info(f"Loaded {len(df)} part numbers from {self.excel_path}")
-            
-            for _, row in df.iterrows():
-                full_part = str(row['Part Number']).strip()
-                if '*' in full_part:
-                    clean_part = full_part.split('*')[0].upper().strip()
-                else:
-                    clean_part = full_part.upper().strip()
-                
-                self.part_numbers.add(clean_part)
-                self.part_to_full[clean_part] = full_part
-                
-            logging.info(f"Processed {len(self.part_numbers)} unique part numbers")
+            self.part_numbers, self.part_to_full, self.index = part_snapshot.load_reference(self.excel_path)
+            logging.info(f"Loaded {len(self.part_numbers)} unique part numbers from {self.excel_path}")
             
         except Exception as e:
             logging.error(f"Error loading part numbers: {e}")
@@ -93,12 +84,11 @@ class PartNumberValidator:
                 confidence = self.similarity_score(clean_part, candidate)
                 return True, full_match, confidence, f"OCR correction: {clean_part} → {candidate}"
                 
-        # 3. Fuzzy matching with high threshold
-        close_matches = get_close_matches(clean_part, self.part_numbers, 
-                                        n=5, cutoff=0.8)
+        # 3. Fuzzy matching: one edit plus OCR confusions
+        close_matches = self.index.lookup(clean_part, limit=1)
         
         if close_matches:
-            best_match = close_matches[0]
+            best_match = close_matches[0][0]
             confidence = self.similarity_score(clean_part, best_match)
             full_match = self.part_to_full.get(best_match, best_match + op_part)
             
@@ -131,10 +121,9 @@ class PartNumberValidator:
                 score = self.similarity_score(clean_part, candidate)
                 suggestions.append((candidate, score, "OCR correction"))
                 
-        # Fuzzy matches
-        close_matches = get_close_matches(clean_part, self.part_numbers, 
-                                        n=max_suggestions, cutoff=0.6)
-        for match in close_matches:
+        # Fuzzy matches (index lookup instead of comparing against every part)
+        close_matches = self.index.lookup(clean_part, max_distance=2.0, limit=max_suggestions)
+        for match, _ in close_matches:
             score = self.similarity_score(clean_part, match)
             suggestions.append((match, score, "Fuzzy match"))
             
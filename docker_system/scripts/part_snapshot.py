@@ -0,0 +1,342 @@
+"""
+Precompiled part-number reference snapshot
+Compiles PartNumbers.xlsx into a SQLite file next to it (or, when that
+directory is read-only, in PART_SNAPSHOT_FALLBACK_DIR) so each extraction
+subprocess opens the reference list in milliseconds instead of parsing the
+spreadsheet with openpyxl / pandas.
+
+The snapshot holds:
+- parts: clean part number -> full part+op string (as in the spreadsheet)
+- forms: the part_index canonical form and single-character deletes of each
+  part, so fuzzy lookups query the on-disk index instead of rebuilding
+  PartNumberIndex (about a second per 50k parts) in every process
+- meta: mtime, size and blake2b hash of the spreadsheet it was built from
+
+A snapshot is reused while the spreadsheet's mtime and size match; when they
+change the file is re-hashed and the snapshot is rebuilt only if the content
+changed. Rebuilds go to a temporary file that replaces the snapshot
+atomically. Long-running processes re-stat the spreadsheet at most every
+PART_SNAPSHOT_CHECK_SECONDS and switch to the refreshed snapshot when it
+changed; reference_hash tells callers holding derived caches to reload.
+When no snapshot can be written the spreadsheet is parsed once per version
+and served from memory until it changes.
+
+Usage (build step, e.g. after updating the spreadsheet):
+    python part_snapshot.py [PartNumbers.xlsx] [--force]
+"""
+
+import hashlib
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from part_index import PartNumberIndex, canonical
+
+DEFAULT_EXCEL_PATH = os.getenv("PART_NUMBERS_PATH", "/app/docs/PartNumbers.xlsx")
+# Defaults to "<spreadsheet>.snapshot.sqlite" beside the spreadsheet
+SNAPSHOT_PATH = os.getenv("PART_SNAPSHOT_PATH", "")
+# Where the default snapshot goes when the spreadsheet's directory is read-only
+FALLBACK_DIR = os.getenv("PART_SNAPSHOT_FALLBACK_DIR", "/app/logs")
+# How long an open snapshot is trusted before the spreadsheet is stat'ed again
+CHECK_SECONDS = float(os.getenv("PART_SNAPSHOT_CHECK_SECONDS", "5"))
+# Bump when the snapshot layout or the part cleaning rules change
+SNAPSHOT_VERSION = 1
+
+_connections = {}  # snapshot path -> [pid, connection, spreadsheet (mtime_ns, size), last check]
+_unbuildable = {}  # spreadsheet path -> [(mtime_ns, size) no snapshot could be built for, hash, {clean: full}]
+_lock = threading.Lock()
+
+
+def clean_part_number(full_part):
+    """Reference key of a spreadsheet entry: the part before any "*op" suffix, upper case"""
+    return full_part.split('*')[0].upper().strip()
+
+
+def snapshot_path_for(excel_path):
+    """PART_SNAPSHOT_PATH, else beside the spreadsheet, else in a writable fallback directory"""
+    if SNAPSHOT_PATH:
+        return SNAPSHOT_PATH
+    beside = f"{excel_path}.snapshot.sqlite"
+    if os.access(os.path.dirname(os.path.abspath(excel_path)), os.W_OK):
+        return beside
+    # Read-only docs mount: the path hash keeps spreadsheets of the same name apart
+    path_hash = hashlib.blake2b(os.path.abspath(excel_path).encode(), digest_size=6).hexdigest()
+    name = f"{os.path.basename(excel_path)}.{path_hash}.snapshot.sqlite"
+    for directory in (FALLBACK_DIR, tempfile.gettempdir()):
+        if os.access(directory, os.W_OK):
+            return os.path.join(directory, name)
+    return beside
+
+
+def file_hash(path):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_spreadsheet(excel_path):
+    """{clean part: full part} from the "Part Number" column (else the first column)"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(excel_path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        column = 0
+        for i, name in enumerate(header):
+            if name is not None and str(name).strip().lower() == "part number":
+                column = i
+                break
+        part_to_full = {}
+        for row in rows:
+            if row and len(row) > column and row[column]:
+                full_part = str(row[column]).strip()
+                part_to_full[clean_part_number(full_part)] = full_part
+        return part_to_full
+    finally:
+        workbook.close()
+
+
+def _read_meta(conn):
+    try:
+        return dict(conn.execute("SELECT key, value FROM meta"))
+    except sqlite3.Error:
+        return {}
+
+
+def build_snapshot(excel_path, snapshot_path=None, source_hash=None):
+    """Compile the spreadsheet into a fresh snapshot file; returns the part count"""
+    snapshot_path = snapshot_path or snapshot_path_for(excel_path)
+    stat = os.stat(excel_path)
+
+    # Open the output first: an unwritable location fails before the spreadsheet is parsed
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    built = False
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        source_hash = source_hash or file_hash(excel_path)
+        part_to_full = read_spreadsheet(excel_path)
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("CREATE TABLE parts (clean TEXT PRIMARY KEY, full TEXT) WITHOUT ROWID")
+        conn.execute("CREATE TABLE forms (form TEXT, part TEXT)")
+        conn.executemany("INSERT INTO parts VALUES (?, ?)", sorted(part_to_full.items()))
+
+        def forms():
+            for part in part_to_full:
+                form = canonical(part)
+                keys = {form}
+                keys.update(form[:i] + form[i + 1:] for i in range(len(form)))
+                for key in keys:
+                    yield key, part
+
+        conn.executemany("INSERT INTO forms VALUES (?, ?)", forms())
+        conn.execute("CREATE INDEX idx_forms_form ON forms(form)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("version", str(SNAPSHOT_VERSION)),
+            ("source_path", os.path.abspath(excel_path)),
+            ("source_mtime_ns", str(stat.st_mtime_ns)),
+            ("source_size", str(stat.st_size)),
+            ("source_hash", source_hash),
+            ("built", str(time.time())),
+        ])
+        conn.commit()
+        built = True
+    finally:
+        conn.close()
+        if not built and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    os.replace(tmp_path, snapshot_path)
+    return len(part_to_full)
+
+
+def _refresh(excel_path, snapshot_path):
+    """Bring the snapshot up to date with the spreadsheet (building it if missing)"""
+    stat = os.stat(excel_path)
+    meta = {}
+    source_hash = None
+    if os.path.exists(snapshot_path):
+        conn = sqlite3.connect(snapshot_path)
+        try:
+            meta = _read_meta(conn)
+            if meta.get("version") != str(SNAPSHOT_VERSION):
+                meta = {}
+            elif (meta.get("source_mtime_ns") == str(stat.st_mtime_ns)
+                  and meta.get("source_size") == str(stat.st_size)):
+                return
+            else:
+                source_hash = file_hash(excel_path)
+                if meta.get("source_hash") == source_hash:
+                    # Touched or copied but unchanged: just record the new stat
+                    conn.executemany("UPDATE meta SET value = ? WHERE key = ?", [
+                        (str(stat.st_mtime_ns), "source_mtime_ns"),
+                        (str(stat.st_size), "source_size"),
+                    ])
+                    conn.commit()
+                    return
+        finally:
+            conn.close()
+
+    start = time.perf_counter()
+    count = build_snapshot(excel_path, snapshot_path, source_hash)
+    print(f"Built part number snapshot {snapshot_path}: {count} parts "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+def open_snapshot(excel_path=None):
+    """
+    Read-only connection to an up-to-date snapshot of the spreadsheet (one per
+    process), or None when no snapshot can be written for it
+
+    The spreadsheet is re-stat'ed at most every CHECK_SECONDS; when it changed
+    the snapshot is refreshed, the previous connection closed and a new one
+    returned. A failed build is not retried until the spreadsheet changes.
+    """
+    excel_path = excel_path or DEFAULT_EXCEL_PATH
+    snapshot_path = snapshot_path_for(excel_path)
+    with _lock:
+        now = time.monotonic()
+        cached = _connections.get(snapshot_path)
+        if cached is not None and cached[0] != os.getpid():
+            cached = None  # forked child: the parent's connection is not ours
+        if cached is not None:
+            if now - cached[3] < CHECK_SECONDS:
+                return cached[1]
+            stat = os.stat(excel_path)
+            if (stat.st_mtime_ns, stat.st_size) == cached[2]:
+                cached[3] = now
+                return cached[1]
+        stat = os.stat(excel_path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        failed = _unbuildable.get(excel_path)
+        if failed is not None and failed[0] == key:
+            return None
+        try:
+            _refresh(excel_path, snapshot_path)
+            conn = sqlite3.connect(f"file:{snapshot_path}?mode=ro", uri=True, check_same_thread=False)
+        except (sqlite3.Error, OSError) as e:
+            if not os.path.exists(excel_path):
+                raise
+            print(f"Warning: part number snapshot {snapshot_path} unavailable ({e}), "
+                  f"reading the spreadsheet directly until it changes")
+            _unbuildable[excel_path] = [key, None, None]
+            conn = None
+        else:
+            _unbuildable.pop(excel_path, None)
+        if cached is not None:
+            cached[1].close()
+        if conn is None:
+            _connections.pop(snapshot_path, None)
+        else:
+            _connections[snapshot_path] = [os.getpid(), conn, key, now]
+        return conn
+
+
+def spreadsheet_reference(excel_path=None):
+    """(content hash, {clean part: full part}) parsed from the spreadsheet, kept until it changes"""
+    excel_path = excel_path or DEFAULT_EXCEL_PATH
+    stat = os.stat(excel_path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _unbuildable.get(excel_path)
+        if cached is not None and cached[0] == key and cached[2] is not None:
+            return cached[1], cached[2]
+    source_hash = file_hash(excel_path)
+    part_to_full = read_spreadsheet(excel_path)
+    with _lock:
+        _unbuildable[excel_path] = [key, source_hash, part_to_full]
+    return source_hash, part_to_full
+
+
+def reference_hash(excel_path=None):
+    """Content hash of the spreadsheet behind the current snapshot (changes when it is refreshed)"""
+    excel_path = excel_path or DEFAULT_EXCEL_PATH
+    conn = open_snapshot(excel_path)
+    if conn is None:
+        return spreadsheet_reference(excel_path)[0]
+    with _lock:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'source_hash'").fetchone()
+    return row[0]
+
+
+class SnapshotPartIndex(PartNumberIndex):
+    """PartNumberIndex answering candidate queries from the snapshot's forms table"""
+
+    def __init__(self, conn, part_numbers):
+        self.part_numbers = part_numbers
+        self._conn = conn
+
+    def candidates(self, query):
+        if self._conn is not None:
+            form = canonical(query)
+            keys = {form}
+            keys.update(form[:i] + form[i + 1:] for i in range(len(form)))
+            placeholders = ",".join("?" * len(keys))
+            try:
+                with _lock:
+                    rows = self._conn.execute(
+                        f"SELECT DISTINCT part FROM forms WHERE form IN ({placeholders})", list(keys)
+                    ).fetchall()
+                return {part for (part,) in rows}
+            except sqlite3.ProgrammingError:
+                # The snapshot was refreshed and this connection closed: index our own parts in memory
+                PartNumberIndex.__init__(self, self.part_numbers)
+                self._conn = None
+        return super().candidates(query)
+
+
+def load_reference(excel_path=None):
+    """
+    Reference part numbers for validation
+
+    Returns:
+        (set of clean part numbers, {clean part: full part+op}, fuzzy index)
+    Falls back to the parsed spreadsheet (see spreadsheet_reference) if the snapshot cannot be written.
+    """
+    excel_path = excel_path or DEFAULT_EXCEL_PATH
+    conn = open_snapshot(excel_path)
+    if conn is None:
+        part_to_full = dict(spreadsheet_reference(excel_path)[1])
+        part_numbers = set(part_to_full)
+        return part_numbers, part_to_full, PartNumberIndex(part_numbers)
+    with _lock:
+        part_to_full = dict(conn.execute("SELECT clean, full FROM parts"))
+    part_numbers = set(part_to_full)
+    return part_numbers, part_to_full, SnapshotPartIndex(conn, part_numbers)
+
+
+def main():
+    args = sys.argv[1:]
+    force = "--force" in args
+    args = [a for a in args if a != "--force"]
+    excel_path = args[0] if args else DEFAULT_EXCEL_PATH
+    if not os.path.exists(excel_path):
+        print(f"Part numbers file not found: {excel_path}")
+        sys.exit(1)
+
+    snapshot_path = snapshot_path_for(excel_path)
+    start = time.perf_counter()
+    if force:
+        count = build_snapshot(excel_path, snapshot_path)
+        print(f"Built part number snapshot {snapshot_path}: {count} parts "
+              f"in {time.perf_counter() - start:.1f}s")
+    else:
+        _refresh(excel_path, snapshot_path)
+
+    start = time.perf_counter()
+    part_numbers, _, _ = load_reference(excel_path)
+    print(f"Snapshot {snapshot_path}: {len(part_numbers)} parts, "
+          f"{os.path.getsize(snapshot_path) / 1024 / 1024:.1f} MB, "
+          f"loads in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
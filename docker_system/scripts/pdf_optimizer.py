@@ -0,0 +1,97 @@
+"""
+Output PDF optimisation
+Compact saves for the PDFs a job writes (searchable PDF, PO_*.pdf and
+Router_*.pdf): unused/duplicate objects removed, streams deflated and,
+optionally, scan images recompressed to grayscale JPEG or bilevel.
+
+PDF_IMAGE_MODE selects the image treatment:
+    keep     - leave scan images untouched (default)
+    gray     - 8-bit grayscale JPEG at PDF_JPEG_QUALITY
+    bilevel  - Otsu-thresholded 1-bit black/white, Flate compressed
+An image is only replaced when the new encoding is smaller.
+"""
+
+import os
+import zlib
+
+import cv2
+import fitz
+import numpy as np
+
+import raster
+
+IMAGE_MODE = os.getenv("PDF_IMAGE_MODE", "keep").lower()
+JPEG_QUALITY = int(os.getenv("PDF_JPEG_QUALITY", "75"))
+# Also serialise a plain copy of each document to report the bytes saved;
+# costs a full extra write of every output PDF, so only for benchmarking
+MEASURE_SAVINGS = os.getenv("PDF_MEASURE_SAVINGS", "false").lower() == "true"
+
+SAVE_OPTIONS = {
+    "garbage": 4,          # drop unused objects and merge duplicates
+    "deflate": True,
+    "deflate_images": True,
+    "deflate_fonts": True,
+    "clean": True,
+}
+
+
+def _encode_image(pix, mode):
+    """(filter, bits per component, encoded bytes) for the recompressed image, or None"""
+    if pix.alpha:
+        return None
+    if pix.n != 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    if mode == "bilevel":
+        arr = raster.pixmap_array(pix)
+        cv2.threshold(arr, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=arr)
+        # 1 bit per pixel, rows padded to whole bytes (0 = black, 1 = white)
+        bits = np.packbits(arr > 127, axis=1)
+        return "FlateDecode", 1, zlib.compress(bits.tobytes(), 9)
+    if mode == "gray":
+        return "DCTDecode", 8, pix.tobytes("jpg", jpg_quality=JPEG_QUALITY)
+    return None
+
+
+def recompress_images(doc, mode=None):
+    """Recompress the scan images of an open document in place; returns bytes saved"""
+    mode = (mode or IMAGE_MODE).lower()
+    if mode not in ("gray", "bilevel"):
+        return 0
+    saved = 0
+    seen = set()
+    for page in doc:
+        for info in page.get_images(full=True):
+            xref, smask = info[0], info[1]
+            if xref in seen or smask:
+                continue
+            seen.add(xref)
+            try:
+                original = len(doc.xref_stream_raw(xref))
+                encoded = _encode_image(fitz.Pixmap(doc, xref), mode)
+                if encoded is None or len(encoded[2]) >= original:
+                    continue
+                filter_name, bpc, data = encoded
+                # Rewrite the image object in place so every page using it shares the result
+                doc.update_stream(xref, data, compress=False)
+                doc.xref_set_key(xref, "Filter", f"/{filter_name}")
+                doc.xref_set_key(xref, "ColorSpace", "/DeviceGray")
+                doc.xref_set_key(xref, "BitsPerComponent", str(bpc))
+                doc.xref_set_key(xref, "DecodeParms", "null")
+                doc.xref_set_key(xref, "Decode", "null")
+                saved += original - len(data)
+            except Exception as e:
+                print(f"Warning: Could not recompress image {xref}: {e}")
+    return saved
+
+
+def save_optimized(doc, path):
+    """
+    Save doc compactly
+
+    Returns:
+        tuple: (bytes written, bytes a plain save would have written, or None
+        unless PDF_MEASURE_SAVINGS is set)
+    """
+    plain_size = len(doc.tobytes()) if MEASURE_SAVINGS else None
+    doc.save(path, **SAVE_OPTIONS)
+    return os.path.getsize(path), plain_size
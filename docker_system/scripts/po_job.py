@@ -0,0 +1,94 @@
+"""
+PO Processing Job
+Carries one scanned PDF through the in-process pipeline stages
+(OCR -> basic extraction/split -> detailed extraction)
+"""
+
+import os
+
+from ocr_artifact import format_page_texts, load_ocr_artifact, page_texts
+
+
+class StageError(Exception):
+    """Raised by a pipeline stage when the job cannot continue"""
+
+    def __init__(self, stage, message):
+        super().__init__(message)
+        self.stage = stage
+
+
+class POJob:
+    """State shared between the pipeline stages for a single scan"""
+
+    def __init__(self, input_pdf_path, work_dir=None):
+        self.input_pdf = os.path.abspath(input_pdf_path)
+        self.base_name = os.path.splitext(os.path.basename(input_pdf_path))[0]
+        self.work_dir = os.path.abspath(work_dir or os.getcwd())
+        self.searchable_pdf = os.path.join(self.work_dir, f"{self.base_name}_searchable.pdf")
+
+        # Filled in by the stages
+        self.total_pages = None
+        self.ocr_pages = None      # per-page OCR records (see ocr_artifact)
+        self.ocr_artifact = None   # path of the artifact file on disk
+        self.page_texts = []
+        self.po_number = None
+        self.page_count = None
+        self.po_folder = None
+        self.json_path = None
+        self.po_pdf = None
+        self.router_pdf = None
+        self.po_info = {}
+        self.output_sizes = {}     # "searchable"/"po"/"router" -> (bytes written, bytes unoptimised or None)
+        self.text_layer_process = None  # background OCR of deferred router pages
+
+        self.timings = {}
+        self.success = False
+        self.error = None
+
+    @property
+    def text(self):
+        """All page texts joined in the 'PAGE N:' layout the extractors expect"""
+        return format_page_texts(self.page_texts)
+
+    def wait_for_text_layer(self):
+        """Block until the background router text layer (if any) has been written"""
+        if self.text_layer_process is not None:
+            self.text_layer_process.join()
+            self.text_layer_process = None
+            # The subprocess saved the completed page records to the artifact
+            pages = load_ocr_artifact(self.ocr_artifact)
+            if pages:
+                self.ocr_pages = pages
+                self.page_texts = page_texts(pages)
+
+    @property
+    def blank_pages(self):
+        """1-based page numbers the OCR stage classified as blank"""
+        return [p["page"] for p in (self.ocr_pages or []) if p.get("blank")]
+
+    @property
+    def pdf_bytes_saved(self):
+        """Bytes the output PDF optimisation saved over plain saves (None unless measured)"""
+        measured = [plain - written for written, plain in self.output_sizes.values() if plain is not None]
+        return sum(measured) if measured else None
+
+    def to_dict(self):
+        """Structured summary of the job results"""
+        return {
+            "input_pdf": self.input_pdf,
+            "searchable_pdf": self.searchable_pdf,
+            "ocr_artifact": self.ocr_artifact,
+            "total_pages": self.total_pages,
+            "deferred_pages": [p["page"] for p in (self.ocr_pages or []) if p.get("deferred")],
+            "blank_pages": self.blank_pages,
+            "purchase_order_number": self.po_number,
+            "page_count": self.page_count,
+            "po_folder": self.po_folder,
+            "json_path": self.json_path,
+            "po_pdf": self.po_pdf,
+            "router_pdf": self.router_pdf,
+            "timings": dict(self.timings),
+            "pdf_bytes_saved": self.pdf_bytes_saved,
+            "success": self.success,
+            "error": self.error,
+        }
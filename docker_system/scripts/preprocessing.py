@@ -0,0 +1,179 @@
+"""
+OCR preprocessing profiles
+A profile is an ordered list of steps run on a grayscale page array before
+Tesseract. Steps work in place where OpenCV allows it and each one is timed.
+
+Geometric steps (crop, deskew) record what they did so word boxes found on
+the processed image can be mapped back to the unprocessed page raster
+(map_words_back), keeping the text layer aligned with the scan.
+
+PREPROCESS_PROFILE picks the profile used by the OCR stage.
+
+is_blank() classifies blank backs and separator sheets from a thumbnail so
+the OCR stage can skip them.
+"""
+
+import os
+import time
+
+import cv2
+import numpy as np
+
+PROFILES = {
+    "fast": ["otsu"],
+    "default": ["blur", "otsu"],
+    "deskew": ["deskew", "blur", "otsu"],
+    "clean": ["crop", "deskew", "denoise", "adaptive"],
+}
+
+PROFILE = os.getenv("PREPROCESS_PROFILE", "default")
+
+# Deskew search: angles in degrees, estimated on a downsampled copy
+DESKEW_MAX_ANGLE = float(os.getenv("DESKEW_MAX_ANGLE", "3.0"))
+DESKEW_STEP = 0.25
+DESKEW_MIN_ANGLE = 0.2
+DESKEW_WIDTH = 600
+
+# Blank page test: share of clearly dark pixels inside the page margins
+BLANK_INK_RATIO = float(os.getenv("BLANK_INK_RATIO", "0.002"))
+BLANK_CONTRAST = 60
+
+
+def _ink_mask(gray):
+    """1 where there is ink, 0 on background"""
+    return cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+
+
+def _downsample(gray, width):
+    if gray.shape[1] <= width:
+        return gray
+    scale = width / gray.shape[1]
+    return cv2.resize(gray, (width, max(1, int(gray.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+
+
+def estimate_skew(gray):
+    """Rotation in degrees (counter-clockwise) that straightens the text lines"""
+    ink = _ink_mask(_downsample(gray, DESKEW_WIDTH)).astype(np.float32)
+    h, w = ink.shape
+    center = (w / 2, h / 2)
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-DESKEW_MAX_ANGLE, DESKEW_MAX_ANGLE + 1e-6, DESKEW_STEP):
+        m = cv2.getRotationMatrix2D(center, float(angle), 1.0)
+        rotated = cv2.warpAffine(ink, m, (w, h), flags=cv2.INTER_NEAREST, borderValue=0)
+        # Sharp row profile = text lines aligned with the pixel rows
+        score = float(np.diff(rotated.sum(axis=1)).var())
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def step_deskew(gray, ctx):
+    angle = estimate_skew(gray)
+    ctx["skew"] = angle
+    if abs(angle) < DESKEW_MIN_ANGLE:
+        return gray
+    h, w = gray.shape
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    ctx["transforms"].append(("affine", cv2.invertAffineTransform(m)))
+    return cv2.warpAffine(gray, m, (w, h), flags=cv2.INTER_LINEAR, borderValue=255)
+
+
+def step_crop(gray, ctx):
+    """Drop blank margins and dark scanner borders (returns a view, no copy)"""
+    ink = _ink_mask(gray)
+    h, w = ink.shape
+    row_ink = ink.mean(axis=1)
+    col_ink = ink.mean(axis=0)
+    # Content rows/columns: some ink, but not a solid scanner border
+    rows = np.flatnonzero((row_ink > 0.002) & (row_ink < 0.9))
+    cols = np.flatnonzero((col_ink > 0.002) & (col_ink < 0.9))
+    if rows.size == 0 or cols.size == 0:
+        return gray
+    margin = max(h, w) // 100
+    y0, y1 = max(0, rows[0] - margin), min(h, rows[-1] + margin + 1)
+    x0, x1 = max(0, cols[0] - margin), min(w, cols[-1] + margin + 1)
+    ctx["transforms"].append(("offset", (x0, y0)))
+    return gray[y0:y1, x0:x1]
+
+
+def step_blur(gray, ctx):
+    if not gray.flags.writeable or not gray.flags["C_CONTIGUOUS"]:
+        gray = np.ascontiguousarray(gray)
+    return cv2.GaussianBlur(gray, (3, 3), 0, dst=gray)
+
+
+def step_denoise(gray, ctx):
+    return cv2.medianBlur(gray, 3)
+
+
+def step_otsu(gray, ctx):
+    if not gray.flags.writeable or not gray.flags["C_CONTIGUOUS"]:
+        gray = np.ascontiguousarray(gray)
+    cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=gray)
+    return gray
+
+
+def step_adaptive(gray, ctx):
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+
+
+def ink_ratio(gray):
+    """Share of pixels well darker than the background, margins and speckle ignored"""
+    h, w = gray.shape
+    my, mx = h // 20, w // 20
+    inner = cv2.medianBlur(np.ascontiguousarray(gray[my:h - my, mx:w - mx]), 3)
+    background = float(np.median(inner))
+    return np.count_nonzero(inner < background - BLANK_CONTRAST) / max(inner.size, 1)
+
+
+def is_blank(gray):
+    """True for blank or near-blank pages (thumbnail resolution is enough)"""
+    return ink_ratio(gray) < BLANK_INK_RATIO
+
+
+STEPS = {
+    "deskew": step_deskew,
+    "crop": step_crop,
+    "blur": step_blur,
+    "denoise": step_denoise,
+    "otsu": step_otsu,
+    "adaptive": step_adaptive,
+}
+
+
+def run_profile(gray, profile=None):
+    """
+    Run a preprocessing profile on a grayscale array
+
+    Returns:
+        tuple: (processed array, ctx) where ctx has per-step "timings" (seconds),
+        "transforms" for map_words_back and "skew" when deskew ran
+    """
+    name = profile or PROFILE
+    steps = PROFILES.get(name)
+    if steps is None:
+        print(f"Warning: Unknown preprocessing profile '{name}', using 'default'")
+        name, steps = "default", PROFILES["default"]
+    ctx = {"profile": name, "timings": {}, "transforms": []}
+    for step in steps:
+        t0 = time.perf_counter()
+        gray = STEPS[step](gray, ctx)
+        ctx["timings"][step] = time.perf_counter() - t0
+    return gray, ctx
+
+
+def map_words_back(words, ctx):
+    """Word boxes on the processed image -> boxes on the image given to run_profile"""
+    transforms = ctx.get("transforms")
+    if not transforms or not words:
+        return words
+    boxes = np.array([[w[1], w[2], w[3], w[4]] for w in words], dtype=np.float64)
+    centers = boxes[:, :2] + boxes[:, 2:] / 2
+    # Undo the steps last to first
+    for kind, value in reversed(transforms):
+        if kind == "offset":
+            centers += value
+        else:
+            centers = centers @ value[:, :2].T + value[:, 2]
+    lefts = np.rint(centers - boxes[:, 2:] / 2).astype(int)
+    return [[w[0], int(x), int(y)] + list(w[3:]) for w, (x, y) in zip(words, lefts)]
@@ -9,8 +9,10 @@ Complete PO Processing Pipeline
 
 import os
 import sys
-import subprocess
+import time
 import json
+import shutil
+import traceback
 import urllib3
 from pathlib import Path
 from datetime import datetime
@@ -21,88 +23,90 @@ from filemaker_integration import FileMakerIntegration
 import base64
 import requests
 
-def process_pdf_file(input_pdf_path):
-    """Complete processing pipeline for a PDF file"""
+# Stage modules are imported once per worker process; fitz, pytesseract,
+# cv2 and numpy load here instead of once per subprocess hop
+from po_job import POJob
+from batch_splitter import split_job
+from ocr_pdf_searchable import ROUTER_TEXT_LAYER, run_ocr_stage, start_deferred_text_layers
+from extract_po_info import run_basic_extraction
+from extract_po_details import run_detail_extraction
+import ocr_strategy
+
+def _write_stage_error(base_name, error_suffix, title, details):
+    """Write stage error details to the error folder"""
+    error_folder = os.getenv('ERROR_FOLDER', '/app/errors')
+    error_file = os.path.join(error_folder, f"{base_name}_{error_suffix}.txt")
+    with open(error_file, 'w') as ef:
+        ef.write(f"{title}\n{details}\n")
+
+def _run_stage(job, stage_name, stage_func, error_suffix, title):
+    """Run one in-process stage, recording its timing and any failure"""
+    start = time.time()
+    try:
+        stage_func(job)
+        return True
+    except Exception as e:
+        print(f"{title} failed: {e}")
+        job.error = f"{title} failed: {e}"
+        _write_stage_error(job.base_name, error_suffix, title, traceback.format_exc())
+        return False
+    finally:
+        job.timings[stage_name] = round(time.time() - start, 3)
+
+def start_pipeline(input_pdf_path):
+    """New POJob for a PDF with its OCR stage run; job.error is set when that failed"""
+    job = POJob(input_pdf_path)
     
     # Validate input file
     if not os.path.exists(input_pdf_path):
         print(f"Error: Input file '{input_pdf_path}' not found")
-        return False
+        job.error = "Input file not found"
+        return job
     
     print(f"Starting complete PO processing for: {input_pdf_path}")
-    input_filename = os.path.basename(input_pdf_path)
-    base_name = os.path.splitext(input_filename)[0]
     
     # Step 1: Create searchable PDF using OCR
     print("\\n=== Step 1: OCR Processing ===")
-    searchable_pdf = f"{base_name}_searchable.pdf"
-    
-    try:
-        result = subprocess.run([
-            sys.executable, "ocr_pdf_searchable.py",
-            input_pdf_path, searchable_pdf
-        ], capture_output=True, text=True, check=True)
+    if _run_stage(job, "ocr", run_ocr_stage, "ocr_error", "OCR Error"):
         print("OCR processing completed successfully")
-        if result.stdout:
-            print(result.stdout)
-        if result.stderr:
-            print("[OCR STDERR]", result.stderr)
-    except subprocess.CalledProcessError as e:
-        print(f"OCR processing failed: {e}")
-        print("STDOUT:", e.stdout)
-        print("STDERR:", e.stderr)
-        # Write error details to error folder
-        error_folder = os.getenv('ERROR_FOLDER', '/app/errors')
-        error_file = os.path.join(error_folder, f"{base_name}_ocr_error.txt")
-        with open(error_file, 'w') as ef:
-            ef.write(f"OCR Error\nSTDOUT:\n{e.stdout}\n\nSTDERR:\n{e.stderr}\n")
-        return False
+    return job
+
+def run_pipeline(input_pdf_path):
+    """Complete processing pipeline for a PDF file, run in-process
     
+    Returns the POJob with structured results (PO number, page count,
+    page texts, PO folder); job.success tells whether processing completed
+    """
+    job = start_pipeline(input_pdf_path)
+    if job.error:
+        return job
+    return finish_pipeline(job)
+
+def finish_pipeline(job):
+    """Pipeline steps after OCR (extraction, PDF split, FileMaker) for a job whose OCR stage has run
+    
+    Returns the job; job.success tells whether processing completed
+    """
     # Step 2: Extract PO information and split PDF
     print("\n=== Step 2: Information Extraction & PDF Splitting ===")
-    env = os.environ.copy()
-    env["SEARCHABLE_PDF"] = os.path.abspath(searchable_pdf)
-    try:
-        result = subprocess.run(
-            [sys.executable, "extract_po_info.py"],
-            capture_output=True,
-            text=True,
-            check=True,
-            env=env,
-        )
-        if result.stdout:
-            print(result.stdout)
-        if result.stderr:
-            print("[BASIC EXTRACT STDERR]", result.stderr)
-        print("Basic PO extraction completed")
-    except subprocess.CalledProcessError as e:
-        print(f"Basic extraction failed: {e}")
-        print("STDOUT:", e.stdout)
-        print("STDERR:", e.stderr)
-        error_folder = os.getenv('ERROR_FOLDER', '/app/errors')
-        error_file = os.path.join(error_folder, f"{base_name}_basic_extract_error.txt")
-        with open(error_file, 'w') as ef:
-            ef.write(f"Basic Extraction Error\nSTDOUT:\n{e.stdout}\n\nSTDERR:\n{e.stderr}\n")
-        return False
+    if not _run_stage(job, "basic_extract", run_basic_extraction, "basic_extract_error", "Basic Extraction Error"):
+        return job
+    print("Basic PO extraction completed")
     
     # Step 3: Extract detailed information
     print("\\n=== Step 3: Detailed Information Extraction ===")
-    
-    try:
-        result = subprocess.run([
-            sys.executable, "extract_po_details.py"
-        ], capture_output=True, text=True, check=True)
-        print("Detailed extraction completed")
-        print(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print(f"Detailed extraction failed: {e}")
-        print("STDOUT:", e.stdout)
-        print("STDERR:", e.stderr)
-        error_folder = os.getenv('ERROR_FOLDER', '/app/errors')
-        error_file = os.path.join(error_folder, f"{base_name}_detail_extract_error.txt")
-        with open(error_file, 'w') as ef:
-            ef.write(f"Detail Extraction Error\nSTDOUT:\n{e.stdout}\n\nSTDERR:\n{e.stderr}\n")
-        return False
+    detail_ok = _run_stage(job, "detail_extract", run_detail_extraction, "detail_extract_error", "Detail Extraction Error")
+    # Persist the OCR candidate wins of this job's page OCR
+    ocr_strategy.flush_stats()
+    if not detail_ok:
+        return job
+    print("Detailed extraction completed")
+    if ROUTER_TEXT_LAYER == "background":
+        # Router body pages skipped by lazy OCR get their text layer off the critical path
+        job.text_layer_process = start_deferred_text_layers(job)
+    print(f"Stage timings (s): {job.timings}")
+    if job.pdf_bytes_saved is not None:
+        print(f"Output PDF optimisation saved {job.pdf_bytes_saved} bytes")
     
     # Step 4: FileMaker Integration
     print("\\n=== Step 4: FileMaker Integration ===")
@@ -110,11 +114,9 @@ def process_pdf_file(input_pdf_path):
     filemaker_enabled = os.getenv('FILEMAKER_ENABLED', 'false').lower() == 'true'
     if filemaker_enabled:
         try:
-            # Find the generated JSON file
-            po_folders = [d for d in Path('.').iterdir() if d.is_dir() and d.name.startswith('455')]
-            
-            if po_folders:
-                latest_po_folder = max(po_folders, key=lambda d: d.stat().st_mtime)
+            # Use the JSON file written by the extraction stages for this job
+            if job.po_folder:
+                latest_po_folder = Path(job.po_folder)
                 json_file = latest_po_folder / f"{latest_po_folder.name}_info.json"
                 
                 if json_file.exists():
@@ -222,7 +224,50 @@ def process_pdf_file(input_pdf_path):
         print("⚠️ FileMaker integration disabled (set FILEMAKER_ENABLED=true to enable)")
     
     print("\\nPO processing complete - awaiting Dashboard approval for FileMaker submission!")
-    return True
+    job.success = True
+    return job
+
+def run_batch_pipeline(input_pdf_path):
+    """Run the pipeline once per PO found in a scan batch
+    
+    The scan is OCR'd once; the OCR stage's page records show where each
+    PO starts ("Page 1 of N" with a new PO number) and a multi-PO scan is
+    cut into one job per PO (batch_splitter). The parts run one after the
+    other, each OCR page work still going through the shared process pool.
+    Returns the POJobs in scan order (one job for an ordinary single-PO scan)
+    """
+    job = start_pipeline(input_pdf_path)
+    if job.error:
+        return [job]
+    
+    try:
+        parts = split_job(job)
+    except Exception as e:
+        print(f"Batch split failed ({e}); processing the scan as one PO")
+        parts = [job]
+    if len(parts) == 1:
+        return [finish_pipeline(job)]
+    
+    print(f"Scan batch holds {len(parts)} POs; processing them as separate jobs")
+    jobs = []
+    try:
+        for part in parts:
+            if part.ocr_pages is None:
+                jobs.append(run_pipeline(part.input_pdf))
+            else:
+                jobs.append(finish_pipeline(part))
+            # Router text layers read the part's scan PDF, removed below
+            jobs[-1].wait_for_text_layer()
+    finally:
+        shutil.rmtree(os.path.dirname(parts[0].input_pdf), ignore_errors=True)
+    return jobs
+
+def process_pdf_file(input_pdf_path):
+    """Complete processing pipeline for a PDF file (returns True on success)"""
+    jobs = run_batch_pipeline(input_pdf_path)
+    for job in jobs:
+        job.wait_for_text_layer()
+    return all(job.success for job in jobs)
 
 def watch_folder(watch_path, processed_path=None):
     """
@@ -0,0 +1,135 @@
+"""
+Quality clause table and scanner
+The Q clause business classification lives in q_clause_classification.json
+(override with Q_CLAUSE_TABLE) and is loaded once per process; the pipeline
+extractor, enhanced_q_clause_processor and analyze_q_clauses all read it.
+
+scan_clauses finds the clause numbers in a document in one pass over the
+upper-cased text, collecting every "Q<digits>" token with its first offset in
+order of appearance. Unknown clauses take their description from the line of
+their first mention, found from those offsets without searching the text again.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from document_index import document_index
+
+TABLE_PATH = os.getenv(
+    "Q_CLAUSE_TABLE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "q_clause_classification.json"),
+)
+
+Q_NUMBER_RE = re.compile(r'Q\d+')
+Q_LINE_START_RE = re.compile(r'^Q\d+')
+
+_TABLE = None
+_LOOKUP = None
+_KNOWN = None
+_TABLE_HASH = None
+
+
+def load_classification():
+    """{category: {"Q<n>": clause info}} from the classification table (shared, do not modify)"""
+    global _TABLE, _LOOKUP, _KNOWN, _TABLE_HASH
+    if _TABLE is None:
+        with open(TABLE_PATH, 'rb') as f:
+            raw = f.read()
+        table = json.loads(raw.decode('utf-8'))
+        _TABLE_HASH = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        _LOOKUP = {
+            q_number: (category, info)
+            for category, clauses in table.items()
+            for q_number, info in clauses.items()
+        }
+        _KNOWN = {q_number: info["description"] for q_number, (_, info) in _LOOKUP.items()}
+        _TABLE = table
+    return _TABLE
+
+
+def table_hash():
+    """Content hash of the loaded classification table"""
+    load_classification()
+    return _TABLE_HASH
+
+
+def clause_info(q_number):
+    """(category, clause info) for a classified clause, else (None, None)"""
+    load_classification()
+    return _LOOKUP.get(q_number, (None, None))
+
+
+def known_descriptions():
+    """{"Q<n>": standard description} for every classified clause"""
+    load_classification()
+    return _KNOWN
+
+
+def _context_description(index, line_number, q_number):
+    """Description of an unknown clause: rest of its line plus up to two short continuation lines"""
+    lines = index.lines
+    line = lines[line_number]
+    description_parts = []
+    remaining = line.split(q_number, 1)
+    if len(remaining) > 1:
+        desc = remaining[1].strip()
+        if desc:
+            description_parts.append(desc)
+
+    for j in range(line_number + 1, min(line_number + 3, len(lines))):
+        next_line = lines[j].strip()
+        if next_line and not Q_LINE_START_RE.match(next_line.upper()) and len(next_line) < 60:
+            description_parts.append(next_line)
+        else:
+            break
+    return ' '.join(description_parts).strip()
+
+
+def scan_clauses(text):
+    """
+    Q clauses mentioned in text
+
+    Returns:
+        {"Q<n>": description} in order of first appearance; classified clauses get
+        the table description, others the text following their first mention
+        (clauses with no such text are left out)
+    """
+    known = known_descriptions()
+    index = document_index(text)
+
+    # First offset of each Q number token, in order of appearance
+    found = {}
+    for match in Q_NUMBER_RE.finditer(index.upper):
+        found.setdefault(match.group(0), match.start())
+
+    unknown = [q_number for q_number in found if q_number not in known]
+    # An unknown clause is first mentioned by the first token starting with its
+    # number (an earlier "Q33" also mentions "Q3"); tokens are in offset order
+    first_mention = {}
+    if unknown:
+        wanted = set(unknown)
+        for token, start in found.items():
+            for end in range(2, len(token) + 1):
+                if token[:end] in wanted:
+                    first_mention.setdefault(token[:end], start)
+
+    clauses = {}
+    offsets_line_up = len(index.upper) == len(text)
+    for q_number in found:
+        if q_number in known:
+            clauses[q_number] = known[q_number]
+            continue
+        if offsets_line_up:
+            line_number = index.line_at(first_mention[q_number])
+        else:
+            # Case mapping changed some lengths: locate the line directly
+            matches = index.find_lines(q_number, 'upper')
+            if not matches:
+                continue
+            line_number = matches[0]
+        description = _context_description(index, line_number, q_number)
+        if description:
+            clauses[q_number] = description
+    return clauses
@@ -0,0 +1,95 @@
+"""
+Page rasterisation helpers
+Render PDF pages straight into grayscale and expose the pixmap samples as a
+NumPy array / PIL image that share the pixmap's memory, so pixels move from
+MuPDF to OpenCV / Tesseract without a PNG encode + decode round trip.
+
+Render scales are derived from the resolution of the scan embedded in each
+page (render_scale): OCR rasters target OCR_TARGET_DPI but are never rendered
+finer than the scan itself, which only adds pixels and OCR time.
+"""
+
+import math
+import os
+
+import fitz
+import numpy as np
+from PIL import Image
+
+TARGET_DPI = float(os.getenv("OCR_TARGET_DPI", "300"))
+# Low-resolution scans (faxes) are still upsampled to at least this
+MIN_DPI = float(os.getenv("OCR_MIN_DPI", "200"))
+# Zoom the fixed-scale renders used to stand for; nominal scales (2, 3, 4 ...)
+# in candidate lists and zone templates are read relative to it
+BASE_SCALE = 3
+
+
+class _PixmapBuffer:
+    """Array interface over a pixmap's samples; keeps the pixmap alive as the array's base"""
+
+    def __init__(self, pix):
+        self.pix = pix
+        shape = (pix.height, pix.width) if pix.n == 1 else (pix.height, pix.width, pix.n)
+        strides = (pix.stride, 1) if pix.n == 1 else (pix.stride, pix.n, 1)
+        self.__array_interface__ = {
+            "version": 3,
+            "shape": shape,
+            "typestr": "|u1",
+            "strides": strides,
+            "data": (pix.samples_ptr, False),
+        }
+
+
+def pixmap_array(pix):
+    """Writable uint8 view of a pixmap's samples (H x W for gray, H x W x n otherwise)"""
+    return np.asarray(_PixmapBuffer(pix))
+
+
+def render_gray(page, scale=3, matrix=None, clip=None):
+    """Render a page (or the clip rect of it) to an 8-bit grayscale array without encoding it"""
+    mat = matrix if matrix is not None else fitz.Matrix(scale, scale)
+    pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+    return pixmap_array(pix)
+
+
+def as_image(arr):
+    """PIL view of a grayscale array (shares memory when the rows are contiguous)"""
+    if arr.ndim != 2:
+        return Image.fromarray(arr)
+    if not arr.flags["C_CONTIGUOUS"]:
+        arr = np.ascontiguousarray(arr)
+    return Image.frombuffer("L", (arr.shape[1], arr.shape[0]), arr, "raw", "L", 0, 1)
+
+
+def source_dpi(page):
+    """Effective resolution of the largest image drawn on the page (None if it has no images)"""
+    best = None
+    best_area = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"])
+        area = bbox.width * bbox.height
+        if area > best_area and info.get("width") and info.get("height"):
+            best, best_area = info, area
+    if best is None:
+        return None
+    # Pixels per inch over the drawn area, independent of how the image is rotated
+    return math.sqrt(best["width"] * best["height"] / best_area) * 72
+
+
+def render_scale(page, factor=1.0):
+    """
+    fitz zoom for an OCR raster of this page
+
+    Args:
+        page: fitz page
+        factor: multiple of OCR_TARGET_DPI wanted (e.g. 4/3 for a finer retry)
+
+    Returns:
+        float: zoom giving TARGET_DPI * factor, capped at the scan's own
+        resolution (but not below MIN_DPI); pages without a scan use the target
+    """
+    dpi = TARGET_DPI * factor
+    scan_dpi = source_dpi(page)
+    if scan_dpi:
+        dpi = min(dpi, max(scan_dpi, MIN_DPI))
+    return round(dpi / 72, 3)
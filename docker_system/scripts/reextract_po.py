@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Bulk re-extraction over the processed PO archive
+Re-runs the extract_po_details field extractors on PO folders after an
+extractor fix, reading each PO's saved page text instead of its PDFs:
+- the OCR artifact next to the searchable PDF (also gives the word boxes the
+  line-item table reader needs)
+- else extracted_text_comprehensive.txt
+POs with neither are skipped; nothing is OCR'd again.
+
+Only extractors whose version (extract_po_details.EXTRACTOR_VERSIONS) or
+input fingerprint differs from the one stored in the PO record run again;
+--full recomputes every field.
+
+Folders are processed on a process pool. Changed _info.json files are
+rewritten atomically. Prints per-PO timings, rerun extractors and changed
+fields, then how often each field changed.
+
+Usage:
+    python reextract_po.py [po_folder_or_number ...] [--archive DIR]
+                           [--workers N] [--full] [--dry-run] [--show-values]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from extract_po_details import EXTRACTOR_VERSIONS, extract_fields, find_ocr_artifact, write_json_atomic
+from ocr_artifact import format_page_texts, load_ocr_artifact, page_texts
+
+ARCHIVE_DIR = os.getenv("PO_ARCHIVE_DIR", "/app/processed")
+WORKERS = int(os.getenv("REEXTRACT_WORKERS", str(os.cpu_count() or 1)))
+TEXT_FILE = "extracted_text_comprehensive.txt"
+# Last line of the header extract_details_for_folder writes above the text
+TEXT_HEADER_END = "=" * 60 + "\n\n"
+ROUTER_HEADER = "FIRST ROUTER PAGE:\n"
+
+
+def find_po_folders(targets, archive_dir):
+    """PO folders (holding <po>_info.json) for the given folders / PO numbers, or the whole archive"""
+    if targets:
+        candidates = [t if os.path.isdir(t) else os.path.join(archive_dir, t) for t in targets]
+    elif os.path.isdir(archive_dir):
+        candidates = [os.path.join(archive_dir, name) for name in sorted(os.listdir(archive_dir))]
+    else:
+        candidates = []
+    folders = []
+    for folder in candidates:
+        po_number = os.path.basename(os.path.normpath(folder))
+        if os.path.isfile(os.path.join(folder, f"{po_number}_info.json")):
+            folders.append(folder)
+        elif targets:
+            print(f"Skipping {folder}: no {po_number}_info.json")
+    return folders
+
+
+def split_saved_text(text):
+    """(PO pages text, first router page text or None) of an extracted_text_comprehensive.txt"""
+    if TEXT_HEADER_END in text:
+        text = text.split(TEXT_HEADER_END, 1)[1]
+    router_start = text.find(ROUTER_HEADER)
+    if router_start == -1:
+        return text, None
+    return text[:router_start], text[router_start:]
+
+
+def read_saved_text_file(po_folder):
+    """(PO pages text, first router page text or None) from the folder's saved text ((None, None) without one)"""
+    path = os.path.join(po_folder, TEXT_FILE)
+    if not os.path.isfile(path):
+        return None, None
+    with open(path, 'r', encoding='utf-8') as f:
+        return split_saved_text(f.read())
+
+
+def load_saved_text(po_folder, po_number, po_info):
+    """
+    Saved page text of a PO folder
+
+    Returns:
+        (text, router_text, table_pages, source) as extract_fields takes them,
+        or None when the folder has no saved text
+    """
+    page_count = po_info.get("page_count")
+    has_router = os.path.exists(os.path.join(po_folder, f"Router_{po_number}.pdf"))
+    ocr_pages = load_ocr_artifact(find_ocr_artifact(po_folder, po_info.get("source_file")))
+    saved_text, saved_router_text = read_saved_text_file(po_folder)
+
+    if ocr_pages and page_count:
+        text = format_page_texts(page_texts(ocr_pages, 0, page_count))
+        table_pages = ocr_pages[:page_count]
+        source = "artifact"
+        if len(ocr_pages) > page_count:
+            saved_router_text = f"{ROUTER_HEADER}{ocr_pages[page_count].get('text', '')}\n\n"
+    elif saved_text is not None:
+        text, table_pages, source = saved_text, None, "text"
+    else:
+        return None
+
+    router_text = saved_router_text if has_router else None
+    if router_text:
+        text += router_text
+    return text, router_text, table_pages, source
+
+
+def field_changes(old_info, new_fields):
+    """{field: (old, new)} for the extracted fields whose value differs"""
+    # Compare as stored: JSON turns tuples into lists and keys into strings
+    new_fields = json.loads(json.dumps(new_fields))
+    return {
+        field: (old_info.get(field), value)
+        for field, value in new_fields.items()
+        if field != "extractor_versions" and old_info.get(field) != value
+    }
+
+
+def rerun_extractors(old_info, new_fields):
+    """Names of the extractors whose stored version / fingerprint was out of date (or missing)"""
+    old_versions = old_info.get("extractor_versions") or {}
+    return sorted(name for name, stamp in new_fields["extractor_versions"].items()
+                  if old_versions.get(name) != stamp)
+
+
+def reextract_folder(po_folder, dry_run=False, full=False):
+    """Re-extract one PO folder; returns a result dict (status, source, rerun, changes, ms, error)"""
+    start = time.perf_counter()
+    po_number = os.path.basename(os.path.normpath(po_folder))
+    json_file = os.path.join(po_folder, f"{po_number}_info.json")
+    result = {"po_number": po_number, "status": "unchanged", "source": None, "rerun": [],
+              "changes": {}, "error": None}
+    try:
+        with open(json_file, 'r') as f:
+            po_info = json.load(f)
+        saved = load_saved_text(po_folder, po_number, po_info)
+        if saved is None:
+            result["status"] = "skipped"
+            result["error"] = "no saved text"
+        else:
+            text, router_text, table_pages, result["source"] = saved
+            # The extractors report every step; keep the summary readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                fields = extract_fields(text, router_text, table_pages, previous=None if full else po_info)
+            stale = rerun_extractors(po_info, fields)
+            result["rerun"] = sorted(EXTRACTOR_VERSIONS) if full else stale
+            result["changes"] = field_changes(po_info, fields)
+            if result["changes"]:
+                result["status"] = "changed"
+            # Also store refreshed versions / fingerprints when no value changed
+            if (result["changes"] or stale) and not dry_run:
+                po_info.update(fields)
+                write_json_atomic(json_file, po_info)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["ms"] = (time.perf_counter() - start) * 1000.0
+    return result
+
+
+def short(value, width=60):
+    text = json.dumps(value, default=str)
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+def print_result(result, show_values):
+    line = f"{result['po_number']:<14} {result['ms']:8.1f} ms  {result['source'] or '-':<8} {result['status']}"
+    if result["source"]:
+        line += f" ({len(result['rerun'])} extractors rerun)"
+    if result["changes"]:
+        line += ": " + ", ".join(sorted(result["changes"]))
+    if result["error"]:
+        line += f" ({result['error']})"
+    print(line)
+    if show_values:
+        for field, (old, new) in sorted(result["changes"].items()):
+            print(f"    {field}: {short(old)} -> {short(new)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-run field extraction over processed PO folders from their saved text')
+    parser.add_argument('targets', nargs='*', help='PO folders or PO numbers (default: every PO in the archive)')
+    parser.add_argument('--archive', default=ARCHIVE_DIR, help=f'Processed PO folder root (default {ARCHIVE_DIR})')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Worker processes')
+    parser.add_argument('--full', action='store_true', help='Recompute every field, not only stale ones')
+    parser.add_argument('--dry-run', action='store_true', help='Report changes without rewriting _info.json')
+    parser.add_argument('--show-values', action='store_true', help='Print old -> new values of changed fields')
+    args = parser.parse_args()
+
+    folders = find_po_folders(args.targets, args.archive)
+    if not folders:
+        print(f"No PO folders found (archive: {args.archive})")
+        sys.exit(1)
+
+    workers = max(1, min(args.workers, len(folders)))
+    print(f"Re-extracting {len(folders)} POs (workers: {workers})"
+          f"{' (dry run)' if args.dry_run else ''}")
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(reextract_folder, folder, args.dry_run, args.full) for folder in folders]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print_result(result, args.show_values)
+    wall = time.perf_counter() - start
+
+    counts = {}
+    field_counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+        for field in result["changes"]:
+            field_counts[field] = field_counts.get(field, 0) + 1
+    timings = [r["ms"] for r in results if r["status"] in ("changed", "unchanged")]
+
+    print("=" * 60)
+    print(f"{len(results)} POs in {wall:.1f}s: " + ", ".join(
+        f"{counts.get(status, 0)} {status}" for status in ("changed", "unchanged", "skipped", "failed")))
+    if timings:
+        print(f"Per PO: median {statistics.median(timings):.1f} ms, max {max(timings):.1f} ms")
+    if field_counts:
+        print("Changed fields:")
+        for field, count in sorted(field_counts.items(), key=lambda item: (-item[1], item[0])):
+            print(f"  {field:<34} {count} POs")
+    sys.exit(1 if counts.get("failed") else 0)
+
+
+if __name__ == "__main__":
+    main()
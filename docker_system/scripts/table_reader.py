@@ -0,0 +1,143 @@
+"""
+Geometric line-item reader
+Reads the PO line-item table from OCR word boxes instead of flattened text:
+the header row fixes the x-position of each column (Item, Quantity, UM,
+Dock date, Net price) and every word of a data row is assigned to the
+nearest column, so quantity and dock date come from their own cells.
+
+One linear pass over each page's words; returns None when no table header is
+found so callers can fall back to the text-based extractors.
+"""
+
+import re
+
+from ocr_artifact import word_rows
+
+DATE_RE = re.compile(r'^\d{1,2}/\d{1,2}/\d{4}$')
+NUMBER_RE = re.compile(r'^\d+(?:\.\d+)?$')
+
+
+def _norm(text):
+    return re.sub(r'[^a-z]', '', text.lower())
+
+
+def group_rows(words):
+    """Words grouped into text rows (top to bottom, each row left to right)"""
+    if not words:
+        return []
+    heights = sorted(w[4] for w in words)
+    tolerance = max(heights[len(heights) // 2] * 0.6, 1)
+    rows = []
+    for word in sorted(words, key=lambda w: w[2] + w[4] / 2):
+        center = word[2] + word[4] / 2
+        if rows and abs(center - rows[-1][0]) <= tolerance:
+            row = rows[-1]
+            row[1].append(word)
+            row[0] = sum(w[2] + w[4] / 2 for w in row[1]) / len(row[1])
+        else:
+            rows.append([center, [word]])
+    return [sorted(r[1], key=lambda w: w[1]) for r in rows]
+
+
+def _x_center(word):
+    return word[1] + word[3] / 2
+
+
+def find_header(rows):
+    """(row index, {column: x-center}) of the first line-item header row, or None"""
+    for index, row in enumerate(rows):
+        names = [_norm(w[0]) for w in row]
+        if "quantity" not in names:
+            continue
+        has_unit = "um" in names
+        has_dock = any(n.startswith("dock") for n in names)
+        if not (has_unit or has_dock):
+            continue
+        columns = {}
+        quantity_x = None
+        for word, name in zip(row, names):
+            if name == "item" and "item" not in columns:
+                columns["item"] = _x_center(word)
+            elif name == "quantity":
+                quantity_x = columns["quantity"] = _x_center(word)
+            elif name == "um":
+                columns["um"] = _x_center(word)
+            elif name.startswith("dock"):
+                columns.setdefault("dock_date", _x_center(word))
+            elif name == "net" and quantity_x is not None and "net_price" not in columns:
+                columns["net_price"] = _x_center(word)
+        # "price" on the wrapped second header line pins the price column
+        if index + 1 < len(rows):
+            for word in rows[index + 1]:
+                if _norm(word[0]) == "price":
+                    columns["net_price"] = _x_center(word)
+                    break
+        return index, columns
+    return None
+
+
+def _nearest_column(x, columns):
+    return min(columns, key=lambda name: abs(columns[name] - x))
+
+
+def read_row(row, columns):
+    """{column: text} of one data row, each word assigned to the nearest header column"""
+    cells = {}
+    for word in row:
+        name = _nearest_column(_x_center(word), columns)
+        cells[name] = f"{cells[name]} {word[0]}" if name in cells else word[0]
+    return cells
+
+
+def _parse_quantity(text):
+    if not text:
+        return None
+    token = text.split()[-1].replace(",", "")
+    if not NUMBER_RE.match(token):
+        return None
+    value = float(token)
+    return int(value) if value >= 1 and value == int(value) else None
+
+
+def read_line_items(page_records):
+    """
+    Line items from the OCR records of the PO pages
+
+    Returns:
+        list of {item, quantity, um, dock_date, net_price} dicts (first page
+        with a table header only), or None when no header was found
+    """
+    for record in page_records:
+        rows = group_rows(word_rows(record))
+        header = find_header(rows)
+        if header is None:
+            continue
+        index, columns = header
+        if "quantity" not in columns:
+            continue
+        items = []
+        for row in rows[index + 1:]:
+            cells = read_row(row, columns)
+            dock_date = cells.get("dock_date", "").split()
+            dock_date = next((t for t in dock_date if DATE_RE.match(t)), None)
+            quantity = _parse_quantity(cells.get("quantity"))
+            # A line-item row carries both its quantity and its dock date
+            if quantity is None or dock_date is None:
+                continue
+            items.append({
+                "item": cells.get("item"),
+                "quantity": quantity,
+                "um": cells.get("um"),
+                "dock_date": dock_date,
+                "net_price": cells.get("net_price"),
+            })
+        return items
+    return None
+
+
+def read_quantity_and_dock_date(page_records):
+    """(quantity, dock date) of the first line item, or (None, None)"""
+    items = read_line_items(page_records)
+    if not items:
+        return None, None
+    return items[0]["quantity"], items[0]["dock_date"]